@@ -8,11 +8,12 @@
     ✅ Convierte texto completamente en mayúsculas a formato estándar (solo mayúscula inicial).
     ✅ Elimina dobles espacios y signos de puntuación mal colocados.
     ✅ Mantiene el formato original del `.srt` (tiempos y numeración).
+    ✅ Lee y escribe línea por línea con `subtitle_stream.py` (sin cargar todo el
+       archivo); si se interrumpe, la siguiente ejecución continúa donde quedó.
 
 📌 Uso:
     1️⃣ Asegúrate de que el archivo `.srt` que quieres limpiar esté en la misma carpeta que este script.
-    2️⃣ Instala las dependencias necesarias si no lo has hecho:
-        pip install pysrt
+    2️⃣ Deja `subtitle_stream.py` y `subtitle_cleaning.py` en la misma carpeta.
     3️⃣ Ejecuta el script en la terminal o línea de comandos:
         python clean_english_subs.py
     4️⃣ El archivo limpio se guardará con "_cleaned" añadido al nombre.
@@ -22,9 +23,12 @@
 ==================================================================================
 """
 
+import itertools
 import os
-import pysrt
-import re
+
+# La limpieza vive en subtitle_cleaning.py (la misma que usa sub_translate_05_batch_clean.py)
+from subtitle_cleaning import clean_text
+from subtitle_stream import SubtitleWriter, iter_cues
 
 # Obtener el directorio donde está el script
 input_dir = os.path.dirname(os.path.abspath(__file__))
@@ -42,68 +46,20 @@ if not os.path.exists(input_file):
     print(f"❌ ERROR: No se encontró el archivo '{input_file}'. Verifica el nombre y la ubicación.")
     exit(1)
 
-print("✅ Archivo encontrado. Cargando subtítulos...")
-
-# Cargar subtítulos
-subs = pysrt.open(input_file)
-
-# Función para corregir la capitalización y eliminar errores de formato
-def clean_text(text):
-    """
-    Limpia el texto de los subtítulos:
-    - Convierte texto en mayúsculas a capitalización normal.
-    - Corrige espacios y puntuación innecesaria.
-    - Asegura que cada oración tenga una mayúscula inicial y minúsculas después.
-    """
-
-    # Convertir todo a minúsculas si el texto estaba completamente en mayúsculas
-    if text.isupper():
-        text = text.lower()
-
-    # Expresión regular para detectar oraciones
-    sentences = re.split(r'([.!?]) ', text)  # Separa por ".", "!", "?" seguidos de un espacio
-    corrected_sentences = []
-
-    for i, sentence in enumerate(sentences):
-        sentence = sentence.strip()
-        
-        if not sentence:
-            continue
-
-        # Si es un signo de puntuación, mantenerlo sin cambios
-        if sentence in [".", "!", "?"]:
-            corrected_sentences.append(sentence)
-            continue
-
-        # Asegurar que la primera letra de cada oración esté en mayúscula
-        sentence = sentence.capitalize()
-        
-        corrected_sentences.append(sentence)
-
-    cleaned_text = " ".join(corrected_sentences)  # Unir todo en un texto corregido
-
-    # Eliminar espacios extra
-    cleaned_text = re.sub(r'\s+', ' ', cleaned_text).strip()
-
-    return cleaned_text
-
-# Mostrar cuántos subtítulos hay
-total_subs = len(subs)
-print(f"📑 Total de líneas de subtítulos: {total_subs}")
-
-# Limpiar la capitalización y gramática de cada línea del subtítulo
-for i, sub in enumerate(subs, start=1):
-    if sub.text.strip():  # Evitar líneas vacías
-        try:
-            sub.text = clean_text(sub.text)  # Aplicar corrección de formato y capitalización
-        except Exception as e:
-            print(f"⚠️ Error al limpiar la línea {i}: {e}")
-    if i % 100 == 0:  # Mostrar progreso cada 100 líneas
-        print(f"⏳ Limpieza completada en {i}/{total_subs} líneas...")
-
-print("✅ Limpieza completada. Guardando archivo...")
-
-# Guardar el archivo corregido
-subs.save(output_file, encoding="utf-8")
+print("✅ Archivo encontrado. Limpiando subtítulos...")
+
+# Limpiar la capitalización y gramática de cada línea y escribirla en cuanto está lista
+with SubtitleWriter(output_file) as writer:
+    if writer.cues_written:
+        print(f"⏩ Reanudando desde la línea {writer.cues_written + 1}...")
+    for i, sub in enumerate(itertools.islice(iter_cues(input_file), writer.cues_written, None), start=writer.cues_written + 1):
+        if sub.text.strip():  # Evitar líneas vacías
+            try:
+                sub.text = clean_text(sub.text)  # Aplicar corrección de formato y capitalización
+            except Exception as e:
+                print(f"⚠️ Error al limpiar la línea {i}: {e}")
+        writer.write(sub)
+        if i % 100 == 0:  # Mostrar progreso cada 100 líneas
+            print(f"⏳ Limpieza completada en {i} líneas...")
 
 print(f"🎉 Limpieza finalizada con corrección de gramática y formato. Archivo guardado en: {output_file}")
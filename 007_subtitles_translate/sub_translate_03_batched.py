@@ -0,0 +1,101 @@
+"""
+==================================================================================
+🎬 Script: sub_translate_03_batched.py
+📌 Descripción:
+    Versión por lotes de `sub_translate_01.py`. Traduce un `.srt` del inglés al
+    español usando `translation_engine.py`:
+
+    ✅ Cada línea distinta se traduce una sola vez (sin repetir "Yes.", "What?").
+    ✅ Muchas líneas viajan en un mismo pedido a Google Translate.
+    ✅ Memoria de traducción en `memoria_traduccion.sqlite`: al traducir otra
+       película (o repetir esta) las líneas conocidas no van a la red.
+    ✅ Varios lotes se envían al mismo tiempo (MAX_WORKERS).
+    ✅ Con BACKEND = "stub" funciona sin internet (para probar el flujo).
+    ✅ Misma corrección de mayúsculas y signos ¿ ¡ que la versión 01.
+    ✅ Primero traduce de una vez todas las líneas distintas que faltan (así
+       MAX_WORKERS y la deduplicación trabajan sobre el archivo entero) y luego
+       escribe cue por cue (`subtitle_stream.py`). Si se corta a la mitad, la
+       siguiente ejecución continúa: los lotes ya traducidos están en la memoria
+       y la escritura sigue desde el último punto de control.
+
+📌 Uso:
+    1️⃣ Coloca el `.srt` en inglés en la misma carpeta que este script.
+    2️⃣ Instala las dependencias necesarias si no lo has hecho:
+        pip install deep-translator
+    3️⃣ Ejecuta:
+        python sub_translate_03_batched.py
+
+==================================================================================
+"""
+
+import itertools
+import os
+import time
+
+from subtitle_cleaning import fix_capitalization
+from subtitle_stream import SubtitleWriter, detect_encoding, iter_cues
+from translation_engine import GoogleBackend, StubBackend, TranslationEngine
+
+# ----------------- ⚙️ CONFIGURACIÓN -----------------
+input_dir = os.path.dirname(os.path.abspath(__file__))
+
+input_file = os.path.join(input_dir, "A_Little_Princess_English.srt")
+output_file = os.path.join(input_dir, "A_Little_Princess_Spanish.srt")
+memory_file = os.path.join(input_dir, "memoria_traduccion.sqlite")
+
+SOURCE_LANG = "en"
+TARGET_LANG = "es"
+BACKEND = "google"      # "google" o "stub" (sin red, para pruebas)
+MAX_WORKERS = 4         # Lotes enviados al mismo tiempo
+CHECKPOINT_EVERY = 200  # Líneas escritas entre puntos de control
+# ----------------------------------------------------
+
+
+def make_backend():
+    if BACKEND == "stub":
+        return StubBackend(SOURCE_LANG, TARGET_LANG)
+    return GoogleBackend(SOURCE_LANG, TARGET_LANG)
+
+
+if __name__ == "__main__":
+    print(f"📄 Archivo de entrada: {input_file}")
+    print(f"📄 Archivo de salida: {output_file}")
+
+    if not os.path.exists(input_file):
+        print(f"❌ ERROR: No se encontró el archivo '{input_file}'. Verifica el nombre y la ubicación.")
+        exit(1)
+
+    engine = TranslationEngine(make_backend(), memory_file, max_workers=MAX_WORKERS)
+    start_time = time.time()
+    try:
+        with SubtitleWriter(output_file, checkpoint_every=CHECKPOINT_EVERY) as writer:
+            if writer.cues_written:
+                print(f"⏩ Reanudando desde la línea {writer.cues_written + 1}...")
+
+            # La codificación se detecta una sola vez para las dos pasadas
+            encoding = detect_encoding(input_file)
+
+            # 1. Todas las líneas distintas que faltan escribir, traducidas de una vez
+            pending_texts = dict.fromkeys(
+                cue.text for cue in itertools.islice(iter_cues(input_file, encoding), writer.cues_written, None)
+            )
+            translations = dict(zip(pending_texts, engine.translate_all(list(pending_texts))))
+            print(f"🌐 {len(pending_texts)} líneas distintas traducidas. Escribiendo...")
+
+            # 2. Escritura en streaming, con puntos de control cada CHECKPOINT_EVERY líneas
+            for cue in itertools.islice(iter_cues(input_file, encoding), writer.cues_written, None):
+                # Las líneas de un lote que falló se dejan como estaban (igual que la versión 01)
+                if cue.text.strip() and cue.text not in engine.failed:
+                    cue.text = fix_capitalization(translations[cue.text])
+                writer.write(cue)
+                if writer.cues_written % CHECKPOINT_EVERY == 0:
+                    print(f"⏳ Escritas {writer.cues_written} líneas...")
+    finally:
+        engine.close()
+
+    stats = engine.stats
+    print(f"📊 Líneas distintas: {stats['unique']} | Desde memoria: {stats['from_memory']} | "
+          f"Traducidas: {stats['translated']} | Pedidos de red: {stats['requests']} | "
+          f"Sin traducir por error: {stats['failed']}")
+    print(f"⏱️ Tiempo: {time.time() - start_time:.1f} s")
+    print(f"🎉 Traducción finalizada. Archivo guardado en: {output_file}")
@@ -0,0 +1,146 @@
+"""
+==================================================================================
+🎬 Script: sub_translate_04_async_season.py
+📌 Descripción:
+    Traduce una temporada completa (carpeta con 20+ archivos `.srt`) del inglés
+    al español en pocos minutos, usando `translation_async.py`:
+
+    ✅ Junta las líneas de TODOS los archivos: cada línea distinta de la
+       temporada se traduce una sola vez (y queda en la memoria de traducción).
+    ✅ Varios pedidos en vuelo a la vez, con límite de pedidos por segundo.
+    ✅ Reintentos con espera exponencial si Google falla o limita la tasa.
+    ✅ Las líneas que fallan se dejan en inglés y se anotan en
+       `traduccion_fallidos.json`. Con RETRY_FAILED_ONLY = True se vuelven a
+       intentar SOLO esas líneas y se corrigen los archivos ya traducidos.
+
+📌 Uso:
+    1️⃣ Coloca los `.srt` en inglés en la carpeta `temporada/`.
+    2️⃣ Instala las dependencias necesarias si no lo has hecho:
+        pip install pysrt deep-translator
+    3️⃣ Ejecuta:
+        python sub_translate_04_async_season.py
+    4️⃣ Los archivos traducidos quedan en `temporada_traducida/` con "_Spanish".
+
+==================================================================================
+"""
+
+import asyncio
+import json
+import os
+import time
+
+import pysrt
+
+from subtitle_cleaning import fix_capitalization
+from translation_async import AsyncTranslator
+from translation_engine import GoogleBackend, StubBackend
+
+# ----------------- ⚙️ CONFIGURACIÓN -----------------
+script_dir = os.path.dirname(os.path.abspath(__file__))
+
+input_dir = os.path.join(script_dir, "temporada")
+output_dir = os.path.join(script_dir, "temporada_traducida")
+memory_file = os.path.join(script_dir, "memoria_traduccion.sqlite")
+report_file = os.path.join(output_dir, "traduccion_fallidos.json")
+
+SOURCE_LANG = "en"
+TARGET_LANG = "es"
+BACKEND = "google"          # "google" o "stub" (sin red, para pruebas)
+
+REQUESTS_PER_SECOND = 5     # Pedidos por segundo permitidos (promedio)
+BURST = 5                   # Pedidos que pueden salir juntos de golpe
+MAX_CONCURRENCY = 8         # Pedidos en vuelo al mismo tiempo
+MAX_RETRIES = 5             # Intentos por lote antes de darlo por fallido
+RETRY_FAILED_ONLY = False   # True: solo reintentar lo anotado en el reporte
+# ----------------------------------------------------
+
+
+def output_path_for(filename):
+    name, extension = os.path.splitext(filename)
+    return os.path.join(output_dir, f"{name}_Spanish{extension}")
+
+
+def make_backend():
+    if BACKEND == "stub":
+        return StubBackend(SOURCE_LANG, TARGET_LANG)
+    return GoogleBackend(SOURCE_LANG, TARGET_LANG)
+
+
+def load_jobs():
+    """
+    Devuelve [(nombre, subs, índices)] con los subtítulos a traducir.
+    - Modo normal: todos los .srt de la carpeta, todas las líneas.
+    - RETRY_FAILED_ONLY: los archivos ya traducidos, solo las líneas del reporte.
+    """
+    jobs = []
+    if RETRY_FAILED_ONLY:
+        if not os.path.exists(report_file):
+            print(f"✅ No hay reporte de fallidos en '{report_file}'. Nada que reintentar.")
+            return jobs
+        with open(report_file, "r", encoding="utf-8") as f:
+            report = json.load(f)
+        for filename, entries in report.items():
+            subs = pysrt.open(output_path_for(filename), encoding="utf-8")
+            jobs.append((filename, subs, [entry["index"] for entry in entries]))
+        return jobs
+
+    for filename in sorted(os.listdir(input_dir)):
+        if filename.lower().endswith(".srt"):
+            subs = pysrt.open(os.path.join(input_dir, filename))
+            jobs.append((filename, subs, list(range(len(subs)))))
+    return jobs
+
+
+if __name__ == "__main__":
+    print("\n🎬 INICIANDO TRADUCCIÓN DE TEMPORADA...\n")
+
+    if not os.path.isdir(input_dir):
+        print(f"❌ ERROR: No se encontró la carpeta '{input_dir}'.")
+        exit(1)
+    os.makedirs(output_dir, exist_ok=True)
+
+    jobs = load_jobs()
+    if not jobs:
+        exit(0)
+
+    all_texts = [subs[i].text for _, subs, indices in jobs for i in indices]
+    print(f"📑 {len(jobs)} archivos, {len(all_texts)} líneas a traducir.")
+
+    translator = AsyncTranslator(
+        make_backend(), memory_file,
+        requests_per_second=REQUESTS_PER_SECOND, burst=BURST,
+        max_concurrency=MAX_CONCURRENCY, max_retries=MAX_RETRIES,
+    )
+    start_time = time.time()
+    try:
+        translations, failed = asyncio.run(translator.translate_all(all_texts))
+    finally:
+        translator.close()
+
+    # --- Escribir cada archivo y anotar las líneas que quedaron sin traducir ---
+    report = {}
+    for filename, subs, indices in jobs:
+        for i in indices:
+            text = subs[i].text
+            if text in translations:
+                subs[i].text = fix_capitalization(translations[text])
+            elif text in failed:
+                report.setdefault(filename, []).append({"index": i, "text": text, "error": failed[text]})
+        subs.save(output_path_for(filename), encoding="utf-8")
+        print(f"✅ {filename}")
+
+    if report:
+        with open(report_file, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    elif os.path.exists(report_file):
+        os.remove(report_file)
+
+    stats = translator.engine.stats
+    print(f"\n📊 Líneas distintas: {stats['unique']} | Desde memoria: {stats['from_memory']} | "
+          f"Traducidas: {stats['translated']} | Pedidos: {stats['requests']} | Reintentos: {translator.retries}")
+    print(f"⏱️ Tiempo: {time.time() - start_time:.1f} s")
+    if report:
+        failed_count = sum(len(entries) for entries in report.values())
+        print(f"⚠️ {failed_count} líneas quedaron sin traducir. Reporte: {report_file}")
+        print("   Vuelve a ejecutar con RETRY_FAILED_ONLY = True para reintentarlas.")
+    print("\n🎉 TRADUCCIÓN DE TEMPORADA FINALIZADA.\n")
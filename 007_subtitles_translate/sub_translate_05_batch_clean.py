@@ -0,0 +1,130 @@
+"""
+==================================================================================
+🎬 Script: sub_translate_05_batch_clean.py
+📌 Descripción:
+    Versión por lotes de `sub_translate_02_fix_eng_subs.py`. En lugar de un solo
+    archivo fijo, recorre una carpeta (con subcarpetas) llena de `.srt`/`.vtt`
+    sacados de DVD y los limpia todos en paralelo:
+
+    ✅ Un proceso por núcleo (ProcessPoolExecutor), así escala con el CPU.
+    ✅ Expresiones regulares precompiladas (`subtitle_cleaning.py`).
+    ✅ Conserva la estructura de subcarpetas en la carpeta de salida.
+    ✅ Los archivos ya limpiados (y más nuevos que el original) se saltan.
+    ✅ Escribe `resumen_limpieza.csv` con cues, cues cambiados y tiempo por archivo.
+       Al reanudar, las filas de ejecuciones anteriores se conservan.
+
+📌 Uso:
+    1️⃣ Coloca los subtítulos en `subs_originales/` (puede tener subcarpetas).
+    2️⃣ Ejecuta:
+        python sub_translate_05_batch_clean.py
+    3️⃣ Los archivos limpios quedan en `subs_limpios/` con "_Cleaned" en el nombre.
+
+==================================================================================
+"""
+
+import csv
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from subtitle_cleaning import clean_file
+
+# ----------------- ⚙️ CONFIGURACIÓN -----------------
+script_dir = os.path.dirname(os.path.abspath(__file__))
+
+input_root = os.path.join(script_dir, "subs_originales")
+output_root = os.path.join(script_dir, "subs_limpios")
+summary_file = os.path.join(output_root, "resumen_limpieza.csv")
+
+MAX_WORKERS = os.cpu_count() or 2   # Procesos en paralelo
+FILES_PER_TASK = 16                 # Archivos que recibe cada proceso por envío
+SUBTITLE_EXTENSIONS = (".srt", ".vtt")
+SUMMARY_FIELDS = ["archivo", "cues", "cues_cambiados", "segundos", "error"]
+# ----------------------------------------------------
+
+
+def find_jobs():
+    """Devuelve [(entrada, salida)] de los subtítulos que falta limpiar."""
+    jobs = []
+    skipped = 0
+    for folder, _, filenames in os.walk(input_root):
+        relative_folder = os.path.relpath(folder, input_root)
+        for filename in sorted(filenames):
+            name, extension = os.path.splitext(filename)
+            if extension.lower() not in SUBTITLE_EXTENSIONS:
+                continue
+            input_path = os.path.join(folder, filename)
+            output_path = os.path.normpath(os.path.join(output_root, relative_folder, f"{name}_Cleaned{extension}"))
+            if os.path.exists(output_path) and os.path.getmtime(output_path) >= os.path.getmtime(input_path):
+                skipped += 1
+                continue
+            jobs.append((input_path, output_path))
+    return jobs, skipped
+
+
+def clean_job(job):
+    return clean_file(*job)
+
+
+def load_summary():
+    """Filas del resumen de ejecuciones anteriores: {archivo relativo: fila}."""
+    if not os.path.exists(summary_file):
+        return {}
+    with open(summary_file, "r", newline="", encoding="utf-8") as f:
+        return {row["archivo"]: row for row in csv.DictReader(f)}
+
+
+def save_summary(rows):
+    """Reescribe el resumen completo (vía .tmp, para no dejarlo a medias)."""
+    temp_path = summary_file + ".tmp"
+    with open(temp_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=SUMMARY_FIELDS)
+        writer.writeheader()
+        for name in sorted(rows):
+            writer.writerow(rows[name])
+    os.replace(temp_path, summary_file)
+
+
+if __name__ == "__main__":
+    print("\n🧹 INICIANDO LIMPIEZA DE SUBTÍTULOS POR LOTES...\n")
+
+    if not os.path.isdir(input_root):
+        print(f"❌ ERROR: No se encontró la carpeta '{input_root}'.")
+        exit(1)
+
+    jobs, skipped = find_jobs()
+    print(f"📑 {len(jobs)} archivos por limpiar ({skipped} ya estaban limpios).")
+    if not jobs:
+        exit(0)
+    print(f"⚙️ {MAX_WORKERS} procesos en paralelo\n")
+
+    os.makedirs(output_root, exist_ok=True)
+    start_time = time.time()
+    summaries = []
+    with ProcessPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        for done_count, summary in enumerate(executor.map(clean_job, jobs, chunksize=FILES_PER_TASK), start=1):
+            summaries.append(summary)
+            if summary["error"]:
+                print(f"❌ {summary['archivo']}: {summary['error']}")
+            if done_count % 100 == 0:
+                print(f"⏳ {done_count}/{len(jobs)} archivos limpiados...")
+
+    # Se combina con el resumen anterior: los archivos saltados conservan su fila,
+    # los de esta ejecución la reemplazan y se quitan los originales que ya no existen
+    rows = load_summary()
+    for summary in summaries:
+        summary["archivo"] = os.path.relpath(summary["archivo"], input_root)
+        rows[summary["archivo"]] = summary
+    rows = {name: row for name, row in rows.items() if os.path.exists(os.path.join(input_root, name))}
+    save_summary(rows)
+
+    elapsed = time.time() - start_time
+    failed = sum(1 for s in summaries if s["error"])
+    total_cues = sum(s["cues"] for s in summaries)
+    changed_cues = sum(s["cues_cambiados"] for s in summaries)
+    print(f"\n📊 Archivos: {len(summaries)} | Fallidos: {failed} | Cues: {total_cues} | Cambiados: {changed_cues}")
+    print(f"📚 En el resumen: {len(rows)} archivos | Cambiados en total: "
+          f"{sum(int(row['cues_cambiados']) for row in rows.values())}")
+    print(f"⏱️ Tiempo: {elapsed:.1f} s ({len(summaries) / max(elapsed, 0.001):.1f} archivos/s)")
+    print(f"📄 Resumen: {summary_file}")
+    print("\n🎉 LIMPIEZA POR LOTES FINALIZADA.\n")
@@ -0,0 +1,204 @@
+"""
+==================================================================================
+🎬 Script: sub_translate_06_align_audio.py
+📌 Descripción:
+    Sincroniza un `.srt` con el audio del video, sin internet y sin tocar los
+    tiempos a mano. Pensado para los subtítulos de DVD (limpiados con
+    `sub_translate_02`) que se desfasan respecto a los videos recodificados
+    por los scripts de 006/008.
+
+    ✅ FFmpeg extrae el audio en mono a baja frecuencia (8 kHz) y se calcula la
+       energía cada 10 ms (la "envolvente"), leyendo por bloques.
+    ✅ Detección de voz vectorizada con NumPy: energía por encima del piso de
+       ruido + suavizado.
+    ✅ Correlación cruzada (FFT) entre la voz detectada y la línea de tiempo
+       de los subtítulos → desfase global.
+    ✅ Prueba los cambios de velocidad típicos (DVD PAL a 25 fps contra video a
+       23.976 fps, etc.) y se queda con el que mejor correlaciona.
+    ✅ Repite la correlación por ventanas (WINDOW_S) y ajusta una recta para
+       corregir la deriva restante: t_nuevo = escala · t + desfase.
+    ✅ Reescribe el `.srt` con `subtitle_stream.py`.
+
+📌 Uso:
+    1️⃣ Ajusta VIDEO_FILE y SUBTITLE_FILE.
+    2️⃣ Instala las dependencias necesarias si no lo has hecho:
+        pip install numpy   (y FFmpeg en el PATH)
+    3️⃣ Ejecuta:
+        python sub_translate_06_align_audio.py
+    4️⃣ El archivo sincronizado se guarda con "_Synced" añadido al nombre.
+
+==================================================================================
+"""
+
+import os
+import subprocess
+
+import numpy as np
+
+from subtitle_stream import SubtitleWriter, iter_cues
+
+# ----------------- ⚙️ CONFIGURACIÓN -----------------
+input_dir = os.path.dirname(os.path.abspath(__file__))
+
+VIDEO_FILE = os.path.join(input_dir, "A_Little_Princess.mp4")
+SUBTITLE_FILE = os.path.join(input_dir, "A_Little_Princess_English_Cleaned.srt")
+output_file = os.path.splitext(SUBTITLE_FILE)[0] + "_Synced.srt"
+
+SAMPLE_RATE = 8000          # Hz del audio extraído (suficiente para la voz)
+ENVELOPE_HZ = 100           # Puntos de energía por segundo (uno cada 10 ms)
+MAX_OFFSET_S = 60           # Desfase global máximo que se busca (±)
+WINDOW_S = 300              # Tamaño de cada ventana para medir la deriva
+LOCAL_SEARCH_S = 10         # Búsqueda alrededor del desfase global en cada ventana
+MIN_PEAK_Z = 4.0            # Qué tan claro debe ser el pico para confiar en una ventana
+VAD_MARGIN_DB = 6.0         # dB sobre el piso de ruido para considerar que hay voz
+# Cambios de velocidad típicos entre ediciones (PAL 25 fps ↔ cine 23.976/24 fps)
+FRAMERATE_RATIOS = [1.0, 25 / 23.976, 23.976 / 25, 25 / 24, 24 / 25, 24 / 23.976, 23.976 / 24]
+# ----------------------------------------------------
+
+SAMPLES_PER_FRAME = SAMPLE_RATE // ENVELOPE_HZ
+
+
+def extract_envelope(video_path):
+    """Energía (RMS en dB) del audio cada 1/ENVELOPE_HZ segundos, leída por bloques."""
+    command = [
+        "ffmpeg", "-nostdin", "-loglevel", "error",
+        "-i", video_path,
+        "-vn", "-ac", "1", "-ar", str(SAMPLE_RATE),
+        "-f", "s16le", "-",
+    ]
+    block_bytes = SAMPLES_PER_FRAME * 2 * ENVELOPE_HZ * 60  # Un minuto de audio por lectura
+    envelope = []
+    with subprocess.Popen(command, stdout=subprocess.PIPE) as process:
+        leftover = b""
+        while True:
+            data = process.stdout.read(block_bytes)
+            if not data:
+                break
+            data = leftover + data
+            usable = len(data) - len(data) % (SAMPLES_PER_FRAME * 2)
+            leftover = data[usable:]
+            frames = np.frombuffer(data[:usable], dtype="<i2").astype(np.float32).reshape(-1, SAMPLES_PER_FRAME)
+            envelope.append(np.sqrt(np.mean(frames * frames, axis=1)))
+    if process.returncode:
+        raise subprocess.CalledProcessError(process.returncode, command)
+    if not envelope:
+        raise ValueError("El video no tiene audio.")
+    return 20 * np.log10(np.concatenate(envelope) + 1e-3)
+
+
+def detect_speech(envelope_db):
+    """1.0 donde probablemente hay voz, 0.0 donde no (vectorizado)."""
+    noise_floor = np.percentile(envelope_db, 20)
+    active = (envelope_db > noise_floor + VAD_MARGIN_DB).astype(np.float32)
+    # Suavizado de 300 ms: quita chasquidos sueltos y huecos cortos entre palabras
+    kernel = np.ones(int(0.3 * ENVELOPE_HZ), dtype=np.float32) / int(0.3 * ENVELOPE_HZ)
+    return (np.convolve(active, kernel, mode="same") > 0.5).astype(np.float32)
+
+
+def cue_timeline(cues, length, ratio=1.0):
+    """1.0 mientras algún subtítulo está en pantalla (con los tiempos multiplicados por `ratio`)."""
+    timeline = np.zeros(length, dtype=np.float32)
+    for cue in cues:
+        start = int(cue.start * ratio * ENVELOPE_HZ / 1000)
+        end = int(cue.end * ratio * ENVELOPE_HZ / 1000)
+        timeline[max(start, 0):max(min(end, length), 0)] = 1.0
+    return timeline
+
+
+def lag_scores(speech_spectrum, n, cues, min_lag, max_lag):
+    """
+    score[lag] = Σ speech[t + lag] · cues[t], para lag en [min_lag, max_lag].
+    La correlación se calcula con FFT; el espectro de la voz se calcula una sola vez.
+    """
+    correlation = np.fft.irfft(speech_spectrum * np.conj(np.fft.rfft(cues, n)), n)
+    lags = np.arange(min_lag, max_lag + 1)
+    return lags, correlation[lags % n]
+
+
+def best_lag(speech_spectrum, n, cues, min_lag, max_lag):
+    """
+    Devuelve (lag, z) del pico de correlación. z mide qué tan destacado es el pico
+    frente a los lags lejanos (a más de 2 s), no frente a sus propias faldas.
+    """
+    lags, scores = lag_scores(speech_spectrum, n, cues, min_lag, max_lag)
+    peak = int(np.argmax(scores))
+    far = scores[np.abs(lags - lags[peak]) > 2 * ENVELOPE_HZ]
+    if far.size < 2:
+        return int(lags[peak]), 0.0
+    z = (scores[peak] - far.mean()) / (far.std() + 1e-9)
+    return int(lags[peak]), float(z)
+
+
+def estimate_alignment(speech, cues):
+    """
+    Devuelve (escala, desfase_ms, ventanas) tal que t_nuevo = escala · t + desfase_ms.
+    """
+    # Ambas señales centradas: solo cuenta la voz "de más" donde hay subtítulos
+    n = 1 << (2 * len(speech)).bit_length()
+    speech_spectrum = np.fft.rfft(speech - speech.mean(), n)
+    max_lag = MAX_OFFSET_S * ENVELOPE_HZ
+
+    # --- Velocidad y desfase global: el cambio de velocidad con el pico más claro ---
+    best = None
+    for ratio in FRAMERATE_RATIOS:
+        timeline = cue_timeline(cues, len(speech), ratio)
+        lag, z = best_lag(speech_spectrum, n, timeline - timeline.mean(), -max_lag, max_lag)
+        if best is None or z > best[2]:
+            best = (ratio, lag, z, timeline)
+    ratio, global_lag, global_z, timeline = best
+    print(f"🎯 Velocidad: x{ratio:.5f} | Desfase global: {global_lag / ENVELOPE_HZ:+.2f} s (confianza z={global_z:.1f})")
+
+    # --- Desfase local por ventanas para medir la deriva restante ---
+    window = WINDOW_S * ENVELOPE_HZ
+    search = LOCAL_SEARCH_S * ENVELOPE_HZ
+    centers, offsets, weights = [], [], []
+    for start in range(0, len(timeline), window):
+        masked = np.zeros_like(timeline)
+        masked[start:start + window] = timeline[start:start + window]
+        if masked.sum() < 0.1 * window:  # Pocos subtítulos en esta ventana
+            continue
+        lag, z = best_lag(speech_spectrum, n, masked, global_lag - search, global_lag + search)
+        if z >= MIN_PEAK_Z:
+            centers.append((start + min(window, len(timeline) - start) / 2) * 1000 / ENVELOPE_HZ)
+            offsets.append(lag * 1000 / ENVELOPE_HZ)
+            weights.append(z)
+
+    if len(centers) < 3:
+        print(f"⚠️ Solo {len(centers)} ventanas confiables: se aplica únicamente el desfase global.")
+        return ratio, global_lag * 1000 / ENVELOPE_HZ, len(centers)
+
+    # desfase(t') = deriva · t' + inicial, con t' = ratio · t
+    drift, intercept_ms = np.polyfit(centers, offsets, 1, w=weights)
+    return float(ratio * (1 + drift)), float(intercept_ms), len(centers)
+
+
+if __name__ == "__main__":
+    print(f"🎬 Video: {VIDEO_FILE}")
+    print(f"📄 Subtítulos: {SUBTITLE_FILE}")
+
+    for path in (VIDEO_FILE, SUBTITLE_FILE):
+        if not os.path.exists(path):
+            print(f"❌ ERROR: No se encontró el archivo '{path}'. Verifica el nombre y la ubicación.")
+            exit(1)
+
+    try:
+        envelope = extract_envelope(VIDEO_FILE)
+    except FileNotFoundError:
+        print("❌ ERROR: FFmpeg no se encontró. Asegúrate de que está instalado y en el PATH del sistema.")
+        exit(1)
+    print(f"🔊 Audio analizado: {len(envelope) / ENVELOPE_HZ / 60:.1f} min")
+
+    speech = detect_speech(envelope)
+    cues = list(iter_cues(SUBTITLE_FILE))
+    scale, offset_ms, windows = estimate_alignment(speech, cues)
+    print(f"📐 Desfase: {offset_ms / 1000:+.3f} s | Deriva: {(scale - 1) * 3600:+.2f} s por hora "
+          f"({windows} ventanas)")
+
+    with SubtitleWriter(output_file, checkpoint_every=0) as writer:
+        # Si quedó un .part de una ejecución interrumpida, se salta lo ya escrito
+        for cue in cues[writer.cues_written:]:
+            cue.start = max(0, round(cue.start * scale + offset_ms))
+            cue.end = max(cue.start, round(cue.end * scale + offset_ms))
+            writer.write(cue)
+
+    print(f"🎉 Subtítulos sincronizados. Archivo guardado en: {output_file}")
@@ -0,0 +1,103 @@
+"""
+==================================================================================
+🧹 Módulo: subtitle_cleaning.py
+📌 Descripción:
+    La limpieza de `sub_translate_02_fix_eng_subs.py` (mayúsculas, espacios y
+    puntuación) como funciones reutilizables, con las expresiones regulares
+    compiladas una sola vez al importar el módulo.
+
+    ✅ `clean_text(text)`: mismo resultado que la versión del script 02.
+    ✅ `fix_capitalization(text)`: la corrección de mayúsculas y signos ¿ ¡
+       que se aplica al texto traducido (scripts 03 y 04).
+    ✅ `clean_file(entrada, salida)`: limpia un archivo por streaming y
+       devuelve un resumen (cues, cues cambiados, tiempo). Es una función de
+       nivel superior para poder usarla en ProcessPoolExecutor.
+
+==================================================================================
+"""
+
+import os
+import re
+import time
+
+from subtitle_stream import SubtitleWriter, iter_cues
+
+# Expresiones compiladas una sola vez (no en cada cue)
+_sentence_split = re.compile(r'([.!?]) ')  # Separa por ".", "!", "?" seguidos de un espacio
+_extra_whitespace = re.compile(r'\s+')
+_punctuation = frozenset((".", "!", "?"))
+_spanish_sentence_split = re.compile(r'([.!?¿¡] )')
+_spanish_punctuation = frozenset((".", "!", "?", "¿", "¡"))
+
+
+def clean_text(text):
+    """
+    Limpia el texto de los subtítulos:
+    - Convierte texto en mayúsculas a capitalización normal.
+    - Corrige espacios y puntuación innecesaria.
+    - Asegura que cada oración tenga una mayúscula inicial y minúsculas después.
+    """
+    if text.isupper():
+        text = text.lower()
+
+    corrected_sentences = []
+    for sentence in _sentence_split.split(text):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        if sentence in _punctuation:
+            corrected_sentences.append(sentence)
+        else:
+            corrected_sentences.append(sentence.capitalize())
+
+    return _extra_whitespace.sub(' ', " ".join(corrected_sentences)).strip()
+
+
+def fix_capitalization(text):
+    """
+    Corrige la gramática en español:
+    - Capitaliza la primera letra de cada oración.
+    - Maneja correctamente los signos ¿ y ¡ asegurando que la primera letra después de ellos esté en mayúscula.
+    """
+    corrected_sentences = []
+    for sentence in _spanish_sentence_split.split(text):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        if sentence in _spanish_punctuation:
+            corrected_sentences.append(sentence)
+            continue
+        if sentence.startswith("¿") or sentence.startswith("¡"):
+            if len(sentence) > 1:
+                sentence = sentence[0] + sentence[1].upper() + sentence[2:]
+        else:
+            sentence = sentence.capitalize()
+        corrected_sentences.append(sentence)
+
+    return " ".join(corrected_sentences)
+
+
+def clean_file(input_path, output_path):
+    """Limpia un archivo .srt/.vtt completo. Devuelve un dict con el resumen."""
+    start_time = time.perf_counter()
+    summary = {"archivo": input_path, "cues": 0, "cues_cambiados": 0, "segundos": 0.0, "error": ""}
+    try:
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+        # Archivos chicos: sin puntos de control intermedios (ahorra fsync)
+        with SubtitleWriter(output_path, checkpoint_every=0) as writer:
+            # Si quedó un .part de una ejecución interrumpida, lo ya escrito no se vuelve
+            # a escribir, pero sí se cuenta: el resumen es del archivo completo
+            already_written = writer.cues_written
+            for position, cue in enumerate(iter_cues(input_path)):
+                summary["cues"] += 1
+                if cue.text.strip():
+                    cleaned = clean_text(cue.text)
+                    if cleaned != cue.text:
+                        summary["cues_cambiados"] += 1
+                        cue.text = cleaned
+                if position >= already_written:
+                    writer.write(cue)
+    except Exception as e:
+        summary["error"] = f"{type(e).__name__}: {e}"
+    summary["segundos"] = round(time.perf_counter() - start_time, 4)
+    return summary
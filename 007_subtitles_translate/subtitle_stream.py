@@ -0,0 +1,235 @@
+"""
+==================================================================================
+🎞️ Módulo: subtitle_stream.py
+📌 Descripción:
+    Lector y escritor de subtítulos (SRT y WebVTT) por streaming, sin pysrt.
+
+    pysrt.open carga el archivo entero como objetos SubRipItem y subs.save
+    escribe todo al final: si el script se cae a la mitad se pierde todo, y la
+    memoria crece con el archivo. Aquí:
+
+    ✅ `Cue` es compacto (`__slots__`, tiempos en milisegundos enteros).
+    ✅ `iter_cues` lee el archivo bloque por bloque (un generador). Si el
+       archivo no es UTF-8 lo lee como cp1252 (subtítulos viejos de Windows);
+       si tampoco es cp1252 se detiene con un error en vez de inventar texto.
+    ✅ `SubtitleWriter` escribe cada cue en cuanto está listo en un `.part`,
+       guarda un punto de control (cues escritos + posición en bytes) y, si el
+       proceso se interrumpe, la siguiente ejecución continúa desde ahí.
+
+📌 Uso:
+    with SubtitleWriter(salida) as writer:
+        cues = itertools.islice(iter_cues(entrada), writer.cues_written, None)
+        for cue in cues:
+            cue.text = transformar(cue.text)
+            writer.write(cue)
+
+==================================================================================
+"""
+
+import codecs
+import itertools
+import json
+import os
+import re
+
+# Se prueban en orden; cp1252 cubre casi todos los .srt de Windows en idiomas europeos
+FALLBACK_ENCODINGS = ("utf-8-sig", "cp1252")
+
+_timestamp = r"(?:(\d+):)?(\d{1,2}):(\d{2})[,.](\d{1,3})"
+_timing_line = re.compile(rf"^\s*{_timestamp}\s*-->\s*{_timestamp}(.*)$")
+
+# (ruta absoluta, mtime_ns, tamaño, candidatas) → codificación detectada
+_detected_encodings = {}
+
+
+class Cue:
+    """Un subtítulo: identificador, inicio/fin en ms, texto y ajustes (solo VTT)."""
+
+    __slots__ = ("index", "start", "end", "text", "settings")
+
+    def __init__(self, index, start, end, text, settings=""):
+        self.index = index
+        self.start = start
+        self.end = end
+        self.text = text
+        self.settings = settings
+
+    def __repr__(self):
+        return f"Cue({self.index!r}, {self.start}, {self.end}, {self.text!r})"
+
+
+def detect_format(path):
+    return "vtt" if path.lower().endswith(".vtt") else "srt"
+
+
+def _to_ms(hours, minutes, seconds, millis):
+    return ((int(hours or 0) * 60 + int(minutes)) * 60 + int(seconds)) * 1000 + int(millis.ljust(3, "0"))
+
+
+def format_timestamp(ms, fmt="srt"):
+    hours, ms = divmod(ms, 3_600_000)
+    minutes, ms = divmod(ms, 60_000)
+    seconds, ms = divmod(ms, 1000)
+    separator = "." if fmt == "vtt" else ","
+    return f"{hours:02}:{minutes:02}:{seconds:02}{separator}{ms:03}"
+
+
+def _parse_block(lines):
+    """Convierte las líneas de un bloque en un Cue (None si no es un cue)."""
+    for position, line in enumerate(lines):
+        match = _timing_line.match(line)
+        if match:
+            break
+    else:
+        return None  # Cabecera WEBVTT, NOTE, STYLE, REGION o basura
+
+    groups = match.groups()
+    identifier = lines[position - 1].strip() if position else None
+    if identifier and identifier.isdigit():
+        identifier = int(identifier)
+    return Cue(
+        identifier,
+        _to_ms(*groups[0:4]),
+        _to_ms(*groups[4:8]),
+        "\n".join(lines[position + 1:]),
+        groups[8].strip(),
+    )
+
+
+def _scan_encoding(path, candidates):
+    for encoding in candidates:
+        decoder = codecs.getincrementaldecoder(encoding)()
+        try:
+            with open(path, "rb") as f:
+                while block := f.read(1 << 16):
+                    decoder.decode(block)
+            decoder.decode(b"", final=True)
+            return encoding
+        except UnicodeDecodeError as e:
+            last_error = e
+    raise UnicodeDecodeError(
+        last_error.encoding, last_error.object, last_error.start, last_error.end,
+        f"'{path}' no es {' ni '.join(candidates)}; indica la codificación con encoding=...",
+    )
+
+
+def detect_encoding(path, candidates=FALLBACK_ENCODINGS):
+    """
+    Primera codificación de `candidates` que decodifica el archivo completo.
+    Lee por bloques (sin cargar el archivo). Lanza UnicodeDecodeError si ninguna sirve.
+    El resultado se guarda por (ruta, mtime, tamaño): una segunda pasada sobre el
+    mismo archivo no lo vuelve a leer entero.
+    """
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size, tuple(candidates))
+    if key not in _detected_encodings:
+        encoding = _scan_encoding(path, candidates)
+        if encoding != FALLBACK_ENCODINGS[0]:
+            print(f"⚠️ '{os.path.basename(path)}' no está en UTF-8: se lee como {encoding}.")
+        _detected_encodings[key] = encoding
+    return _detected_encodings[key]
+
+
+def iter_cues(path, encoding=None):
+    """
+    Genera los Cue de un archivo .srt o .vtt, uno por uno.
+    Sin `encoding` se usa detect_encoding (UTF-8 y, si no, cp1252).
+    """
+    if encoding is None:
+        encoding = detect_encoding(path)
+    # Estricto: un byte inválido detiene la lectura en lugar de convertirse en U+FFFD
+    with open(path, "r", encoding=encoding) as f:
+        block = []
+        for line in f:
+            line = line.rstrip("\r\n")
+            if line.strip():
+                block.append(line)
+                continue
+            if block:
+                cue = _parse_block(block)
+                if cue:
+                    yield cue
+                block = []
+        if block:
+            cue = _parse_block(block)
+            if cue:
+                yield cue
+
+
+def chunked(iterable, size):
+    """Agrupa un iterable en listas de hasta `size` elementos."""
+    iterator = iter(iterable)
+    while chunk := list(itertools.islice(iterator, size)):
+        yield chunk
+
+
+class SubtitleWriter:
+    """Escribe cues a medida que llegan, con puntos de control para reanudar."""
+
+    def __init__(self, path, fmt=None, checkpoint_every=100):
+        self.path = path
+        self.fmt = fmt or detect_format(path)
+        self.part_path = path + ".part"
+        self.checkpoint_path = path + ".checkpoint.json"
+        self.checkpoint_every = checkpoint_every
+        self.cues_written = 0
+
+        if os.path.exists(self.checkpoint_path) and os.path.exists(self.part_path):
+            # Reanudar: se descarta lo escrito después del último punto de control
+            with open(self.checkpoint_path, "r", encoding="utf-8") as f:
+                checkpoint = json.load(f)
+            self.cues_written = checkpoint["cues_written"]
+            self.file = open(self.part_path, "r+b")
+            self.file.truncate(checkpoint["offset"])
+            self.file.seek(checkpoint["offset"])
+        else:
+            self.file = open(self.part_path, "wb")
+            if self.fmt == "vtt":
+                self.file.write(b"WEBVTT\n\n")
+        # Último límite entre cues (cues escritos, posición en bytes): los puntos
+        # de control solo se toman aquí, nunca a la mitad de un cue
+        self._boundary = (self.cues_written, self.file.tell())
+
+    def write(self, cue):
+        if self.fmt == "vtt":
+            header = f"{cue.index}\n" if cue.index is not None else ""
+            settings = f" {cue.settings}" if cue.settings else ""
+        else:
+            header = f"{self.cues_written + 1}\n"  # SRT siempre numera 1, 2, 3...
+            settings = ""
+        timing = f"{format_timestamp(cue.start, self.fmt)} --> {format_timestamp(cue.end, self.fmt)}"
+        self.file.write(f"{header}{timing}{settings}\n{cue.text}\n\n".encode("utf-8"))
+        self.cues_written += 1
+        self._boundary = (self.cues_written, self.file.tell())
+        if self.checkpoint_every and self.cues_written % self.checkpoint_every == 0:
+            self.checkpoint()
+
+    def checkpoint(self):
+        """Asegura lo escrito en disco y anota hasta el último cue completo."""
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        cues_written, offset = self._boundary
+        temp_path = self.checkpoint_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"cues_written": cues_written, "offset": offset}, f)
+        os.replace(temp_path, self.checkpoint_path)
+
+    def close(self):
+        """Termina el archivo: el `.part` pasa a ser el archivo final."""
+        self.file.close()
+        os.replace(self.part_path, self.path)
+        if os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            # Interrumpido: se guarda el avance hasta el último cue completo (un cue a
+            # medio escribir se descarta al reanudar) y se deja el .part
+            self.checkpoint()
+            self.file.close()
+        return False
@@ -0,0 +1,124 @@
+"""
+==================================================================================
+🌐 Módulo: translation_async.py
+📌 Descripción:
+    Driver asyncio para `translation_engine.py`. En `sub_translate_01.py` un
+    error de traducción solo se imprime y la línea queda en inglés, y nunca
+    hay más de un pedido en vuelo. Aquí:
+
+    ✅ Limitador de tasa tipo "token bucket" (pedidos por segundo + ráfaga).
+    ✅ Concurrencia acotada con un semáforo (max_concurrency pedidos en vuelo).
+    ✅ Reintentos con espera exponencial (y algo de azar) por cada pedido.
+       Si el proveedor altera el delimitador de un lote, cada línea se pide
+       aparte y cada pedido pasa por el limitador.
+    ✅ Devuelve los textos que fallaron tras todos los reintentos, para
+       guardarlos en un reporte y volver a intentarlos solos más tarde.
+
+    Los backends son síncronos (deep-translator), así que cada pedido corre en
+    un hilo con asyncio.to_thread; el bucle de eventos solo coordina.
+
+📌 Uso:
+    translator = AsyncTranslator(GoogleBackend("en", "es"), "memoria_traduccion.sqlite")
+    translations, failed = asyncio.run(translator.translate_all(textos))
+
+==================================================================================
+"""
+
+import asyncio
+import random
+import time
+
+from translation_engine import MAX_BATCH_CHARS, TranslationEngine, pack_batches
+
+
+class TokenBucket:
+    """Permite `rate` pedidos por segundo con ráfagas de hasta `capacity`."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    async def acquire(self):
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class AsyncTranslator:
+    """Traduce lotes en paralelo respetando el límite de tasa y reintentando errores."""
+
+    def __init__(self, backend, memory_path=None, requests_per_second=5.0, burst=5,
+                 max_concurrency=8, max_retries=5, base_delay=1.0, max_batch_chars=MAX_BATCH_CHARS):
+        self.engine = TranslationEngine(backend, memory_path, max_batch_chars=max_batch_chars)
+        self.requests_per_second = requests_per_second
+        self.burst = burst
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.retries = 0
+
+    async def _request(self, bucket, request, *args):
+        """Un pedido al proveedor: toma un token del bucket y reintenta con espera exponencial."""
+        for attempt in range(1, self.max_retries + 1):
+            await bucket.acquire()
+            try:
+                return await asyncio.to_thread(request, *args)
+            except Exception:
+                if attempt == self.max_retries:
+                    raise
+                self.retries += 1
+                delay = self.base_delay * 2 ** (attempt - 1) * random.uniform(0.5, 1.5)
+                await asyncio.sleep(delay)
+
+    async def translate_batch(self, batch, bucket, semaphore):
+        """Devuelve (lote, {original: traducción}, error). error es None si el lote salió bien."""
+        engine = self.engine
+        async with semaphore:
+            try:
+                result = await self._request(bucket, engine.request_batch, batch)
+                if result is None:
+                    # Delimitador alterado: una línea por pedido, y cada pedido con su propio token
+                    result = {}
+                    for text in batch:
+                        result[text] = await self._request(bucket, engine.request_one, text)
+                return batch, result, None
+            except Exception as e:
+                return batch, {}, f"{type(e).__name__}: {e}"
+
+    async def translate_all(self, texts):
+        """
+        Traduce todos los textos distintos de `texts`.
+        Devuelve (traducciones, fallidos): dos dicts {texto original: traducción / error}.
+        """
+        engine = self.engine
+        # Deduplicación, memoria y estadísticas: las mismas de TranslationEngine.translate_all
+        translations, missing = engine.prepare(texts)
+
+        failed = {}
+        if missing:
+            # El bucket y el semáforo se crean aquí para quedar en el bucle de eventos actual
+            bucket = TokenBucket(self.requests_per_second, self.burst)
+            semaphore = asyncio.Semaphore(self.max_concurrency)
+            batches = pack_batches(missing, engine.max_batch_chars)
+            tasks = [self.translate_batch(batch, bucket, semaphore) for batch in batches]
+
+            # Cada lote se guarda en la memoria en cuanto termina
+            for next_done in asyncio.as_completed(tasks):
+                batch, batch_result, error = await next_done
+                engine.record_batch(batch, batch_result, error)
+                if error:
+                    failed.update(dict.fromkeys(batch, error))
+                else:
+                    translations.update(batch_result)
+
+        return translations, failed
+
+    def close(self):
+        self.engine.close()
@@ -0,0 +1,250 @@
+"""
+==================================================================================
+🌐 Módulo: translation_engine.py
+📌 Descripción:
+    Capa de traducción por lotes para los scripts de subtítulos.
+
+    sub_translate_01.py llama a GoogleTranslator.translate una vez por cada
+    línea: una película son ~1,500 viajes de red y las líneas repetidas
+    ("Yes.", "What?") se traducen una y otra vez. Este módulo:
+
+    ✅ Elimina duplicados: cada texto distinto se traduce una sola vez.
+    ✅ Empaqueta muchas líneas en un solo pedido, unidas con un delimitador,
+       sin pasar el límite de caracteres del proveedor (MAX_BATCH_CHARS).
+    ✅ Guarda una memoria de traducción persistente (origen → destino) en
+       SQLite, así las líneas ya vistas en otras películas no van a la red.
+    ✅ Puede enviar varios lotes al mismo tiempo (max_workers).
+    ✅ Tiene backends intercambiables: GoogleBackend (deep-translator) y
+       StubBackend (sin red, para probar).
+
+📌 Uso:
+    from translation_engine import TranslationEngine, GoogleBackend
+
+    engine = TranslationEngine(GoogleBackend("en", "es"), "memoria_traduccion.sqlite")
+    traducciones = engine.translate_all(["Yes.", "What?", "Yes."])
+
+==================================================================================
+"""
+
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Límite de Google Translate por pedido: 5000 caracteres (se deja margen)
+MAX_BATCH_CHARS = 4500
+
+# Separador entre líneas de un lote. Debe sobrevivir a la traducción tal cual.
+BATCH_DELIMITER = "\n||\n"
+_delimiter_split = re.compile(r"\s*\|\|\s*")
+
+
+class GoogleBackend:
+    """Backend real: Google Translate a través de deep-translator."""
+
+    name = "google"
+
+    def __init__(self, source, target):
+        # Import perezoso: el StubBackend funciona sin deep-translator instalado
+        from deep_translator import GoogleTranslator
+        self.source = source
+        self.target = target
+        self._translator_class = GoogleTranslator
+        # GoogleTranslator guarda cada consulta en el propio objeto (_url_params):
+        # compartido entre hilos, un lote puede mandar o recibir el texto de otro
+        self._local = threading.local()
+
+    @property
+    def translator(self):
+        """Un GoogleTranslator por hilo."""
+        translator = getattr(self._local, "translator", None)
+        if translator is None:
+            translator = self._translator_class(source=self.source, target=self.target)
+            self._local.translator = translator
+        return translator
+
+    def translate(self, text):
+        return self.translator.translate(text)
+
+
+class StubBackend:
+    """Backend de prueba sin red: marca cada segmento con el idioma destino."""
+
+    name = "stub"
+
+    def __init__(self, source, target, latency=0.0):
+        self.source = source
+        self.target = target
+        self.latency = latency      # Segundos simulados por pedido
+        self.calls = 0              # Cuántos pedidos "de red" se hicieron
+        self._lock = threading.Lock()
+
+    def translate(self, text):
+        with self._lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        segments = text.split(BATCH_DELIMITER)
+        return BATCH_DELIMITER.join(f"[{self.target}] {segment}" for segment in segments)
+
+
+class TranslationMemory:
+    """Memoria de traducción persistente (SQLite): (origen, destino, texto) → traducción."""
+
+    def __init__(self, path, source, target):
+        self.source = source
+        self.target = target
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS memory (
+                source_lang TEXT NOT NULL,
+                target_lang TEXT NOT NULL,
+                source_text TEXT NOT NULL,
+                target_text TEXT NOT NULL,
+                PRIMARY KEY (source_lang, target_lang, source_text)
+            )
+        """)
+        self.conn.commit()
+
+    def lookup(self, texts):
+        """Devuelve {texto: traducción} para los textos que ya están en memoria."""
+        found = {}
+        texts = list(texts)
+        with self._lock:
+            # SQLite limita la cantidad de parámetros por consulta
+            for i in range(0, len(texts), 500):
+                chunk = texts[i:i + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self.conn.execute(
+                    f"SELECT source_text, target_text FROM memory "
+                    f"WHERE source_lang = ? AND target_lang = ? AND source_text IN ({placeholders})",
+                    (self.source, self.target, *chunk),
+                ).fetchall()
+                found.update(rows)
+        return found
+
+    def store(self, pairs):
+        with self._lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO memory VALUES (?, ?, ?, ?)",
+                [(self.source, self.target, src, dst) for src, dst in pairs.items()],
+            )
+            self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+
+def pack_batches(texts, max_chars=MAX_BATCH_CHARS):
+    """Agrupa textos en lotes cuyo tamaño (con delimitadores) no pasa max_chars."""
+    batches = []
+    current = []
+    current_len = 0
+    for text in texts:
+        added_len = len(text) + (len(BATCH_DELIMITER) if current else 0)
+        if current and current_len + added_len > max_chars:
+            batches.append(current)
+            current, current_len = [], 0
+            added_len = len(text)
+        current.append(text)
+        current_len += added_len
+    if current:
+        batches.append(current)
+    return batches
+
+
+class TranslationEngine:
+    """Traduce listas de textos con deduplicación, lotes, memoria y concurrencia."""
+
+    def __init__(self, backend, memory_path=None, max_workers=4, max_batch_chars=MAX_BATCH_CHARS):
+        self.backend = backend
+        self.memory = TranslationMemory(memory_path, backend.source, backend.target) if memory_path else None
+        self.max_workers = max_workers
+        self.max_batch_chars = max_batch_chars
+        self.stats = {"unique": 0, "from_memory": 0, "translated": 0, "requests": 0, "failed": 0}
+        self.failed = {}  # {texto original: error} de los lotes que fallaron
+        self._stats_lock = threading.Lock()
+
+    def _count_request(self):
+        with self._stats_lock:
+            self.stats["requests"] += 1
+
+    def request_batch(self, batch):
+        """
+        Un solo pedido con todo el lote. Devuelve {original: traducción}, o None si el
+        proveedor alteró el delimitador (hay que traducir ese lote línea por línea).
+        """
+        self._count_request()
+        translated = self.backend.translate(BATCH_DELIMITER.join(batch))
+        parts = _delimiter_split.split(translated.strip()) if translated else []
+        if len(parts) != len(batch):
+            return None
+        return dict(zip(batch, (p.strip() for p in parts)))
+
+    def request_one(self, text):
+        """Un pedido con una sola línea."""
+        self._count_request()
+        return self.backend.translate(text)
+
+    def translate_batch(self, batch):
+        """Traduce un lote (un pedido, o uno por línea si el delimitador no sobrevive). Devuelve {original: traducción}."""
+        result = self.request_batch(batch)
+        if result is None:
+            result = {text: self.request_one(text) for text in batch}
+        return result
+
+    def _translate_batch_safe(self, batch):
+        """translate_batch sin excepciones: devuelve (lote, {original: traducción}, error o None)."""
+        try:
+            return batch, self.translate_batch(batch), None
+        except Exception as e:
+            return batch, {}, f"{type(e).__name__}: {e}"
+
+    def prepare(self, texts):
+        """
+        Deduplica `texts` y busca en la memoria. Devuelve ({texto: traducción} ya conocidas,
+        [textos distintos que faltan traducir]). Lo usan translate_all y translation_async.py.
+        """
+        unique = list(dict.fromkeys(t for t in texts if t.strip()))
+        translations = self.memory.lookup(unique) if self.memory else {}
+        with self._stats_lock:
+            self.stats["unique"] += len(unique)
+            self.stats["from_memory"] += len(translations)
+        return translations, [t for t in unique if t not in translations]
+
+    def record_batch(self, batch, batch_result, error=None):
+        """Anota el resultado de un lote: a la memoria si salió bien, a self.failed si no."""
+        with self._stats_lock:
+            if error:
+                self.failed.update(dict.fromkeys(batch, error))
+                self.stats["failed"] += len(batch)
+                return
+            self.stats["translated"] += len(batch_result)
+        if self.memory:
+            self.memory.store(batch_result)
+
+    def translate_all(self, texts):
+        """
+        Traduce una lista de textos y devuelve las traducciones en el mismo orden.
+        Si un lote falla, sus líneas quedan sin traducir (y se anotan en self.failed).
+        """
+        translations, missing = self.prepare(texts)
+
+        if missing:
+            batches = pack_batches(missing, self.max_batch_chars)
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                for batch, batch_result, error in executor.map(self._translate_batch_safe, batches):
+                    if error:
+                        # Como en sub_translate_01.py: el error se informa y esas líneas no se traducen
+                        print(f"⚠️ Error al traducir un lote de {len(batch)} líneas: {error}")
+                    else:
+                        translations.update(batch_result)
+                    self.record_batch(batch, batch_result, error)
+
+        return [translations.get(t, t) for t in texts]
+
+    def close(self):
+        if self.memory:
+            self.memory.close()
@@ -0,0 +1,294 @@
+import os
+import queue
+import re
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlparse
+
+from ffmpeg_runner import run_ffmpeg
+
+# ========================== HEADER ==========================
+#  Script: Descargar y Optimizar Streams en Dos Etapas (Pipeline)
+#  Descripción:
+#      Versión 02 de 'download_from_stream_ffmpeg_01.py'. La versión 01 usa
+#      un solo FFmpeg que descarga y convierte a la vez, un video tras otro:
+#      la red queda parada mientras se codifica y el CPU queda parado
+#      mientras la descarga va lenta.
+#
+#      Aquí el trabajo se separa en dos etapas que corren al mismo tiempo:
+#        1. Etapa de RED: descarga cada stream a un archivo local
+#           (MAX_DOWNLOADS descargas simultáneas, reintentos y reanudación).
+#        2. Etapa de CPU: toma los archivos descargados de una cola y los
+#           convierte con los mismos ajustes de la versión 01.
+#
+#  Funcionalidades:
+#      - Lee 'videos.txt' en pares título/URL (igual que la versión 01).
+#      - URLs HTTP normales: descarga con 'Range', así un archivo a medias
+#        ('.part') se continúa en la siguiente ejecución.
+#      - URLs HLS (.m3u8): se copian con FFmpeg '-c copy' (sin recodificar).
+#      - Reintentos con espera exponencial (DOWNLOAD_RETRIES).
+#      - Los videos ya convertidos se saltan al volver a ejecutar.
+#      - Ctrl+C detiene las dos etapas: las descargas HTTP paran en el
+#        siguiente bloque (el '.part' queda para continuar) y no se empiezan
+#        trabajos nuevos.
+#
+#  Prueba local:
+#      'servidor_local_prueba.py' sirve una carpeta por HTTP (con soporte
+#      de Range y velocidad limitada) para probar sin internet.
+#
+#  Uso:
+#      1. Coloca 'videos.txt' junto a este script.
+#      2. Ejecuta: python download_from_stream_ffmpeg_02_pipeline.py
+# ============================================================
+
+# ----------------- ⚙️ CONFIGURACIÓN -----------------
+script_dir = os.path.dirname(os.path.abspath(__file__))
+
+input_file = os.path.join(script_dir, "videos.txt")
+DOWNLOAD_DIR = os.path.join(script_dir, "descargas_temporales")
+OUTPUT_DIR = script_dir
+
+MAX_DOWNLOADS = 3               # Descargas simultáneas (etapa de red)
+TRANSCODE_WORKERS = 1           # Conversiones simultáneas (etapa de CPU)
+THREADS_PER_TRANSCODE = max(1, (os.cpu_count() or 2) // TRANSCODE_WORKERS)
+DOWNLOAD_RETRIES = 4            # Intentos por descarga
+RETRY_BASE_DELAY = 5            # Segundos; se duplica en cada reintento
+CHUNK_SIZE = 1024 * 1024        # Tamaño de bloque para descargas HTTP
+KEEP_DOWNLOADS = False          # Borrar el archivo descargado tras convertir
+
+# Mismos ajustes de optimización que la versión 01
+TRANSCODE_ARGS = [
+    "-vf", "scale=1280:720",
+    "-crf", "23", "-preset", "slow", "-c:v", "libx264",
+    "-b:v", "1200k", "-maxrate", "1400k", "-bufsize", "2800k",
+    "-r", "23.98",
+    "-c:a", "aac", "-b:a", "96k", "-ac", "2", "-ar", "44100",
+]
+# ----------------------------------------------------
+
+# Se activa con Ctrl+C: las descargas y los hilos de conversión terminan en cuanto lo ven
+shutdown_event = threading.Event()
+
+
+class PipelineStopped(Exception):
+    """El pipeline se detuvo (Ctrl+C) mientras este trabajo estaba en curso."""
+
+
+# Función para transformar el título en un formato compatible
+def format_filename(title):
+    """
+    Convierte un título de episodio en un nombre de archivo válido.
+
+    Formato de entrada esperado:
+        "Episodio 3 de la temporada 1: La odisea de Homero"
+
+    Salida esperada:
+        "Los_Simpsons_T01E03_La_odisea_de_Homero"
+    """
+    match = re.search(r"Episodio (\d+) de la temporada (\d+): (.+)", title, re.IGNORECASE)
+    if match:
+        ep_num = int(match.group(1))
+        season_num = int(match.group(2))
+        episode_name = match.group(3)
+
+        formatted_title = f"Los_Simpsons_T{season_num:02}E{ep_num:02}_{episode_name}"
+        formatted_title = re.sub(r"[^a-zA-Z0-9_]", "", formatted_title.replace(" ", "_"))
+        return formatted_title
+    else:
+        return None
+
+
+def is_hls(url):
+    return urlparse(url).path.lower().endswith(".m3u8")
+
+
+def local_download_path(name, url):
+    """Ruta del archivo descargado, conservando la extensión original."""
+    if is_hls(url):
+        extension = ".ts"
+    else:
+        extension = os.path.splitext(urlparse(url).path)[1] or ".mp4"
+    return os.path.join(DOWNLOAD_DIR, name + extension)
+
+
+# ===========================
+# Etapa 1: RED (descarga)
+# ===========================
+def download_http(url, part_path):
+    """Descarga con soporte de reanudación mediante la cabecera Range."""
+    existing = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    headers = {"Range": f"bytes={existing}-"} if existing else {}
+    request = urllib.request.Request(url, headers=headers)
+
+    try:
+        with urllib.request.urlopen(request, timeout=30) as response:
+            # Si el servidor ignora Range (200 en vez de 206), empezar de cero
+            mode = "ab" if existing and response.status == 206 else "wb"
+            with open(part_path, mode) as f:
+                # Bloque por bloque (en vez de shutil.copyfileobj) para poder detenerse con Ctrl+C
+                while chunk := response.read(CHUNK_SIZE):
+                    f.write(chunk)
+                    if shutdown_event.is_set():
+                        raise PipelineStopped()
+    except urllib.error.HTTPError as e:
+        # 416: lo que ya tenemos es el archivo completo
+        if e.code != 416 or not existing:
+            raise
+
+
+def download_hls(url, part_path, name):
+    """Copia un stream HLS a un archivo local sin recodificar."""
+    # FFmpeg no puede continuar una copia HLS a medias: se repite completa
+    run_ffmpeg(
+        ["-y", "-loglevel", "error", "-i", url, "-c", "copy", "-f", "mpegts", part_path],
+        job_name=f"descarga_{name}",
+    )
+
+
+def download_with_retries(name, url):
+    """Descarga un stream a DOWNLOAD_DIR y devuelve la ruta local."""
+    final_path = local_download_path(name, url)
+    if os.path.exists(final_path):
+        return final_path  # Descargado en una ejecución anterior
+
+    part_path = final_path + ".part"
+    for attempt in range(1, DOWNLOAD_RETRIES + 1):
+        if shutdown_event.is_set():
+            raise PipelineStopped()
+        try:
+            if is_hls(url):
+                download_hls(url, part_path, name)
+            else:
+                download_http(url, part_path)
+            os.replace(part_path, final_path)
+            return final_path
+        except Exception as e:
+            # Un 404/403 no se arregla reintentando (salvo 408 y 429)
+            permanent = isinstance(e, urllib.error.HTTPError) and 400 <= e.code < 500 and e.code not in (408, 429)
+            if permanent or attempt == DOWNLOAD_RETRIES or isinstance(e, PipelineStopped):
+                raise
+            delay = RETRY_BASE_DELAY * 2 ** (attempt - 1)
+            print(f"⚠️ Falló la descarga de '{name}' (intento {attempt}/{DOWNLOAD_RETRIES}): {e}. Reintentando en {delay} s...")
+            shutdown_event.wait(delay)  # Como time.sleep, pero Ctrl+C la corta
+
+
+# ===========================
+# Etapa 2: CPU (conversión)
+# ===========================
+def record_failure(results, results_lock, name):
+    # Los fallos llegan de los hilos de conversión y del hilo principal a la vez
+    with results_lock:
+        results["fallidos"].append(name)
+
+
+def transcode_worker(transcode_queue, results, results_lock):
+    while not shutdown_event.is_set():
+        try:
+            job = transcode_queue.get(timeout=0.5)
+        except queue.Empty:
+            continue
+        if job is None:  # Señal de fin
+            break
+        name, local_path = job
+        output_path = os.path.join(OUTPUT_DIR, f"{name}.mp4")
+        temp_path = output_path + ".part"
+
+        print(f"🔄 Convirtiendo: {name}")
+        try:
+            metrics = run_ffmpeg(
+                ["-y", "-loglevel", "error", "-i", local_path, *TRANSCODE_ARGS,
+                 "-threads", str(THREADS_PER_TRANSCODE), "-f", "mp4", temp_path],
+                job_name=name,
+            )
+            os.replace(temp_path, output_path)
+            if not KEEP_DOWNLOADS:
+                os.remove(local_path)
+            with results_lock:
+                results["convertidos"] += 1
+            print(f"✅ Convertido: {name} ({metrics['wall_s']:.1f} s, {metrics['realtime_factor']}x)")
+        except Exception as e:
+            if shutdown_event.is_set():
+                break  # FFmpeg también recibió el Ctrl+C: se convierte en la próxima ejecución
+            record_failure(results, results_lock, name)
+            print(f"❌ ERROR al convertir '{name}': {e}")
+
+
+# ===========================
+# Ejecutar
+# ===========================
+if __name__ == "__main__":
+    print("\n🎬 INICIANDO PIPELINE DE DESCARGA Y OPTIMIZACIÓN...\n")
+
+    if not os.path.exists(input_file):
+        print(f"❌ ERROR: No se encontró '{input_file}'. Asegúrate de que el archivo existe en la misma carpeta que este script.")
+        exit(1)
+
+    with open(input_file, "r", encoding="utf-8") as file:
+        lines = [line.strip() for line in file if line.strip()]
+
+    jobs = []
+    for i in range(0, len(lines) - 1, 2):
+        name = format_filename(lines[i])
+        if not name:
+            continue
+        if os.path.exists(os.path.join(OUTPUT_DIR, f"{name}.mp4")):
+            print(f"⏭️ Ya convertido, se salta: {name}")
+            continue
+        jobs.append((name, lines[i + 1]))
+
+    if not jobs:
+        print("✅ No hay videos pendientes.")
+        exit(0)
+
+    os.makedirs(DOWNLOAD_DIR, exist_ok=True)
+    print(f"⚙️ {len(jobs)} videos | {MAX_DOWNLOADS} descargas y {TRANSCODE_WORKERS} conversiones en paralelo\n")
+
+    transcode_queue = queue.Queue()
+    results = {"convertidos": 0, "fallidos": []}
+    results_lock = threading.Lock()
+    # Hilos daemon: si algo se cuelga tras Ctrl+C, no impiden que el script termine
+    workers = [
+        threading.Thread(target=transcode_worker, args=(transcode_queue, results, results_lock), daemon=True)
+        for _ in range(TRANSCODE_WORKERS)
+    ]
+    for worker in workers:
+        worker.start()
+
+    interrupted = False
+    executor = ThreadPoolExecutor(max_workers=MAX_DOWNLOADS)
+    try:
+        # Cada descarga terminada pasa directo a la cola de conversión
+        futures = {executor.submit(download_with_retries, name, url): name for name, url in jobs}
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                local_path = future.result()
+                print(f"⬇️ Descargado: {name}")
+                transcode_queue.put((name, local_path))
+            except Exception as e:
+                record_failure(results, results_lock, name)
+                print(f"❌ ERROR al descargar '{name}': {e}")
+
+        for _ in workers:
+            transcode_queue.put(None)
+        for worker in workers:
+            worker.join()
+    except KeyboardInterrupt:
+        interrupted = True
+        shutdown_event.set()
+        print("\n⏸️ Interrumpido. Deteniendo descargas y conversiones...")
+        # Las descargas en curso paran en el siguiente bloque; las que no empezaron se cancelan
+        executor.shutdown(wait=True, cancel_futures=True)
+    finally:
+        executor.shutdown(wait=True)
+
+    print(f"\n📊 Convertidos: {results['convertidos']} | Fallidos: {len(results['fallidos'])}")
+    for name in results["fallidos"]:
+        print(f"   - {name}")
+    if interrupted:
+        print("\n⏸️ PIPELINE INTERRUMPIDO. Vuelve a ejecutarlo para continuar (las descargas a medias se reanudan).\n")
+    else:
+        print("\n✅ PIPELINE FINALIZADO.\n")
@@ -0,0 +1,268 @@
+import csv
+import os
+import re
+import subprocess
+import tempfile
+
+from ffmpeg_runner import run_ffmpeg
+
+# ========================== HEADER ==========================
+#  Script: Benchmark de Presets/CRF de Codificadores con FFmpeg
+#  Descripción:
+#      Los scripts de video usan valores fijos ('-preset veryslow',
+#      '-preset slow', CRF 23/28, VP9 CRF 30) sin mediciones detrás.
+#      Este script toma un clip de muestra y prueba combinaciones de
+#      códec/preset/CRF para decidir con datos.
+#
+#  Funcionalidades:
+#      - Detecta qué codificadores tiene tu FFmpeg (libx264, libx265,
+#        libvpx-vp9, libsvtav1, libaom-av1) y prueba solo esos.
+#      - Mide por combinación: tiempo de codificación, FPS de codificación,
+#        tiempo de CPU, tamaño de salida, bitrate (sobre la duración realmente
+#        codificada, por si el clip dura menos que SAMPLE_SECONDS) y calidad objetiva con los filtros
+#        integrados 'ssim' y 'psnr' de FFmpeg (comparando contra el original).
+#      - Guarda todo en 'benchmark_presets.csv'.
+#      - Sugiere los ajustes óptimos de Pareto (más rápido y más pequeño a la
+#        vez, sin que otro ajuste gane en ambos) para cada objetivo de
+#        calidad (SSIM mínimo).
+#
+#  Uso:
+#      1. Ajusta SAMPLE_CLIP con la ruta de un clip representativo.
+#      2. Ejecuta: python ffmpeg_preset_benchmark.py
+#      3. Revisa la tabla sugerida y el CSV.
+# ============================================================
+
+# ----------------- ⚙️ CONFIGURACIÓN -----------------
+script_dir = os.path.dirname(os.path.abspath(__file__))
+
+SAMPLE_CLIP = os.path.join(script_dir, "muestra.mp4")
+SAMPLE_SECONDS = 30            # Solo se codifican los primeros N segundos
+OUTPUT_CSV = os.path.join(script_dir, "benchmark_presets.csv")
+
+# Objetivos de calidad (SSIM mínimo) para las sugerencias
+QUALITY_TARGETS = [0.95, 0.97, 0.98]
+
+# Combinaciones a probar por códec.
+# 'preset_flag' es la opción que controla la velocidad en cada codificador.
+SWEEP = {
+    "libx264": {
+        "preset_flag": "-preset",
+        "presets": ["veryfast", "medium", "slow", "veryslow"],
+        "crfs": [23, 28],
+        "extra": [],
+    },
+    "libx265": {
+        "preset_flag": "-preset",
+        "presets": ["fast", "medium", "slow"],
+        "crfs": [23, 28],
+        "extra": [],
+    },
+    "libvpx-vp9": {
+        "preset_flag": "-cpu-used",
+        "presets": ["4", "2", "0"],
+        "crfs": [30, 36],
+        "extra": ["-b:v", "0", "-deadline", "good", "-row-mt", "1"],
+    },
+    "libsvtav1": {
+        "preset_flag": "-preset",
+        "presets": ["10", "8", "6"],
+        "crfs": [30, 38],
+        "extra": [],
+    },
+    "libaom-av1": {
+        "preset_flag": "-cpu-used",
+        "presets": ["8", "6", "4"],
+        "crfs": [30, 38],
+        "extra": ["-b:v", "0", "-row-mt", "1"],
+    },
+}
+
+CSV_FIELDS = ["codec", "preset", "crf", "encode_s", "encode_fps", "duration_s", "size_bytes", "kbps", "ssim", "psnr", "cpu_s"]
+# ----------------------------------------------------
+
+
+# ===========================
+# Verificar FFmpeg y codificadores disponibles
+# ===========================
+def get_available_encoders():
+    try:
+        result = subprocess.run(
+            ["ffmpeg", "-hide_banner", "-encoders"],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            check=True
+        )
+    except FileNotFoundError:
+        print("FFmpeg no está instalado o no está en el PATH. Instálalo para continuar.")
+        exit(1)
+    # Formato de cada línea: " V....D libx264    libx264 H.264 / AVC ..."
+    return {parts[1] for parts in (line.split() for line in result.stdout.splitlines()) if len(parts) > 1}
+
+
+def probe_duration(path):
+    """Duración en segundos según ffprobe (None si no se puede leer)."""
+    try:
+        result = subprocess.run(
+            ["ffprobe", "-v", "quiet", "-show_entries", "format=duration", "-of", "csv=p=0", path],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            check=True
+        )
+        return float(result.stdout.strip())
+    except (subprocess.CalledProcessError, ValueError):
+        return None
+
+
+def encoded_duration(metrics, output_file):
+    """
+    Segundos realmente codificados: el último out_time del progreso de FFmpeg o, si no está,
+    la duración del archivo según ffprobe. Un clip más corto que SAMPLE_SECONDS da menos.
+    """
+    if metrics.get("out_time_s"):
+        return metrics["out_time_s"]
+    return probe_duration(output_file) or SAMPLE_SECONDS
+
+
+# ===========================
+# Codificar y medir calidad
+# ===========================
+def encode(codec, preset, crf, output_file):
+    """Codifica el clip de muestra (solo video) y devuelve las métricas del trabajo."""
+    settings = SWEEP[codec]
+    args = [
+        "-y", "-loglevel", "error",
+        "-t", str(SAMPLE_SECONDS),
+        "-i", SAMPLE_CLIP,
+        "-an",
+        "-c:v", codec,
+        settings["preset_flag"], preset,
+        "-crf", str(crf),
+        *settings["extra"],
+        output_file,
+    ]
+    return run_ffmpeg(args, job_name=f"benchmark_{codec}_{preset}_crf{crf}", media_s=SAMPLE_SECONDS)
+
+
+def measure_quality(encoded_file):
+    """Compara el archivo codificado contra el original con SSIM y PSNR."""
+    # Ambas entradas se normalizan a la misma base de tiempo antes de comparar
+    filter_graph = (
+        "[0:v]settb=AVTB,setpts=PTS-STARTPTS,split[e1][e2];"
+        "[1:v]settb=AVTB,setpts=PTS-STARTPTS,split[r1][r2];"
+        "[e1][r1]ssim;[e2][r2]psnr"
+    )
+    result = subprocess.run(
+        ["ffmpeg", "-nostdin", "-hide_banner",
+         "-i", encoded_file,
+         "-t", str(SAMPLE_SECONDS), "-i", SAMPLE_CLIP,
+         "-lavfi", filter_graph, "-f", "null", "-"],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        check=True
+    )
+    ssim_match = re.search(r"SSIM .*All:([\d.]+)", result.stderr)
+    psnr_match = re.search(r"PSNR .*average:([\d.]+|inf)", result.stderr)
+    ssim = float(ssim_match.group(1)) if ssim_match else None
+    psnr = float(psnr_match.group(1)) if psnr_match else None
+    return ssim, psnr
+
+
+# ===========================
+# Frente de Pareto
+# ===========================
+def pareto_front(rows):
+    """Filas que ninguna otra supera a la vez en velocidad (fps) y bitrate (kbps: tamaño por segundo codificado)."""
+    front = []
+    for row in rows:
+        dominated = any(
+            other["encode_fps"] >= row["encode_fps"] and other["kbps"] <= row["kbps"]
+            and (other["encode_fps"] > row["encode_fps"] or other["kbps"] < row["kbps"])
+            for other in rows
+        )
+        if not dominated:
+            front.append(row)
+    return sorted(front, key=lambda r: r["kbps"])
+
+
+def print_suggestions(results):
+    for target in QUALITY_TARGETS:
+        candidates = [r for r in results if r["ssim"] is not None and r["ssim"] >= target]
+        print(f"\n🎯 Objetivo SSIM >= {target}:")
+        if not candidates:
+            print("   (ninguna combinación alcanza esta calidad)")
+            continue
+        for row in pareto_front(candidates):
+            print(f"   {row['codec']:<11} preset={row['preset']:<9} crf={row['crf']:<3} "
+                  f"{row['encode_fps']:>7.1f} fps  {row['kbps']:>7.0f} kbps  SSIM={row['ssim']:.4f}")
+
+
+# ===========================
+# Ejecutar
+# ===========================
+if __name__ == "__main__":
+    if not os.path.isfile(SAMPLE_CLIP):
+        print(f"❌ ERROR: No se encontró el clip de muestra '{SAMPLE_CLIP}'.")
+        exit(1)
+
+    available = get_available_encoders()
+    codecs = [codec for codec in SWEEP if codec in available]
+    skipped = [codec for codec in SWEEP if codec not in available]
+    if skipped:
+        print(f"⚠️ Codificadores no disponibles en este FFmpeg (se omiten): {', '.join(skipped)}")
+    if not codecs:
+        print("❌ ERROR: Ningún codificador del barrido está disponible.")
+        exit(1)
+
+    total_runs = sum(len(SWEEP[c]["presets"]) * len(SWEEP[c]["crfs"]) for c in codecs)
+    print(f"\n🧪 INICIANDO BENCHMARK: {total_runs} combinaciones sobre {SAMPLE_SECONDS} s de '{os.path.basename(SAMPLE_CLIP)}'\n")
+
+    results = []
+    run = 0
+    with tempfile.TemporaryDirectory() as temp_dir, open(OUTPUT_CSV, "w", newline="", encoding="utf-8") as csv_file:
+        writer = csv.DictWriter(csv_file, fieldnames=CSV_FIELDS)
+        writer.writeheader()
+
+        for codec in codecs:
+            extension = "webm" if codec == "libvpx-vp9" else "mkv"
+            for preset in SWEEP[codec]["presets"]:
+                for crf in SWEEP[codec]["crfs"]:
+                    run += 1
+                    output_file = os.path.join(temp_dir, f"{codec}_{preset}_{crf}.{extension}")
+                    print(f"[{run}/{total_runs}] {codec} preset={preset} crf={crf}...", end=" ", flush=True)
+                    try:
+                        metrics = encode(codec, preset, crf, output_file)
+                        encode_s = metrics["wall_s"]
+                        frames = metrics["frames"] or 0
+                        size_bytes = os.path.getsize(output_file)
+                        # El bitrate se calcula con lo codificado, no con SAMPLE_SECONDS (clips cortos)
+                        duration_s = encoded_duration(metrics, output_file)
+                        ssim, psnr = measure_quality(output_file)
+                    except subprocess.CalledProcessError as e:
+                        print(f"❌ falló ({e})")
+                        continue
+
+                    row = {
+                        "codec": codec,
+                        "preset": preset,
+                        "crf": crf,
+                        "encode_s": round(encode_s, 2),
+                        "encode_fps": round(frames / encode_s, 2) if encode_s > 0 else 0.0,
+                        "duration_s": round(duration_s, 3),
+                        "size_bytes": size_bytes,
+                        "kbps": round(size_bytes * 8 / 1000 / duration_s, 1),
+                        "ssim": ssim,
+                        "psnr": psnr,
+                        "cpu_s": metrics["cpu_s"],
+                    }
+                    results.append(row)
+                    writer.writerow(row)
+                    csv_file.flush()
+                    os.remove(output_file)
+                    print(f"{row['encode_fps']} fps, {row['kbps']} kbps, SSIM={ssim}")
+
+    print(f"\n💾 Resultados guardados en: {OUTPUT_CSV}")
+    print_suggestions(results)
+    print("\n✅ BENCHMARK FINALIZADO.\n")
@@ -0,0 +1,171 @@
+import collections
+import json
+import os
+import subprocess
+import threading
+import time
+
+try:
+    import psutil  # Opcional: medir tiempo de CPU en Windows
+except ImportError:
+    psutil = None
+
+# ========================== HEADER ==========================
+#  Módulo: Ejecutor de FFmpeg con Progreso Estructurado
+#  Descripción:
+#      Ejecutor compartido para los scripts de video. En lugar de imprimir
+#      el stderr crudo de FFmpeg (o mandarlo a DEVNULL), lanza FFmpeg con
+#      '-progress pipe:1 -nostats', interpreta en tiempo real los bloques
+#      'clave=valor' (frame, fps, out_time, total_size, speed) y al final
+#      guarda una línea JSON con las métricas del trabajo.
+#
+#  Métricas por trabajo (una línea JSON en METRICS_FILE):
+#      job, returncode, wall_s, media_s, out_time_s, frames, avg_fps,
+#      speed, realtime_factor, bytes_written, cpu_user_s, cpu_system_s, cpu_s
+#
+#  Uso desde otro script de esta carpeta:
+#      from ffmpeg_runner import run_ffmpeg
+#      metrics = run_ffmpeg(["-i", entrada, "-c:v", "libx264", salida],
+#                           job_name="episodio_01", media_s=duracion)
+# ============================================================
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+METRICS_FILE = os.path.join(script_dir, "metricas_ffmpeg.jsonl")
+
+# Varias colas pueden escribir métricas al mismo tiempo
+_metrics_lock = threading.Lock()
+
+
+def parse_progress_value(key, value):
+    """Convierte un valor de '-progress' a número cuando tiene sentido."""
+    if value in ("N/A", ""):
+        return None
+    if key in ("frame", "total_size", "out_time_us", "out_time_ms", "dup_frames", "drop_frames"):
+        return int(value)
+    if key == "fps":
+        return float(value)
+    if key == "speed":
+        return float(value.rstrip("x"))
+    return value
+
+
+def iter_progress_blocks(stream):
+    """Agrupa las líneas 'clave=valor' de '-progress' en un dict por bloque."""
+    block = {}
+    for line in stream:
+        key, sep, value = line.strip().partition("=")
+        if not sep:
+            continue
+        try:
+            block[key] = parse_progress_value(key, value)
+        except ValueError:
+            block[key] = value
+        # Cada bloque termina con 'progress=continue' o 'progress=end'
+        if key == "progress":
+            yield block
+            block = {}
+
+
+def append_metrics(metrics, metrics_file=METRICS_FILE):
+    with _metrics_lock:
+        with open(metrics_file, "a", encoding="utf-8") as f:
+            f.write(json.dumps(metrics, ensure_ascii=False) + "\n")
+
+
+def run_ffmpeg(args, job_name, media_s=None, metrics_file=METRICS_FILE, on_progress=None, check=True):
+    """
+    Ejecuta 'ffmpeg <args>' leyendo el progreso estructurado.
+
+    - args: lista de argumentos SIN el 'ffmpeg' inicial.
+    - media_s: duración del video de entrada (para el % de avance); opcional.
+    - on_progress: función opcional que recibe cada bloque de progreso.
+    - check: si es True, lanza CalledProcessError cuando FFmpeg falla.
+
+    Devuelve el dict de métricas que también se guarda en metrics_file
+    (usa metrics_file=None para no guardarlo).
+    """
+    command = ["ffmpeg", "-nostdin", "-progress", "pipe:1", "-nostats", *args]
+
+    start_wall = time.time()
+    process = subprocess.Popen(
+        command,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        encoding="utf-8",
+        errors="replace",
+    )
+
+    # stderr se vacía en otro hilo para que FFmpeg nunca se bloquee;
+    # solo se guardan las últimas líneas para reportar errores.
+    stderr_tail = collections.deque(maxlen=20)
+    stderr_thread = threading.Thread(target=stderr_tail.extend, args=(process.stderr,), daemon=True)
+    stderr_thread.start()
+
+    ps_process = psutil.Process(process.pid) if psutil and not hasattr(os, "wait4") else None
+    cpu_times = None
+
+    last = {}
+    for block in iter_progress_blocks(process.stdout):
+        last = block
+        if ps_process:
+            try:
+                cpu_times = ps_process.cpu_times()
+            except psutil.Error:
+                pass
+        if on_progress:
+            on_progress(block)
+
+    if hasattr(os, "wait4"):
+        # POSIX: wait4 devuelve el uso de CPU exacto de ESTE proceso hijo
+        _, status, rusage = os.wait4(process.pid, 0)
+        process.returncode = os.waitstatus_to_exitcode(status)
+        cpu_user_s, cpu_system_s = rusage.ru_utime, rusage.ru_stime
+    else:
+        process.wait()
+        cpu_user_s, cpu_system_s = (cpu_times.user, cpu_times.system) if cpu_times else (None, None)
+    stderr_thread.join()
+
+    wall_s = time.time() - start_wall
+    out_time_us = last.get("out_time_us")
+    out_time_s = out_time_us / 1_000_000 if out_time_us is not None else None
+    frames = last.get("frame")
+
+    metrics = {
+        "job": job_name,
+        "returncode": process.returncode,
+        "started_at": round(start_wall, 3),
+        "wall_s": round(wall_s, 3),
+        "media_s": media_s,
+        "out_time_s": out_time_s,
+        "frames": frames,
+        "avg_fps": round(frames / wall_s, 2) if frames and wall_s > 0 else None,
+        "speed": last.get("speed"),
+        "realtime_factor": round(out_time_s / wall_s, 3) if out_time_s and wall_s > 0 else None,
+        "bytes_written": last.get("total_size"),
+        "cpu_user_s": round(cpu_user_s, 3) if cpu_user_s is not None else None,
+        "cpu_system_s": round(cpu_system_s, 3) if cpu_system_s is not None else None,
+        "cpu_s": round(cpu_user_s + cpu_system_s, 3) if cpu_user_s is not None else None,
+    }
+    if process.returncode != 0:
+        metrics["error"] = "".join(stderr_tail).strip()[-500:]
+
+    if metrics_file:
+        append_metrics(metrics, metrics_file)
+
+    if check and process.returncode != 0:
+        raise subprocess.CalledProcessError(process.returncode, command, stderr=metrics["error"])
+    return metrics
+
+
+def print_progress_line(job_name, media_s=None):
+    """Crea un callback on_progress que muestra una línea de estado compacta."""
+    def on_progress(block):
+        out_time_us = block.get("out_time_us") or 0
+        percent = f"{out_time_us / 1_000_000 / media_s * 100:5.1f}%" if media_s else "  ?  "
+        speed = block.get("speed")
+        print(f"\r⏳ {job_name}: {percent} | frame {block.get('frame')} | "
+              f"{block.get('fps')} fps | {speed if speed is not None else '?'}x", end="", flush=True)
+        if block.get("progress") == "end":
+            print()
+    return on_progress
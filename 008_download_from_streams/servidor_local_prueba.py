@@ -0,0 +1,103 @@
+import os
+import re
+import time
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+# ========================== HEADER ==========================
+#  Script: Servidor HTTP/HLS Local para Pruebas
+#  Descripción:
+#      Sirve una carpeta por HTTP para probar
+#      'download_from_stream_ffmpeg_02_pipeline.py' sin internet.
+#
+#  Funcionalidades:
+#      - Soporta la cabecera 'Range' (respuestas 206), así se puede probar
+#        la reanudación de descargas cortando el servidor a la mitad.
+#      - Sirve listas HLS (.m3u8 + segmentos .ts) con el tipo MIME correcto.
+#      - Limita la velocidad (BYTES_PER_SECOND) para simular una red lenta.
+#
+#  Uso:
+#      1. Coloca videos (o una carpeta HLS) dentro de 'servidor_prueba/'.
+#         Una lista HLS de prueba se puede crear con:
+#         > ffmpeg -i clip.mp4 -c copy -f hls -hls_time 4 -hls_list_size 0 servidor_prueba/clip.m3u8
+#      2. Ejecuta: python servidor_local_prueba.py
+#      3. En 'videos.txt' usa URLs como:
+#         Episodio 1 de la temporada 1: Prueba HTTP
+#         http://127.0.0.1:8000/clip.mp4
+#         Episodio 2 de la temporada 1: Prueba HLS
+#         http://127.0.0.1:8000/clip.m3u8
+# ============================================================
+
+# ----------------- ⚙️ CONFIGURACIÓN -----------------
+script_dir = os.path.dirname(os.path.abspath(__file__))
+SERVE_DIR = os.path.join(script_dir, "servidor_prueba")
+HOST = "127.0.0.1"
+PORT = 8000
+BYTES_PER_SECOND = 2 * 1024 * 1024  # 0 = sin límite
+# ----------------------------------------------------
+
+
+class RangeRequestHandler(SimpleHTTPRequestHandler):
+    """SimpleHTTPRequestHandler con soporte de Range y velocidad limitada."""
+
+    extensions_map = {
+        **SimpleHTTPRequestHandler.extensions_map,
+        ".m3u8": "application/vnd.apple.mpegurl",
+        ".ts": "video/mp2t",
+    }
+
+    def send_head(self):
+        self.range_length = None
+        range_header = self.headers.get("Range")
+        path = self.translate_path(self.path)
+        match = re.match(r"bytes=(\d+)-(\d*)$", range_header or "")
+        if not match or not os.path.isfile(path):
+            return super().send_head()
+
+        size = os.path.getsize(path)
+        start = int(match.group(1))
+        end = min(int(match.group(2)), size - 1) if match.group(2) else size - 1
+        if start >= size:
+            self.send_response(416)
+            self.send_header("Content-Range", f"bytes */{size}")
+            self.end_headers()
+            return None
+
+        f = open(path, "rb")
+        f.seek(start)
+        self.range_length = end - start + 1
+
+        self.send_response(206)
+        self.send_header("Content-Type", self.guess_type(path))
+        self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        self.send_header("Content-Length", str(self.range_length))
+        self.send_header("Accept-Ranges", "bytes")
+        self.end_headers()
+        return f
+
+    def copyfile(self, source, outputfile):
+        remaining = self.range_length
+        chunk_size = 64 * 1024
+        while remaining is None or remaining > 0:
+            to_read = chunk_size if remaining is None else min(chunk_size, remaining)
+            chunk = source.read(to_read)
+            if not chunk:
+                break
+            outputfile.write(chunk)
+            if remaining is not None:
+                remaining -= len(chunk)
+            if BYTES_PER_SECOND:
+                time.sleep(len(chunk) / BYTES_PER_SECOND)
+
+
+if __name__ == "__main__":
+    os.makedirs(SERVE_DIR, exist_ok=True)
+    handler = partial(RangeRequestHandler, directory=SERVE_DIR)
+    server = ThreadingHTTPServer((HOST, PORT), handler)
+    print(f"🌐 Sirviendo '{SERVE_DIR}' en http://{HOST}:{PORT}/ (Ctrl+C para detener)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n🛑 Servidor detenido.")
+    finally:
+        server.server_close()
@@ -0,0 +1,331 @@
+import os
+import signal
+import sqlite3
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from ffmpeg_runner import run_ffmpeg
+
+# ========================== HEADER ==========================
+#  Script: Cola de Compresión Paralela y Reanudable con FFmpeg
+#  Descripción:
+#      Versión por lotes de 'video_batch_compress.py' (y del convertidor de
+#      006_convertir_avis). En lugar de recorrer la carpeta en serie, mete
+#      cada video en una cola y codifica varios archivos al mismo tiempo.
+#
+#  Funcionalidades:
+#      - Codifica MAX_PARALLEL_JOBS archivos en paralelo, repartiendo los
+#        hilos del CPU entre los trabajos (THREADS_PER_JOB).
+#      - Guarda el estado de cada archivo (pending/running/done/failed) en
+#        un diario SQLite ('cola_compresion.sqlite') junto al script.
+#      - Si el proceso se interrumpe, al volver a ejecutarlo continúa donde
+#        se quedó: los trabajos 'running' vuelven a 'pending' y los 'done'
+#        no se repiten.
+#      - Escribe primero a un archivo temporal '.part' con '-y' y lo renombra
+#        al terminar, así nunca queda un archivo a medias marcado como listo
+#        y FFmpeg no se detiene a preguntar si sobrescribe.
+#      - Muestra el rendimiento: archivos/hora y factor de tiempo real
+#        (segundos de video procesados por segundo de reloj).
+#      - Cada trabajo deja sus métricas (velocidad, bytes, CPU) en
+#        'metricas_ffmpeg.jsonl' a través de ffmpeg_runner.py.
+#
+#  Uso:
+#      1. Coloca este script en la carpeta con los videos (o ajusta INPUT_DIR).
+#      2. Elige el perfil de FFmpeg en PERFIL ("008" o "006").
+#      3. Ejecuta: python video_batch_compress_02_cola_paralela.py
+#      4. Si se corta la luz o cierras la terminal, vuelve a ejecutarlo.
+# ============================================================
+
+# ----------------- ⚙️ CONFIGURACIÓN -----------------
+script_dir = os.path.dirname(os.path.abspath(__file__))
+
+INPUT_DIR = script_dir
+OUTPUT_DIR = os.path.join(script_dir, "comprimidos")
+JOURNAL_FILE = os.path.join(script_dir, "cola_compresion.sqlite")
+
+# Número de videos que se codifican al mismo tiempo.
+# libx264 no escala bien más allá de ~8-16 hilos por proceso, así que para
+# aprovechar toda la máquina conviene tener varios trabajos en paralelo.
+CPU_COUNT = os.cpu_count() or 2
+MAX_PARALLEL_JOBS = max(1, CPU_COUNT // 4)
+THREADS_PER_JOB = max(1, CPU_COUNT // MAX_PARALLEL_JOBS)
+
+# Volver a intentar los archivos que fallaron en una ejecución anterior
+RETRY_FAILED = True
+
+# Perfiles de codificación (los mismos parámetros de los scripts originales)
+PERFILES = {
+    # video_batch_compress.py / download_from_stream_ffmpeg_01.py
+    "008": {
+        "extensiones": (".mp4",),
+        "sufijo": "_compressed",
+        "argumentos": [
+            "-vf", "scale=1280:720",
+            "-c:v", "libx264", "-crf", "23", "-preset", "slow",
+            "-b:v", "1200k", "-maxrate", "1400k", "-bufsize", "2800k",
+            "-r", "23.98",
+            "-c:a", "aac", "-b:a", "96k", "-ac", "2", "-ar", "44100",
+        ],
+    },
+    # 006_convertir_avis/convert_flv_and_mp4_01.py
+    "006": {
+        "extensiones": (".flv", ".mp4"),
+        "sufijo": "",
+        "argumentos": [
+            "-c:v", "libx264", "-preset", "veryslow", "-crf", "28",
+            "-c:a", "aac", "-b:a", "48k", "-ar", "22050", "-ac", "1",
+            "-movflags", "+faststart",
+        ],
+    },
+}
+PERFIL = "008"
+# ----------------------------------------------------
+
+# Se activa con Ctrl+C: los trabajos que se cortan vuelven a 'pending' en vez de 'failed'
+stop_event = threading.Event()
+
+# FFmpeg sale con 255 cuando recibe una señal (Ctrl+C); -SIGINT si el sistema lo mató antes
+INTERRUPTED_RETURNCODES = (255, -signal.SIGINT)
+
+
+# ===========================
+# Diario de trabajos (SQLite)
+# ===========================
+class JobJournal:
+    """Guarda el estado de cada archivo de la cola en una base SQLite."""
+
+    def __init__(self, path):
+        # Un solo objeto conexión compartido entre hilos, protegido con un lock
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                input_path   TEXT PRIMARY KEY,
+                output_path  TEXT NOT NULL,
+                status       TEXT NOT NULL DEFAULT 'pending',
+                attempts     INTEGER NOT NULL DEFAULT 0,
+                media_s      REAL,
+                elapsed_s    REAL,
+                started_at   REAL,
+                finished_at  REAL,
+                error        TEXT
+            )
+        """)
+        self.conn.commit()
+
+    def register(self, input_path, output_path):
+        """Agrega un archivo a la cola. Devuelve False si otro archivo ya tiene esa salida."""
+        with self.lock:
+            owner = self.conn.execute(
+                "SELECT input_path FROM jobs WHERE output_path = ? AND input_path != ?",
+                (output_path, input_path),
+            ).fetchone()
+            if owner:
+                return False
+            self.conn.execute(
+                "INSERT OR IGNORE INTO jobs (input_path, output_path) VALUES (?, ?)",
+                (input_path, output_path),
+            )
+            self.conn.commit()
+            return True
+
+    def recover(self, retry_failed):
+        """Prepara la cola después de una interrupción."""
+        with self.lock:
+            # Lo que estaba corriendo cuando se cortó el proceso se repite
+            self.conn.execute("UPDATE jobs SET status = 'pending' WHERE status = 'running'")
+            if retry_failed:
+                self.conn.execute("UPDATE jobs SET status = 'pending', error = NULL WHERE status = 'failed'")
+            # Un 'done' cuyo archivo de salida ya no existe se vuelve a codificar
+            for input_path, output_path in self.conn.execute(
+                "SELECT input_path, output_path FROM jobs WHERE status = 'done'"
+            ).fetchall():
+                if not os.path.exists(output_path):
+                    self.conn.execute("UPDATE jobs SET status = 'pending' WHERE input_path = ?", (input_path,))
+            self.conn.commit()
+
+    def pending(self):
+        with self.lock:
+            return self.conn.execute(
+                "SELECT input_path, output_path FROM jobs WHERE status = 'pending' ORDER BY input_path"
+            ).fetchall()
+
+    def mark_running(self, input_path):
+        with self.lock:
+            self.conn.execute(
+                "UPDATE jobs SET status = 'running', attempts = attempts + 1, started_at = ? WHERE input_path = ?",
+                (time.time(), input_path),
+            )
+            self.conn.commit()
+
+    def mark_finished(self, input_path, status, media_s=None, elapsed_s=None, error=None):
+        with self.lock:
+            self.conn.execute(
+                "UPDATE jobs SET status = ?, media_s = ?, elapsed_s = ?, finished_at = ?, error = ? WHERE input_path = ?",
+                (status, media_s, elapsed_s, time.time(), error, input_path),
+            )
+            self.conn.commit()
+
+    def counts(self):
+        with self.lock:
+            rows = self.conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return dict(rows)
+
+    def close(self):
+        self.conn.close()
+
+
+# ===========================
+# Utilidades de FFmpeg
+# ===========================
+def get_video_duration(input_file):
+    """Duración del video en segundos (0.0 si ffprobe no la puede leer)."""
+    try:
+        result = subprocess.run(
+            ["ffprobe", "-i", input_file, "-show_entries", "format=duration", "-v", "quiet", "-of", "csv=p=0"],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            check=True
+        )
+        return float(result.stdout.strip())
+    except (subprocess.CalledProcessError, ValueError):
+        return 0.0
+
+
+def build_ffmpeg_args(input_path, temp_path, perfil):
+    # ffmpeg_runner ya añade '-nostdin' y el progreso estructurado
+    return [
+        "-y",                      # El temporal siempre se puede sobrescribir
+        "-loglevel", "error",      # Con varios trabajos a la vez, solo errores
+        "-i", input_path,
+        *perfil["argumentos"],
+        "-threads", str(THREADS_PER_JOB),
+        "-f", "mp4",               # El '.part' no tiene extensión conocida
+        temp_path,
+    ]
+
+
+def encode_job(input_path, output_path, journal, perfil):
+    """Codifica un archivo y actualiza el diario. Devuelve (media_s, elapsed_s)."""
+    if stop_event.is_set():
+        raise RuntimeError("cola detenida")
+    journal.mark_running(input_path)
+    temp_path = output_path + ".part"
+    media_s = get_video_duration(input_path)
+
+    metrics = run_ffmpeg(
+        build_ffmpeg_args(input_path, temp_path, perfil),
+        job_name=os.path.basename(input_path),
+        media_s=media_s,
+        check=False,
+    )
+    elapsed_s = metrics["wall_s"]
+
+    if metrics["returncode"] != 0:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        if stop_event.is_set() or metrics["returncode"] in INTERRUPTED_RETURNCODES:
+            # El Ctrl+C también llega a FFmpeg: no es un fallo, se repite en la próxima ejecución
+            journal.mark_finished(input_path, "pending", media_s, elapsed_s)
+            raise RuntimeError("interrumpido")
+        error = metrics.get("error") or f"ffmpeg terminó con código {metrics['returncode']}"
+        journal.mark_finished(input_path, "failed", media_s, elapsed_s, error)
+        raise RuntimeError(error)
+
+    # Renombrado atómico: el archivo final solo aparece cuando está completo
+    os.replace(temp_path, output_path)
+    journal.mark_finished(input_path, "done", media_s, elapsed_s)
+    return media_s, elapsed_s
+
+
+def format_throughput(files_done, media_total, wall_elapsed):
+    if wall_elapsed <= 0:
+        return "sin datos"
+    files_per_hour = files_done / (wall_elapsed / 3600)
+    realtime_factor = media_total / wall_elapsed
+    return f"{files_per_hour:.1f} archivos/hora | factor tiempo real {realtime_factor:.2f}x"
+
+
+# ===========================
+# Ejecutar
+# ===========================
+if __name__ == "__main__":
+    if PERFIL not in PERFILES:
+        print(f"❌ ERROR: El perfil '{PERFIL}' no existe. Usa uno de: {', '.join(PERFILES)}")
+        exit(1)
+    perfil = PERFILES[PERFIL]
+
+    print("\n🎬 INICIANDO COLA DE COMPRESIÓN EN PARALELO...\n")
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+
+    journal = JobJournal(JOURNAL_FILE)
+
+    # Registrar los videos nuevos (los que ya están en el diario se ignoran)
+    video_files = sorted(f for f in os.listdir(INPUT_DIR) if f.lower().endswith(perfil["extensiones"]))
+    for video in video_files:
+        stem, extension = os.path.splitext(video)
+        input_path = os.path.join(INPUT_DIR, video)
+        output_filename = stem + perfil["sufijo"] + ".mp4"
+        if not journal.register(input_path, os.path.join(OUTPUT_DIR, output_filename)):
+            # 'x.flv' y 'x.mp4' darían el mismo 'x.mp4': el segundo lleva la extensión en el nombre
+            output_filename = f"{stem}_{extension[1:].lower()}{perfil['sufijo']}.mp4"
+            if not journal.register(input_path, os.path.join(OUTPUT_DIR, output_filename)):
+                print(f"⚠️ '{video}' no se encola: su salida choca con la de otro archivo.")
+                continue
+            print(f"⚠️ '{video}' comparte nombre con otro video: se guardará como '{output_filename}'.")
+
+    journal.recover(RETRY_FAILED)
+    jobs = journal.pending()
+
+    print(f"📋 Estado del diario: {journal.counts()}")
+    if not jobs:
+        print("✅ No hay trabajos pendientes. Todo está comprimido.")
+        journal.close()
+        exit(0)
+
+    print(f"⚙️ {len(jobs)} trabajos pendientes | {MAX_PARALLEL_JOBS} en paralelo | {THREADS_PER_JOB} hilos por trabajo")
+
+    files_done = 0
+    media_total = 0.0
+    wall_start = time.time()
+    interrupted = False
+
+    # Sin 'with': su __exit__ espera a TODOS los trabajos de la cola, incluso después de Ctrl+C
+    executor = ThreadPoolExecutor(max_workers=MAX_PARALLEL_JOBS)
+    try:
+        futures = {
+            executor.submit(encode_job, input_path, output_path, journal, perfil): input_path
+            for input_path, output_path in jobs
+        }
+        for future in as_completed(futures):
+            name = os.path.basename(futures[future])
+            try:
+                media_s, elapsed_s = future.result()
+                files_done += 1
+                media_total += media_s
+                speed = f"{media_s / elapsed_s:.2f}x" if elapsed_s > 0 else "?"
+                print(f"✅ {name} listo en {elapsed_s:.1f} s ({speed})")
+            except Exception as e:
+                print(f"❌ ERROR al comprimir '{name}': {e}")
+
+            print(f"   📈 {format_throughput(files_done, media_total, time.time() - wall_start)}")
+    except KeyboardInterrupt:
+        interrupted = True
+        stop_event.set()
+        print("\n⏸️ Interrumpido. Cancelando los trabajos en cola y esperando a que FFmpeg se detenga...")
+        # Los que no empezaron se cancelan; los que corrían vuelven a 'pending' (ver encode_job)
+        executor.shutdown(wait=True, cancel_futures=True)
+    finally:
+        executor.shutdown(wait=True)
+        final_counts = journal.counts()
+        print(f"\n📋 Estado final del diario: {final_counts}")
+        journal.close()
+
+    if interrupted:
+        print(f"\n⏸️ COLA DE COMPRESIÓN INTERRUMPIDA: {final_counts.get('pending', 0)} trabajos pendientes. "
+              f"Vuelve a ejecutar el script para continuar.\n")
+    else:
+        print("\n✅ COLA DE COMPRESIÓN FINALIZADA.\n")
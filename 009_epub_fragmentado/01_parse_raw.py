@@ -33,6 +33,8 @@
 
 import re
 
+from heading_index import HeadingStack, headings_path_for, marker_line, write_headings
+
 input_file = "raw_wikipedia.txt"
 output_file = "input.txt"
 
@@ -41,7 +43,7 @@ with open(input_file, "r", encoding="utf-8") as f:
     raw_lines = [line.strip() for line in f if line.strip()]
 
 output_lines = []
-current_levels = {}
+heading_stack = HeadingStack()
 
 # === Procesar cada línea ===
 for line in raw_lines:
@@ -59,14 +61,9 @@ for line in raw_lines:
         if match:
             level = int(match.group(1))
             title = match.group(2).strip()
-            current_levels[level] = title
-
-            for key in list(current_levels.keys()):
-                if key > level:
-                    del current_levels[key]
-
-            hierarchy = " > ".join(current_levels[i] for i in sorted(current_levels))
-            output_lines.append(f"[{hierarchy}]")
+            # La pila cierra los niveles más profundos y numera el encabezado (ver heading_index.py)
+            record = heading_stack.push(level, title)
+            output_lines.append(marker_line(record))
             output_lines.append("===")
 
     # --- Imágenes ---
@@ -206,4 +203,7 @@ for line in raw_lines:
 with open(output_file, "w", encoding="utf-8") as f:
     f.write("\n".join(output_lines))
 
+# Jerarquía de encabezados como datos estructurados (un registro por línea de marcador)
+write_headings(headings_path_for(output_file), heading_stack.records)
+
 print(f"✅ Done. Output saved to {output_file}")
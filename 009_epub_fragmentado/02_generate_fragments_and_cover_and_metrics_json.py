@@ -6,6 +6,9 @@ from pathlib import Path
 from math import ceil
 import json 
 
+from heading_index import open_headings, toc_group_key
+from xhtml_templates import HEADING_PAGE, IMAGE_PAGE, SENTENCE_PAGE, BufferedXhtml, escape_attr, escape_text
+
 # === CONFIGURATION ===
 input_file = "input.txt"
 output_folder = "xhtmls_sequences"
@@ -59,14 +62,15 @@ def escape_and_allow_html_tags(text):
     Escapa los caracteres HTML inseguros en el texto,
     pero permite que los tags <b>, </b>, <i>, </i> se interpreten como HTML.
     """
-    # 1. Escapar todo el texto para seguridad general.
-    escaped_text = html.escape(text, quote=False)
+    # 1. Escapar todo el texto para seguridad general (igual que html.escape con quote=False).
+    escaped_text = escape_text(text)
 
     # 2. Deshacer el escape SÓLO para los tags HTML que queremos permitir.
-    escaped_text = escaped_text.replace("&lt;b&gt;", "<b>")
-    escaped_text = escaped_text.replace("&lt;/b&gt;", "</b>")
-    escaped_text = escaped_text.replace("&lt;i&gt;", "<i>")
-    escaped_text = escaped_text.replace("&lt;/i&gt;", "</i>")
+    if "&lt;" in escaped_text:
+        escaped_text = escaped_text.replace("&lt;b&gt;", "<b>")
+        escaped_text = escaped_text.replace("&lt;/b&gt;", "</b>")
+        escaped_text = escaped_text.replace("&lt;i&gt;", "<i>")
+        escaped_text = escaped_text.replace("&lt;/i&gt;", "</i>")
     
     return escaped_text
 # =============================================================
@@ -80,18 +84,8 @@ def write_sentence_fragment(sentence_text, index, file_prefix, output_folder):
     
     sentence_to_write = sentence_text 
 
-    with open(filepath, "w", encoding="utf-8") as f:
-        f.write(f'''<?xml version="1.0" encoding="UTF-8"?>
-<html xmlns="http://www.w3.org/1999/xhtml" xml:lang="en">
-  <head>
-    <meta charset="UTF-8"/>
-    <title>Page {index}</title>
-    <link rel="stylesheet" href="../Styles/Style001.css" type="text/css"/>
-  </head>
-  <body>
-    <div class="centered">{escape_and_allow_html_tags(sentence_to_write)}</div>
-    </body>
-</html>''')
+    # Plantilla precompilada (xhtml_templates.py): mismo XHTML, una sola escritura
+    SENTENCE_PAGE.write(filepath, index=index, body=escape_and_allow_html_tags(sentence_to_write))
     return index + 1
 # =============================================================
 
@@ -172,6 +166,7 @@ for i, line in enumerate(lines):
         break
 
 content_lines = lines[content_start:]
+headings = open_headings(input_file)  # headings.jsonl escrito por 01_parse_raw.py
 
 # === 1. BLOQUE DE CÁLCULO DE MÉTRICAS (NUEVO) ===
 total_sentences = 0
@@ -259,33 +254,18 @@ for line in content_lines:
                 counter = write_sentence_fragment(sentence_to_write, counter, file_prefix, output_folder)
             paragraph_buffer = []
 
-        section_title = line[1:-1]
-        level_titles = section_title.split(" > ")
-        current_level = len(level_titles)
-        tag = min(current_level + 1, 6) 
-        current_title = level_titles[-1]
+        heading = headings.next(line)
+        level_titles = heading["path"]
+        tag = min(heading["depth"] + 1, 6) 
+        current_title = heading["title"]
         
-        # CORRECCIÓN DE SINTAXIS: Se corrige la etiqueta de cierre de h{tag}
-        html_heading = f"<h{tag}>{html.escape(current_title)}</h{tag}>" 
-
+        # <title> y <h{tag}> llevan el mismo título escapado (plantilla HEADING_PAGE)
         filename = f"{file_prefix}_{str(counter).zfill(4)}.xhtml"
-        with open(os.path.join(output_folder, filename), "w", encoding="utf-8") as f:
-            f.write(f'''<?xml version="1.0" encoding="UTF-8"?>
-<html xmlns="http://www.w3.org/1999/xhtml" xml:lang="en">
-  <head>
-    <meta charset="UTF-8"/>
-    <title>{html.escape(current_title)}</title>
-    <link rel="stylesheet" href="../Styles/Style001.css" type="text/css"/>
-  </head>
-  <body>
-    <div class="context">
-      {html_heading}
-    </div>
-  </body>
-</html>''')
+        HEADING_PAGE.write(os.path.join(output_folder, filename), title=escape_attr(current_title), tag=tag)
         toc_entries.append({
             "levels": level_titles, # Se guarda la ruta de jerarquía completa
-            "file": filename
+            "file": filename,
+            "ids": heading["ids"] # Ids numéricos de la ruta (heading_index.py)
         })
         counter += 1
 
@@ -308,27 +288,9 @@ for line in content_lines:
             if not os.path.isfile(image_path):
                 missing_images.append(img_file)
 
-            alt_text_clean = html.escape(alt_text)
-            alt_caption = html.escape(alt_text)
-
+            # El texto alternativo se usa en alt="" y en <figcaption> (plantilla IMAGE_PAGE)
             filename = f"{file_prefix}_{str(counter).zfill(4)}.xhtml"
-            with open(os.path.join(output_folder, filename), "w", encoding="utf-8") as f:
-                f.write(f'''<?xml version="1.0" encoding="UTF-8"?>
-<html xmlns="http://www.w3.org/1999/xhtml" xml:lang="en">
-  <head>
-    <meta charset="UTF-8"/>
-    <title>Image: {html.escape(img_file)}</title>
-    <link rel="stylesheet" href="../Styles/Style001.css" type="text/css"/>
-  </head>
-  <body>
-    <div class="image-page">
-      <figure>
-        <img src="../Images/{html.escape(img_file)}" alt="{alt_text_clean}" />
-        <figcaption>{alt_caption}</figcaption>
-      </figure>
-    </div>
-  </body>
-</html>''')
+            IMAGE_PAGE.write(os.path.join(output_folder, filename), file=escape_attr(img_file), alt=escape_attr(alt_text))
             counter += 1
         except Exception as e:
             print(f"⚠️ Error processing image line: {line}\n{e}")
@@ -370,7 +332,8 @@ def write_toc(f, entries, depth=0):
     current_level = {}
     for entry in entries:
         if len(entry["levels"]) > depth:
-            key = entry["levels"][depth]
+            # Agrupado por id (heading_index.py): secciones hermanas con el mismo título no se mezclan
+            key = toc_group_key(entry, depth)
             if key not in current_level:
                 current_level[key] = []
             current_level[key].append(entry)
@@ -380,8 +343,9 @@ def write_toc(f, entries, depth=0):
 
     # Escribe el <ul> inicial
     f.write("             " + "    " * depth + "<ul>\n")
-    for key, subentries in current_level.items():
+    for subentries in current_level.values():
         item = subentries[0]
+        key = item["levels"][depth]
         
         # Un elemento es el final del nodo si su número de niveles es igual a la profundidad actual + 1
         is_terminal = len(item["levels"]) == depth + 1
@@ -412,7 +376,8 @@ def write_toc(f, entries, depth=0):
 
 
 index_file = os.path.join(output_folder, "index.xhtml")
-with open(index_file, "w", encoding="utf-8") as f:
+# BufferedXhtml junta los muchos f.write pequeños y escribe el índice de una sola vez
+with BufferedXhtml(index_file) as f:
     f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
     f.write('<html xmlns="http://www.w3.org/1999/xhtml" xml:lang="en">\n')
     f.write('     <head>\n')
@@ -617,7 +582,8 @@ def write_toc(f, entries, depth=0):
     current_level = {}
     for entry in entries:
         if len(entry["levels"]) > depth:
-            key = entry["levels"][depth]
+            # Agrupado por id (heading_index.py): secciones hermanas con el mismo título no se mezclan
+            key = toc_group_key(entry, depth)
             if key not in current_level:
                 current_level[key] = []
             current_level[key].append(entry)
@@ -627,8 +593,9 @@ def write_toc(f, entries, depth=0):
 
     # Escribe el <ul> inicial
     f.write("             " + "    " * depth + "<ul>\n")
-    for key, subentries in current_level.items():
+    for subentries in current_level.values():
         item = subentries[0]
+        key = item["levels"][depth]
         
         # Un elemento es el final del nodo si su número de niveles es igual a la profundidad actual + 1
         is_terminal = len(item["levels"]) == depth + 1
@@ -659,7 +626,8 @@ def write_toc(f, entries, depth=0):
 
 
 index_file = os.path.join(output_folder, "index.xhtml")
-with open(index_file, "w", encoding="utf-8") as f:
+# BufferedXhtml junta los muchos f.write pequeños y escribe el índice de una sola vez
+with BufferedXhtml(index_file) as f:
     f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
     f.write('<html xmlns="http://www.w3.org/1999/xhtml" xml:lang="en">\n')
     f.write('     <head>\n')
@@ -864,7 +832,8 @@ def write_toc(f, entries, depth=0):
     current_level = {}
     for entry in entries:
         if len(entry["levels"]) > depth:
-            key = entry["levels"][depth]
+            # Agrupado por id (heading_index.py): secciones hermanas con el mismo título no se mezclan
+            key = toc_group_key(entry, depth)
             if key not in current_level:
                 current_level[key] = []
             current_level[key].append(entry)
@@ -874,8 +843,9 @@ def write_toc(f, entries, depth=0):
 
     # Escribe el <ul> inicial
     f.write("             " + "    " * depth + "<ul>\n")
-    for key, subentries in current_level.items():
+    for subentries in current_level.values():
         item = subentries[0]
+        key = item["levels"][depth]
         
         # Un elemento es el final del nodo si su número de niveles es igual a la profundidad actual + 1
         is_terminal = len(item["levels"]) == depth + 1
@@ -906,7 +876,8 @@ def write_toc(f, entries, depth=0):
 
 
 index_file = os.path.join(output_folder, "index.xhtml")
-with open(index_file, "w", encoding="utf-8") as f:
+# BufferedXhtml junta los muchos f.write pequeños y escribe el índice de una sola vez
+with BufferedXhtml(index_file) as f:
     f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
     f.write('<html xmlns="http://www.w3.org/1999/xhtml" xml:lang="en">\n')
     f.write('     <head>\n')
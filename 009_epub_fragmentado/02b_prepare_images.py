@@ -0,0 +1,232 @@
+# === Preparación de imágenes para el EPUB ===
+#
+# 📘 Descripción:
+# Se ejecuta entre 02_generate_fragments_and_cover_and_metrics_json.py y 03_pack_to_epub.py.
+# Los libros con cientos de imágenes de Wikipedia a resolución completa salían de ~200 MB y
+# tardaban en abrir en los lectores, porque el empaquetador metía las imágenes tal cual.
+#
+# Este script:
+# - Reúne de una vez todas las referencias @img: de input.txt (más la portada cover.jpg).
+# - Verifica y mide todas las imágenes en paralelo (ThreadPoolExecutor: Pillow suelta el GIL al
+#   decodificar, redimensionar y codificar, así que los hilos sí trabajan a la vez).
+# - Reduce las que pasan de MAX_WIDTH x MAX_HEIGHT y recomprime las que pasan de MAX_BYTES,
+#   manteniendo el nombre y el formato (los XHTML ya apuntan a ese nombre).
+# - Guarda cada resultado en CACHE_DIR con el hash SHA-256 del contenido original y de la
+#   configuración: en la siguiente ejecución las imágenes que no cambiaron no se vuelven a procesar.
+# - Deja el resultado en OPTIMIZED_IMAGES_DIR. 03_pack_to_epub.py usa esa carpeta si es más nueva
+#   que input.txt y que Images/ (y solo incluye lo que está ahí: las imágenes no referenciadas,
+#   como cover_art.jpg, se quedan fuera). Si se cambia el libro o las imágenes, hay que volver
+#   a ejecutar este script; si no, el empaquetador usa las imágenes originales.
+#
+# Las imágenes que faltan o que Pillow no puede leer se informan al final; las ilegibles se copian
+# tal cual para no romper las referencias.
+#
+# =========================================================
+
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from PIL import Image, ImageOps
+
+# === CONFIGURACIÓN ===
+INPUT_FILE = "input.txt"
+IMAGES_DIR = "Images"
+OPTIMIZED_IMAGES_DIR = "Images_optimizadas"
+CACHE_DIR = ".cache_imagenes"
+COVER_IMAGE_FILENAME = "cover.jpg"  # Generada por el script 02
+
+# Límites pensados para lectores de tinta electrónica y tablets (igual que la portada: 1600x2560)
+MAX_WIDTH = 1600
+MAX_HEIGHT = 2560
+MAX_BYTES = 500 * 1024  # Por encima de esto se recomprime aunque las dimensiones estén bien
+JPEG_QUALITY = 82
+WEBP_QUALITY = 80
+
+MAX_WORKERS = min(8, (os.cpu_count() or 1) + 2)
+
+# =============================================================
+
+# Cambiar cualquier límite invalida la caché (forma parte de la clave)
+SETTINGS_KEY = f"{MAX_WIDTH}x{MAX_HEIGHT}-{MAX_BYTES}-q{JPEG_QUALITY}-w{WEBP_QUALITY}"
+
+
+# === 1. REFERENCIAS ===
+def collect_image_references(input_file):
+    """Devuelve los nombres de archivo de las líneas @img: en el orden en que aparecen, sin repetir."""
+    references = []
+    seen = set()
+    with open(input_file, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line.startswith("@img:"):
+                continue
+            img_file = line[5:].split("|", 1)[0].strip()
+            if img_file and img_file not in seen:
+                seen.add(img_file)
+                references.append(img_file)
+    return references
+
+
+# === 2. PROCESADO DE UNA IMAGEN ===
+def cache_path_for(digest, img_file):
+    extension = os.path.splitext(img_file)[1].lower()
+    return os.path.join(CACHE_DIR, f"{digest}{extension}")
+
+
+def write_atomic(path, data):
+    # Temporal único por llamada: dos referencias con los mismos bytes (y otro nombre) comparten
+    # la ruta de caché, y sus hilos la pueden escribir a la vez
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(temp_path, path)
+
+
+def optimize_image(data):
+    """
+    Devuelve (bytes, ancho, alto, redimensionada) con la imagen reducida/recomprimida,
+    o None si no hace falta tocarla (o si el resultado no sería más pequeño).
+    """
+    with Image.open(io.BytesIO(data)) as probe:
+        probe.verify()  # Detecta archivos truncados o corruptos (lanza excepción)
+
+    with Image.open(io.BytesIO(data)) as img:
+        image_format = img.format
+        width, height = img.size
+        too_large = width > MAX_WIDTH or height > MAX_HEIGHT
+        too_heavy = len(data) > MAX_BYTES
+
+        if not too_large and not too_heavy:
+            return None
+        # GIF animados y formatos raros se dejan como están
+        if image_format not in ("JPEG", "PNG", "WEBP") or getattr(img, "n_frames", 1) > 1:
+            return None
+
+        # Muchos lectores ignoran la orientación EXIF: se aplica al píxel antes de reducir
+        img = ImageOps.exif_transpose(img)
+        if too_large:
+            img.thumbnail((MAX_WIDTH, MAX_HEIGHT), Image.Resampling.LANCZOS)
+
+        output = io.BytesIO()
+        if image_format == "JPEG":
+            if img.mode not in ("RGB", "L"):
+                img = img.convert("RGB")
+            img.save(output, "JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+        elif image_format == "PNG":
+            img.save(output, "PNG", optimize=True)
+        else:
+            img.save(output, "WEBP", quality=WEBP_QUALITY, method=4)
+
+        result = output.getvalue()
+        if not too_large and len(result) >= len(data):
+            return None  # Recomprimir no ayudó: mejor el original
+        return result, img.width, img.height, too_large
+
+
+def prepare_image(img_file):
+    """Verifica, optimiza (o toma de la caché) y copia una imagen a OPTIMIZED_IMAGES_DIR."""
+    source_path = os.path.join(IMAGES_DIR, img_file)
+    target_path = os.path.join(OPTIMIZED_IMAGES_DIR, img_file)
+    result = {"file": img_file, "status": "", "original_bytes": 0, "final_bytes": 0, "error": ""}
+
+    if not os.path.isfile(source_path):
+        result["status"] = "missing"
+        return result
+
+    with open(source_path, "rb") as f:
+        data = f.read()
+    result["original_bytes"] = len(data)
+
+    digest = hashlib.sha256(data + SETTINGS_KEY.encode("utf-8")).hexdigest()
+    cache_path = cache_path_for(digest, img_file)
+
+    if os.path.exists(cache_path):
+        result["status"] = "cached"
+    else:
+        try:
+            optimized = optimize_image(data)
+        except Exception as e:
+            # Ilegible para Pillow: se copia tal cual para que la referencia no quede rota
+            result["status"] = "unreadable"
+            result["error"] = str(e)
+            write_atomic(target_path, data)
+            result["final_bytes"] = len(data)
+            return result
+
+        if optimized is None:
+            result["status"] = "unchanged"
+            write_atomic(cache_path, data)
+        else:
+            optimized_data, width, height, resized = optimized
+            result["status"] = "resized" if resized else "recompressed"
+            result["size"] = f"{width}x{height}"
+            write_atomic(cache_path, optimized_data)
+
+    shutil.copyfile(cache_path, target_path)
+    result["final_bytes"] = os.path.getsize(target_path)
+    return result
+
+
+# === 3. EJECUCIÓN ===
+def prepare_images():
+    if not os.path.exists(INPUT_FILE):
+        print(f"❌ ERROR: No se encontró {INPUT_FILE}. Ejecuta primero 01_parse_raw.py.")
+        return
+
+    references = collect_image_references(INPUT_FILE)
+    if os.path.isfile(os.path.join(IMAGES_DIR, COVER_IMAGE_FILENAME)) and COVER_IMAGE_FILENAME not in references:
+        references.insert(0, COVER_IMAGE_FILENAME)
+
+    os.makedirs(OPTIMIZED_IMAGES_DIR, exist_ok=True)
+    os.makedirs(CACHE_DIR, exist_ok=True)
+
+    # La carpeta de salida solo contiene lo referenciado: se borra lo que sobró de ejecuciones anteriores
+    wanted = set(references)
+    for name in os.listdir(OPTIMIZED_IMAGES_DIR):
+        if name not in wanted:
+            os.remove(os.path.join(OPTIMIZED_IMAGES_DIR, name))
+
+    print(f"🖼️ {len(references)} imágenes referenciadas. Procesando con {MAX_WORKERS} hilos...")
+    start = time.perf_counter()
+    results = []
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        futures = [executor.submit(prepare_image, img_file) for img_file in references]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            if result["status"] in ("resized", "recompressed"):
+                print(f"   🔧 {result['file']}: {result['original_bytes'] / 1024:,.0f} KB -> "
+                      f"{result['final_bytes'] / 1024:,.0f} KB ({result.get('size', '')})")
+    elapsed = time.perf_counter() - start
+
+    counts = {}
+    for result in results:
+        counts[result["status"]] = counts.get(result["status"], 0) + 1
+    original_total = sum(r["original_bytes"] for r in results)
+    final_total = sum(r["final_bytes"] for r in results)
+
+    print(f"\n📊 Resumen ({elapsed:.1f} s):")
+    for status in ("resized", "recompressed", "unchanged", "cached", "unreadable", "missing"):
+        if counts.get(status):
+            print(f"   - {status}: {counts[status]}")
+    print(f"   - Tamaño total: {original_total / (1024 * 1024):,.1f} MB -> {final_total / (1024 * 1024):,.1f} MB")
+
+    missing = sorted(r["file"] for r in results if r["status"] == "missing")
+    if missing:
+        print("\n❌ Missing image files:")
+        for img_file in missing:
+            print(f" - {img_file}")
+    for result in results:
+        if result["status"] == "unreadable":
+            print(f"⚠️ {result['file']} no se pudo leer ({result['error']}). Se copió sin cambios.")
+
+    print(f"\n✅ Imágenes listas en: {OPTIMIZED_IMAGES_DIR}/ (03_pack_to_epub.py las usará)")
+
+
+if __name__ == "__main__":
+    prepare_images()
@@ -9,10 +9,16 @@ import time
 import json # CLAVE: Para leer la jerarquía del Script 02
 from PIL import Image, ImageDraw, ImageFont, ImageOps
 
+from heading_index import toc_group_key
+
 # --- CONFIGURACIÓN ---
 # Directorios de entrada que contienen los archivos generados por 02_generate_xhtml.py
 XHTML_DIR = "xhtmls_sequences"
 IMAGES_DIR = "Images"
+# Salida de 02b_prepare_images.py (imágenes reducidas/recomprimidas). Se usa en lugar de IMAGES_DIR
+# solo si es más nueva que input.txt y que todo IMAGES_DIR (si no, es de una ejecución anterior)
+OPTIMIZED_IMAGES_DIR = "Images_optimizadas"
+INPUT_FILE = "input.txt"
 STYLES_DIR = "Styles" 
 FONTS_DIR = "fonts" 
 OUTPUT_EPUB_FILE = "output_ebook.epub"
@@ -151,15 +157,16 @@ def generate_nav_xhtml(toc_entries, style_files):
         html_list = "\n<ol>"
         current_level_groups = {}
         
-        # 1. Agrupar por el título en la posición 'depth'
+        # 1. Agrupar por el id del encabezado en la posición 'depth' (el título si no hay ids)
         for entry in entries:
             if len(entry["levels"]) > depth:
-                key = entry["levels"][depth]
+                key = toc_group_key(entry, depth)
                 if key not in current_level_groups:
                     current_level_groups[key] = [] 
                 current_level_groups[key].append(entry)
 
-        for title, sub_entries in current_level_groups.items():
+        for sub_entries in current_level_groups.values():
+            title = sub_entries[0]["levels"][depth]
             
             # 2. Determinar el enlace. Buscamos el archivo del nodo terminal en esta rama.
             link_entry = next((e for e in sub_entries if len(e['levels']) == depth + 1), None)
@@ -226,15 +233,16 @@ def generate_toc_ncx(toc_entries, book_id, book_title):
         nav_points_html = ""
         current_level_groups = {}
         
-        # Agrupar entradas por el título en el nivel 'depth'
+        # Agrupar entradas por el id del encabezado en el nivel 'depth' (el título si no hay ids)
         for entry in entries:
             if len(entry["levels"]) > depth:
-                key = entry["levels"][depth]
+                key = toc_group_key(entry, depth)
                 if key not in current_level_groups:
                     current_level_groups[key] = []
                 current_level_groups[key].append(entry)
 
-        for title, sub_entries in current_level_groups.items():
+        for sub_entries in current_level_groups.values():
+            title = sub_entries[0]["levels"][depth]
             
             # Determinar el enlace (ver lógica en generate_nav_xhtml)
             link_entry = next((e for e in sub_entries if len(e['levels']) == depth + 1), None)
@@ -298,6 +306,29 @@ def generate_toc_ncx(toc_entries, book_id, book_title):
 # === 2. FUNCIÓN PRINCIPAL DE EMPAQUETADO ZIP
 # ====================================================================
 
+def choose_images_dir():
+    """
+    OPTIMIZED_IMAGES_DIR si 02b_prepare_images.py se ejecutó después de los últimos cambios
+    en input.txt y en IMAGES_DIR (incluida la portada que genera el script 02); si no, IMAGES_DIR.
+    """
+    if not os.path.isdir(OPTIMIZED_IMAGES_DIR):
+        return IMAGES_DIR
+    optimized = [entry.stat().st_mtime for entry in os.scandir(OPTIMIZED_IMAGES_DIR) if entry.is_file()]
+    if not optimized:
+        return IMAGES_DIR
+
+    sources = [entry.stat().st_mtime for entry in os.scandir(IMAGES_DIR) if entry.is_file()]
+    if os.path.exists(INPUT_FILE):
+        sources.append(os.path.getmtime(INPUT_FILE))
+    if sources and min(optimized) < max(sources):
+        print(f"⚠️ {OPTIMIZED_IMAGES_DIR}/ es anterior a {INPUT_FILE} o a {IMAGES_DIR}/: se usan las imágenes "
+              f"originales. Ejecuta 02b_prepare_images.py para volver a optimizarlas.")
+        return IMAGES_DIR
+
+    print(f"🖼️ Usando imágenes optimizadas de: {OPTIMIZED_IMAGES_DIR}/")
+    return OPTIMIZED_IMAGES_DIR
+
+
 def pack_to_epub(output_file, xhtml_dir, images_dir, styles_dir, fonts_dir, file_prefix):
     """Ensambla todos los archivos en un archivo EPUB válido."""
 
@@ -456,4 +487,4 @@ if __name__ == "__main__":
   </body>
 </html>''')
     
-    pack_to_epub(OUTPUT_EPUB_FILE, XHTML_DIR, IMAGES_DIR, STYLES_DIR, FONTS_DIR, FILE_PREFIX)
\ No newline at end of file
+    pack_to_epub(OUTPUT_EPUB_FILE, XHTML_DIR, choose_images_dir(), STYLES_DIR, FONTS_DIR, FILE_PREFIX)
\ No newline at end of file
@@ -0,0 +1,124 @@
+# === Índice de la jerarquía de encabezados (#levelN:) ===
+#
+# 📘 Descripción:
+# La jerarquía de secciones solo vivía en las líneas "[Capítulo > Sección > Subsección]" de
+# input.txt, y cada script la reconstruía con split(" > "). Eso falla con títulos que contienen
+# " > " y hace que dos secciones hermanas con el mismo título se mezclen en la ToC.
+#
+# - HeadingStack (lo usa 01_parse_raw.py) mantiene los encabezados abiertos como una pila y le da
+#   a cada uno un id numérico. Cada línea #levelN: produce un registro, por ejemplo:
+#     {"id": 7, "level": 3, "depth": 2, "parent": 2, "title": "Combat", "path": ["Gameplay", "Combat"], "ids": [2, 7]}
+#   'level' es el número escrito en el texto; 'depth' es el largo de la ruta (se pueden saltar niveles).
+# - Los registros se guardan junto a input.txt en headings.jsonl, uno por línea de marcador y en el mismo orden.
+# - HeadingReader (lo usa el script 02) entrega los registros a medida que aparecen los marcadores.
+#   Si un marcador no coincide con el siguiente registro (no hay headings.jsonl, o input.txt se
+#   editó a mano), ese marcador se lee como antes, separando el texto, y sin ids.
+#
+# Las líneas de marcador de input.txt no cambian: los input.txt anteriores siguen funcionando.
+#
+# =========================================================
+
+import json
+import os
+
+HEADINGS_FILE_NAME = "headings.jsonl"
+PATH_SEPARATOR = " > "
+
+
+class HeadingStack:
+    """Encabezados abiertos (nivel, id, título), del más externo al actual."""
+
+    def __init__(self):
+        self.stack = []
+        self.next_id = 1
+        self.records = []
+
+    def push(self, level, title):
+        """Registra un encabezado cerrando los abiertos de nivel igual o mayor. Devuelve su registro."""
+        while self.stack and self.stack[-1][0] >= level:
+            self.stack.pop()
+        parent = self.stack[-1][1] if self.stack else None
+        heading_id = self.next_id
+        self.next_id += 1
+        self.stack.append((level, heading_id, title))
+
+        record = {
+            "id": heading_id,
+            "level": level,
+            "depth": len(self.stack),
+            "parent": parent,
+            "title": title,
+            "path": [entry[2] for entry in self.stack],
+            "ids": [entry[1] for entry in self.stack],
+        }
+        self.records.append(record)
+        return record
+
+
+def marker_line(record):
+    """La línea "[A > B > C]" que se escribe en input.txt para un registro."""
+    return f"[{PATH_SEPARATOR.join(record['path'])}]"
+
+
+def headings_path_for(input_path):
+    return os.path.join(os.path.dirname(input_path), HEADINGS_FILE_NAME)
+
+
+def write_headings(path, records):
+    temp_path = path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False))
+            f.write("\n")
+    os.replace(temp_path, path)
+
+
+def load_headings(path):
+    """Registros de un headings.jsonl, o None si no existe o no se puede leer."""
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+    except (OSError, ValueError):
+        return None
+
+
+class HeadingReader:
+    """Devuelve el registro de cada línea de marcador, en orden, comprobándolo contra headings.jsonl."""
+
+    def __init__(self, records):
+        self.records = records or []
+        self.position = 0
+        self._warned = False
+        if records is None:
+            print(f"⚠️ Warning: {HEADINGS_FILE_NAME} no encontrado. La jerarquía se lee de las líneas de marcador.")
+            self._warned = True
+
+    def next(self, line):
+        if self.position < len(self.records) and marker_line(self.records[self.position]) == line:
+            record = self.records[self.position]
+            self.position += 1
+            return record
+
+        # No está en headings.jsonl (archivo viejo, u oración que parece marcador):
+        # esta línea se lee como antes y la siguiente se vuelve a comprobar
+        if not self._warned:
+            print(f"⚠️ Warning: {HEADINGS_FILE_NAME} no coincide con el marcador {line}. Se lee del texto del marcador.")
+            self._warned = True
+        path = line[1:-1].split(PATH_SEPARATOR)
+        return {"id": None, "level": len(path), "depth": len(path), "parent": None,
+                "title": path[-1], "path": path, "ids": None}
+
+
+def open_headings(input_path):
+    """HeadingReader para el headings.jsonl que está junto a `input_path`."""
+    return HeadingReader(load_headings(headings_path_for(input_path)))
+
+
+def toc_group_key(entry, depth):
+    """Clave para agrupar las entradas de la ToC en `depth`: el id del encabezado si se conoce, si no el título."""
+    ids = entry.get("ids")
+    if ids and len(ids) > depth:
+        return ids[depth]
+    return entry["levels"][depth]
@@ -1,54 +1,574 @@
 import fitz  # PyMuPDF
+import hashlib
+import io
+import json
 import os
+import sqlite3
+import tarfile
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+# Parallel mode: page ranges of every PDF are spread across worker processes
+PARALLEL_WORKERS = os.cpu_count() or 1
+PAGES_PER_SHARD = 25
+
+# Store identical images found in different PDFs only once, named by content hash
+CROSS_DOCUMENT_DEDUP = False
+INDEX_FILENAME = "image_index.json"
+# Processed PDFs (by content hash + parameters) and finished shards, for skipping and resuming
+LEDGER_FILENAME = "extraction_ledger.sqlite"
+
+# Filters checked against the image metadata, before anything is decoded
+FILTERS = {
+    "min_width": 0,            # pixels
+    "min_height": 0,           # pixels
+    "min_bytes": 0,            # size of the stored (compressed) image stream
+    "colorspaces": None,       # e.g. {"DeviceRGB", "DeviceGray", "ICCBased"}; None = any
+    "skip_soft_masks": True,   # transparency masks of other images
+}
+
+# Optional output stage: recompress (needs Pillow) and/or pack into one archive
+CONVERT_TO = None              # None (keep as stored), "webp" or "jpeg"
+CONVERT_QUALITY = 80
+CONVERT_THREADS = 4
+OUTPUT_ARCHIVE = None          # None (loose files), "images.zip" or "images.tar"
+
 
 def extract_images_from_pdfs(pdf_folder="pdfs", image_folder="images"):
     """
     Extracts all images from PDF files in a specified PDF folder
-    and saves them to an image folder.
+    and saves them to an image folder, in a single process.
+    """
+    return extract_images_parallel(pdf_folder, image_folder, workers=1)
+
+
+def skip_reason(doc, img, soft_masks, filters):
+    """Why an image should be skipped (None to keep it), using only its metadata."""
+    xref, _, width, height, _, colorspace = img[:6]
+    if filters.get("skip_soft_masks") and xref in soft_masks:
+        return "soft mask"
+    if width < filters.get("min_width", 0) or height < filters.get("min_height", 0):
+        return "too small"
+    if filters.get("colorspaces") and colorspace not in filters["colorspaces"]:
+        return f"colorspace {colorspace}"
+    if filters.get("min_bytes"):
+        kind, value = doc.xref_get_key(xref, "Length")
+        length = int(value) if kind == "int" else len(doc.xref_stream_raw(xref))
+        if length < filters["min_bytes"]:
+            return "too few bytes"
+    return None
+
+
+def scan_pages(pdf_filepath, start, end, filters=FILTERS):
+    """
+    Worker process: lists the images of pages start..end-1, using only their metadata.
+    Returns (occurrences, images, seconds): occurrences is [(page, img_index, xref)] and
+    images is {xref: (soft_mask_xref, skip_reason)}. Soft masks are resolved by
+    plan_document, since a mask and the image using it can be in different page ranges.
+    """
+    start_time = time.perf_counter()
+    occurrences = []
+    images = {}
+    with fitz.open(pdf_filepath) as doc:
+        for i in range(start, end):
+            for img_index, img in enumerate(doc.get_page_images(i)):
+                occurrences.append((i, img_index, img[0]))
+                if img[0] not in images:
+                    images[img[0]] = (img[1], skip_reason(doc, img, (), filters))
+    return occurrences, images, time.perf_counter() - start_time
+
+
+def plan_document(scans, page_count, pages_per_shard=PAGES_PER_SHARD, filters=FILTERS):
+    """
+    Merges the scan_pages results of a PDF (in page order) and splits the unique xrefs
+    into page-range shards. Each xref is extracted only by the shard holding its first page.
+    Images rejected by `filters` are listed with their reason but never extracted.
+
+    Returns (occurrences, shards, skipped): occurrences is [(page, img_index, xref)],
+    shards is [(start_page, end_page, [(xref, page, img_index), ...])] and skipped
+    is {xref: reason}.
+    """
+    occurrences = []
+    images = {}
+    for scan_occurrences, scan_images, _ in scans:
+        occurrences.extend(scan_occurrences)
+        for xref, info in scan_images.items():
+            images.setdefault(xref, info)
+
+    soft_masks = {smask for smask, _ in images.values() if smask}
+    skipped = {}
+    for xref, (_, reason) in images.items():
+        if filters.get("skip_soft_masks") and xref in soft_masks:
+            reason = "soft mask"
+        if reason:
+            skipped[xref] = reason
+
+    # Occurrences are in page order, so the first one seen is the first page
+    seen = set(skipped)
+    shard_jobs = {}
+    for page, img_index, xref in occurrences:
+        if xref not in seen:
+            seen.add(xref)
+            shard_jobs.setdefault(page // pages_per_shard, []).append((xref, page, img_index))
+
+    shards = [
+        (number * pages_per_shard, min((number + 1) * pages_per_shard, page_count), jobs)
+        for number, jobs in sorted(shard_jobs.items())
+    ]
+    return occurrences, shards, skipped
+
+
+def _write_image(path, data, keep_existing=False):
+    """
+    Writes an image file (temp file + rename, safe across processes). With keep_existing
+    an existing file is left alone; that is only safe for content-hash names, where the
+    same name means the same bytes. Page-named files are replaced, since the PDF may have changed.
+    """
+    if keep_existing and os.path.exists(path):
+        return False
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as img_file:
+        img_file.write(data)
+    os.replace(temp_path, path)
+    return True
+
+
+def _extract_xrefs(pdf_filepath, jobs, image_path, content_hash=False, return_bytes=False):
+    """
+    Worker process: opens its own copy of the document and extracts each xref once.
+    Returns ({xref: filename}, seconds), or ({xref: (filename, bytes)}, seconds) with
+    return_bytes=True (nothing is written then; the parent decides where images go).
+    """
+    start_time = time.perf_counter()
+    pdf_stem = os.path.splitext(os.path.basename(pdf_filepath))[0]
+    stored = {}
+    with fitz.open(pdf_filepath) as doc:
+        for xref, page, img_index in jobs:
+            base_image = doc.extract_image(xref)
+            if not base_image:
+                continue
+            image_bytes = base_image["image"]
+            if content_hash:
+                image_filename = f"{hashlib.sha256(image_bytes).hexdigest()[:20]}.{base_image['ext']}"
+            else:
+                # Named after the first page where the image appears
+                image_filename = f"{pdf_stem}_page{page+1}_img{img_index+1}.{base_image['ext']}"
+            if return_bytes:
+                stored[xref] = (image_filename, image_bytes)
+            else:
+                _write_image(os.path.join(image_path, image_filename), image_bytes, keep_existing=content_hash)
+                stored[xref] = image_filename
+    return stored, time.perf_counter() - start_time
+
+
+def convert_image(image_filename, image_bytes, fmt=CONVERT_TO, quality=CONVERT_QUALITY):
+    """
+    Recompresses one image to WebP or JPEG with Pillow. Formats Pillow cannot read
+    (JBIG2, some JPX) are kept as they are. Returns (new_filename, new_bytes).
+    """
+    from PIL import Image  # Optional dependency, only needed for CONVERT_TO
+
+    try:
+        with Image.open(io.BytesIO(image_bytes)) as im:
+            keep_alpha = fmt == "webp" and ("A" in im.mode or "transparency" in im.info)
+            if keep_alpha:
+                im = im.convert("RGBA")
+            elif im.mode not in ("RGB", "L"):
+                im = im.convert("RGB")
+            output = io.BytesIO()
+            im.save(output, format=fmt.upper(), quality=quality)
+    except Exception:
+        return image_filename, image_bytes
+
+    extension = "jpg" if fmt == "jpeg" else fmt
+    return f"{os.path.splitext(image_filename)[0]}.{extension}", output.getvalue()
+
+
+class ImageSink:
+    """
+    Where finished images go: loose files in image_path, or one zip/tar archive.
+    With keep_existing=True (content-hash names) an image already stored is not written
+    again; otherwise a new image replaces an earlier one with the same name.
+    """
+
+    def __init__(self, image_path, archive_name=None, keep_existing=False):
+        self.image_path = image_path
+        self.keep_existing = keep_existing
+        self.archive = None
+        self.names = set()      # Written in this run
+        self.previous = set()   # Already in the archive from earlier runs
+        if archive_name:
+            # Archive members cannot be replaced in place: each run writes a new archive,
+            # and close() copies over the earlier images that were not replaced
+            self.archive_path = os.path.join(image_path, archive_name)
+            self.temp_path = self.archive_path + ".tmp"
+            is_zip = archive_name.endswith(".zip")
+            if os.path.exists(self.archive_path):
+                if is_zip:
+                    with zipfile.ZipFile(self.archive_path) as previous:
+                        self.previous.update(previous.namelist())
+                else:
+                    with tarfile.open(self.archive_path) as previous:
+                        self.previous.update(previous.getnames())
+            # The archive writes into our own file object, so close() can fsync it
+            self.file = open(self.temp_path, "wb")
+            if is_zip:
+                # Images are already compressed: store them without deflate
+                self.archive = zipfile.ZipFile(self.file, "w", zipfile.ZIP_STORED)
+            else:
+                self.archive = tarfile.open(fileobj=self.file, mode="w")
+
+    def add(self, image_filename, image_bytes):
+        if image_filename in self.names or (self.keep_existing and image_filename in self.previous):
+            return
+        self.names.add(image_filename)
+        if self.archive is None:
+            _write_image(os.path.join(self.image_path, image_filename), image_bytes, self.keep_existing)
+        elif isinstance(self.archive, zipfile.ZipFile):
+            self.archive.writestr(image_filename, image_bytes)
+        else:
+            info = tarfile.TarInfo(image_filename)
+            info.size = len(image_bytes)
+            self.archive.addfile(info, io.BytesIO(image_bytes))
+
+    def close(self):
+        """Finishes the archive and puts it in place; once this returns, it survives a crash."""
+        if self.archive is None:
+            return
+        # Earlier images that this run did not replace stay valid for the index
+        if self.previous - self.names:
+            if isinstance(self.archive, zipfile.ZipFile):
+                with zipfile.ZipFile(self.archive_path) as previous:
+                    for info in previous.infolist():
+                        if info.filename not in self.names:
+                            self.archive.writestr(info, previous.read(info))
+            else:
+                with tarfile.open(self.archive_path) as previous:
+                    for member in previous:
+                        if member.isfile() and member.name not in self.names:
+                            self.archive.addfile(member, previous.extractfile(member))
+        self.archive.close()
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.file.close()
+        os.replace(self.temp_path, self.archive_path)
+        if hasattr(os, "O_DIRECTORY"):
+            # Makes the rename itself durable (POSIX only)
+            directory = os.open(self.image_path, os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(directory)
+            finally:
+                os.close(directory)
+
+
+def _run_tasks(tasks, workers):
+    """Runs (key, function, args) tasks, yielding (key, result, error) as they finish."""
+    if workers == 1:
+        for key, function, args in tasks:
+            try:
+                yield key, function(*args), None
+            except Exception as e:
+                yield key, None, e
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(function, *args): key for key, function, args in tasks}
+        for future in as_completed(futures):
+            try:
+                yield futures[future], future.result(), None
+            except Exception as e:
+                yield futures[future], None, e
+
+
+class ExtractionLedger:
+    """
+    SQLite record of the extraction work, keyed by PDF content hash + parameters hash:
+    - documents: finished PDFs with their counts, timing and index entries.
+    - shards: finished page ranges of unfinished PDFs (to resume after a crash).
+    - file_hashes: cached SHA-256 per (path, size, mtime), so unchanged PDFs are not re-read.
+    """
+
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS file_hashes (
+                path TEXT PRIMARY KEY, size INTEGER, mtime REAL, sha256 TEXT
+            );
+            CREATE TABLE IF NOT EXISTS documents (
+                sha256 TEXT, params TEXT, pdf_file TEXT,
+                occurrences INTEGER, unique_images INTEGER, skipped INTEGER,
+                seconds REAL, finished_at REAL, index_json TEXT,
+                PRIMARY KEY (sha256, params)
+            );
+            CREATE TABLE IF NOT EXISTS shards (
+                sha256 TEXT, params TEXT, start_page INTEGER, images_json TEXT, seconds REAL,
+                PRIMARY KEY (sha256, params, start_page)
+            );
+        """)
+        self.conn.commit()
+
+    def pdf_hash(self, path):
+        stat = os.stat(path)
+        row = self.conn.execute("SELECT size, mtime, sha256 FROM file_hashes WHERE path = ?", (path,)).fetchone()
+        if row and row[0] == stat.st_size and row[1] == stat.st_mtime:
+            return row[2]
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+        sha256 = digest.hexdigest()
+        self.conn.execute("INSERT OR REPLACE INTO file_hashes VALUES (?, ?, ?, ?)",
+                          (path, stat.st_size, stat.st_mtime, sha256))
+        self.conn.commit()
+        return sha256
+
+    def document(self, sha256, params):
+        """Returns (pdf_file, index_entries) if this PDF was already processed with these parameters."""
+        row = self.conn.execute("SELECT pdf_file, index_json FROM documents WHERE sha256 = ? AND params = ?",
+                                (sha256, params)).fetchone()
+        return (row[0], json.loads(row[1])) if row else None
+
+    def finished_shards(self, sha256, params):
+        """Returns {start_page: ({xref: filename}, seconds)} for the shards already done."""
+        rows = self.conn.execute("SELECT start_page, images_json, seconds FROM shards WHERE sha256 = ? AND params = ?",
+                                 (sha256, params)).fetchall()
+        return {start: ({int(x): name for x, name in json.loads(images).items()}, seconds)
+                for start, images, seconds in rows}
+
+    def record_shard(self, sha256, params, start_page, images, seconds):
+        self.conn.execute("INSERT OR REPLACE INTO shards VALUES (?, ?, ?, ?, ?)",
+                          (sha256, params, start_page, json.dumps(images), seconds))
+        self.conn.commit()
+
+    def record_document(self, sha256, params, pdf_file, entries, unique_images, skipped, seconds):
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO documents VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                              (sha256, params, pdf_file, len(entries), unique_images, skipped,
+                               seconds, time.time(), json.dumps(entries)))
+            self.conn.execute("DELETE FROM shards WHERE sha256 = ? AND params = ?", (sha256, params))
+
+    def close(self):
+        self.conn.close()
+
+
+def params_hash(**params):
+    """Short hash of the extraction parameters (a different setting means a new extraction)."""
+    encoded = json.dumps(params, sort_keys=True, default=sorted)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()[:16]
+
+
+def load_index(image_path):
+    index_path = os.path.join(image_path, INDEX_FILENAME)
+    if os.path.exists(index_path):
+        with open(index_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return {}
+
+
+def save_index(image_path, index):
+    """Writes the page-occurrence → stored file index atomically."""
+    index_path = os.path.join(image_path, INDEX_FILENAME)
+    with open(index_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=2)
+    os.replace(index_path + ".tmp", index_path)
+
+
+def extract_images_parallel(pdf_folder="pdfs", image_folder="images", workers=PARALLEL_WORKERS,
+                            pages_per_shard=PAGES_PER_SHARD, content_hash=CROSS_DOCUMENT_DEDUP,
+                            filters=FILTERS, convert_to=CONVERT_TO, archive_name=OUTPUT_ARCHIVE):
+    """
+    Extracts the images of every PDF, spreading page ranges across a process pool.
+    The workers first list the images of their page ranges (scan_pages); the lists
+    of a PDF are merged by plan_document, then the unique images are extracted.
+
+    Each unique image (xref) of a document is extracted and written once, no matter
+    how many pages reuse it. With content_hash=True files are named by their SHA-256,
+    so identical images in different PDFs are stored once as well. Images rejected
+    by `filters` are never decoded.
+
+    With convert_to ("webp"/"jpeg") images are recompressed in a thread pool while
+    the workers keep extracting; with archive_name ("images.zip"/"images.tar") they
+    are streamed into one archive instead of loose files (a new archive each run,
+    carrying over the earlier images that were not replaced).
+
+    The JSON index (image_index.json) maps every page occurrence to its stored file.
+    The ledger (extraction_ledger.sqlite) skips PDFs already processed with the same
+    content and parameters, and keeps finished page ranges so an interrupted PDF
+    resumes where it stopped. Returns the index.
     """
     script_dir = os.path.dirname(os.path.abspath(__file__))
     pdf_path = os.path.join(script_dir, pdf_folder)
     image_path = os.path.join(script_dir, image_folder)
-
-    # Ensure the image output directory exists
     os.makedirs(image_path, exist_ok=True)
 
-    # Get all PDF files in the pdfs folder
-    pdf_files = [f for f in os.listdir(pdf_path) if f.lower().endswith(".pdf")]
-
+    pdf_files = sorted(f for f in os.listdir(pdf_path) if f.lower().endswith(".pdf"))
     if not pdf_files:
         print(f"No PDF files found in '{pdf_path}'. Please place PDFs in this folder.")
-        return
+        return {}
+
+    if convert_to:
+        try:
+            import PIL  # noqa: F401
+        except ImportError:
+            print("Converting images requires Pillow. Install it with: pip install pillow")
+            return {}
+
+    print(f"Found {len(pdf_files)} PDF(s) in '{pdf_path}'. Using {workers} worker process(es).")
 
-    print(f"Found {len(pdf_files)} PDF(s) in '{pdf_path}'.")
+    ledger = ExtractionLedger(os.path.join(image_path, LEDGER_FILENAME))
+    params = params_hash(pages_per_shard=pages_per_shard, content_hash=content_hash, filters=filters,
+                         convert_to=convert_to, quality=CONVERT_QUALITY if convert_to else None,
+                         archive_name=archive_name)
+    index = load_index(image_path)
 
+    # Workers hand the bytes back when the parent has more to do with them
+    return_bytes = bool(convert_to or archive_name)
+    documents = {}   # pdf_file -> state of the PDFs that still need work
+    planned = {}     # sha256 -> pdf_file, to process identical copies only once per run
+    aliases = {}     # pdf_file -> pdf_file with the same content
+    scanning = {}    # pdf_file -> (sha256, page_count) of the PDFs whose pages are being listed
+    scan_tasks = []
     for pdf_file in pdf_files:
         pdf_filepath = os.path.join(pdf_path, pdf_file)
-        print(f"\nProcessing '{pdf_file}'...")
-
         try:
-            doc = fitz.open(pdf_filepath)
-            image_count = 0
-            for i in range(len(doc)):
-                for img_index, img in enumerate(doc.get_page_images(i)):
-                    xref = img[0]
-                    base_image = doc.extract_image(xref)
-                    image_bytes = base_image["image"]
-                    image_ext = base_image["ext"]
-
-                    # Construct a unique filename for each image
-                    # Format: PDF_FILENAME_PAGE_NUMBER_IMAGE_INDEX.EXTENSION
-                    image_filename = f"{os.path.splitext(pdf_file)[0]}_page{i+1}_img{img_index+1}.{image_ext}"
-                    output_filepath = os.path.join(image_path, image_filename)
-
-                    with open(output_filepath, "wb") as img_file:
-                        img_file.write(image_bytes)
-                    print(f"  Extracted: {image_filename}")
-                    image_count += 1
-            doc.close()
-            print(f"Finished processing '{pdf_file}'. Total images extracted: {image_count}")
+            sha256 = ledger.pdf_hash(pdf_filepath)
+            done = ledger.document(sha256, params)
+            if done:
+                # Same content and settings as before (maybe under another name): reuse it
+                index[pdf_file] = done[1]
+                print(f"Skipping '{pdf_file}': already processed as '{done[0]}'.")
+                continue
+            if sha256 in planned:
+                aliases[pdf_file] = planned[sha256]
+                print(f"Skipping '{pdf_file}': same content as '{planned[sha256]}'.")
+                continue
+            with fitz.open(pdf_filepath) as doc:
+                page_count = len(doc)
         except Exception as e:
             print(f"Error processing '{pdf_file}': {e}")
+            continue
+        planned[sha256] = pdf_file
+        scanning[pdf_file] = (sha256, page_count)
+        # Each page range lists its own images in a worker; plan_document merges them
+        for start in range(0, page_count, pages_per_shard):
+            end = min(start + pages_per_shard, page_count)
+            scan_tasks.append(((pdf_file, start), scan_pages, (pdf_filepath, start, end, filters)))
+
+    scans = {pdf_file: {} for pdf_file in scanning}
+    for (pdf_file, start), result, error in _run_tasks(scan_tasks, workers):
+        if pdf_file not in scans:
+            continue
+        if error:
+            print(f"Error processing '{pdf_file}': {error}")
+            del scans[pdf_file]
+            continue
+        scans[pdf_file][start] = result
+
+    tasks = []
+    for pdf_file, document_scans in scans.items():
+        sha256, page_count = scanning[pdf_file]
+        pdf_filepath = os.path.join(pdf_path, pdf_file)
+        ordered_scans = [document_scans[start] for start in sorted(document_scans)]
+        occurrences, shards, skipped = plan_document(ordered_scans, page_count, pages_per_shard, filters)
+
+        finished = ledger.finished_shards(sha256, params)
+        documents[pdf_file] = {
+            "sha256": sha256, "occurrences": occurrences, "skipped": skipped, "failed": False,
+            "stored": {xref: name for images, _ in finished.values() for xref, name in images.items()},
+            "seconds": sum(scan[2] for scan in ordered_scans) + sum(seconds for _, seconds in finished.values()),
+            "pending": 0,
+        }
+        if finished:
+            print(f"Resuming '{pdf_file}': {len(finished)} of {len(shards)} page ranges already done.")
+        for start, end, jobs in shards:
+            if start in finished:
+                continue
+            documents[pdf_file]["pending"] += 1
+            args = (pdf_filepath, jobs, image_path, content_hash, return_bytes)
+            tasks.append(((pdf_file, start, end), _extract_xrefs, args))
+
+    sink = ImageSink(image_path, archive_name, keep_existing=content_hash) if return_bytes else None
+    # With an archive, this run's images only exist once sink.close() has written it to disk:
+    # until then ledger rows and index entries are held back, so a crash never records
+    # images that were lost with the unfinished archive (the work is simply redone)
+    deferred = []
+
+    def record(function, *args):
+        if sink is not None and sink.archive is not None:
+            deferred.append((function, args))
+        else:
+            function(*args)
+
+    def save_document(pdf_file, state, entries):
+        index[pdf_file] = entries
+        ledger.record_document(state["sha256"], params, pdf_file, entries,
+                               len(state["stored"]), len(state["skipped"]), state["seconds"])
+
+    def finish_document(pdf_file):
+        """Records a completed PDF in the ledger and the index."""
+        state = documents[pdf_file]
+        stored, skipped = state["stored"], state["skipped"]
+        entries = []
+        for page, img_index, xref in state["occurrences"]:
+            entry = {"page": page + 1, "image": img_index + 1, "xref": xref, "file": stored.get(xref)}
+            if xref in skipped:
+                entry["skipped"] = skipped[xref]
+            entries.append(entry)
+        record(save_document, pdf_file, state, entries)
+        print(f"Finished processing '{pdf_file}'. Image occurrences: {len(entries)}, "
+              f"unique images stored: {len(stored)}, filtered out: {len(skipped)} ({state['seconds']:.1f} s)")
+
+    try:
+        for pdf_file, state in documents.items():
+            if state["pending"] == 0:
+                finish_document(pdf_file)
+
+        with ThreadPoolExecutor(max_workers=CONVERT_THREADS) as converter:
+            for (pdf_file, start, end), result, error in _run_tasks(tasks, workers):
+                state = documents[pdf_file]
+                state["pending"] -= 1
+                if error:
+                    print(f"Error processing '{pdf_file}' pages {start+1}-{end}: {error}")
+                    state["failed"] = True
+                    continue
+
+                images, seconds = result
+                if return_bytes:
+                    # Recompress this shard in threads while the processes keep extracting
+                    if convert_to:
+                        converted = converter.map(lambda item: convert_image(*item, fmt=convert_to), images.values())
+                    else:
+                        converted = images.values()
+                    shard_files = {}
+                    for xref, (image_filename, image_bytes) in zip(list(images), converted):
+                        sink.add(image_filename, image_bytes)
+                        shard_files[xref] = image_filename
+                    images = shard_files
+
+                state["stored"].update(images)
+                state["seconds"] += seconds
+                record(ledger.record_shard, state["sha256"], params, start, images, seconds)
+                if state["pending"] == 0 and not state["failed"]:
+                    finish_document(pdf_file)
+    finally:
+        try:
+            if sink:
+                sink.close()
+            for function, args in deferred:
+                function(*args)
+        finally:
+            ledger.close()
+            for pdf_file, original in aliases.items():
+                if original in index:
+                    index[pdf_file] = index[original]
+            save_index(image_path, index)
+
+    for pdf_file, state in documents.items():
+        if state["failed"]:
+            print(f"'{pdf_file}' finished with errors; its completed page ranges will be reused next run.")
+    return index
+
 
 if __name__ == "__main__":
-    extract_images_from_pdfs()
\ No newline at end of file
+    extract_images_parallel()
@@ -0,0 +1,219 @@
+import subprocess
+import os
+import re
+import sys
+import time
+
+# ========================== HEADER ==========================
+#  Script: Unir Streams de Video y Audio en Cuanto Terminan (Watcher)
+#  Descripción:
+#      Versión "vigilante" de '02_unir_videos.py'. El script original
+#      revisa 'videos_descargados' una sola vez, cuando ya terminaron
+#      todas las descargas, y supone que el .mp4 es el video y el .webm
+#      es el audio (falla con contenedores mezclados).
+#
+#      Este script se deja corriendo MIENTRAS se descarga:
+#      - Revisa la carpeta cada POLL_INTERVAL segundos (sondeo, funciona
+#        igual en Windows y Linux).
+#      - Usa ffprobe para saber qué contiene cada archivo '.fNNN.*'
+#        (solo video o solo audio), sin importar la extensión.
+#      - En cuanto las dos mitades de un video existen y ya no están
+#        creciendo, las une con '-c copy' (sin recodificar).
+#      - Opcionalmente borra los archivos originales (DELETE_SOURCES).
+#
+#  Uso:
+#      1. Inicia las descargas. Con 03_youtube_downloader_manager.py pon
+#         MERGE_WITH_WATCHER = True: si no, yt-dlp une y borra las mitades
+#         por su cuenta y los dos procesos compiten por los mismos archivos.
+#      2. En otra terminal ejecuta:
+#             python 02_unir_videos_watcher.py [carpeta]
+#         'carpeta' es la que vigila (por defecto 'videos_descargados'); para
+#         el administrador es la que imprime, p. ej. 'videos_descargados_P1_mkv'.
+#      3. Se detiene solo tras IDLE_EXIT_SECONDS sin trabajo (o con Ctrl+C).
+# ============================================================
+
+# ----------------- ⚙️ CONFIGURACIÓN -----------------
+script_dir = os.path.dirname(os.path.abspath(__file__))
+target_dir_name = "videos_descargados"  # Se puede cambiar con el primer argumento
+target_dir = os.path.join(script_dir, sys.argv[1] if len(sys.argv) > 1 else target_dir_name)
+
+POLL_INTERVAL = 5          # Segundos entre revisiones de la carpeta
+STABLE_CHECKS = 2          # Revisiones seguidas con el mismo tamaño para considerar terminado un archivo
+IDLE_EXIT_SECONDS = 600    # Salir tras este tiempo sin archivos pendientes (0 = nunca)
+DELETE_SOURCES = False     # Borrar las mitades originales después de unir
+OUTPUT_FORMATS = ["mp4", "mkv"]  # Si el .mp4 no acepta los códecs, se usa .mkv
+# ----------------------------------------------------
+
+# Patrón regex para identificar y separar el sufijo (.fXXX.ext), con cualquier contenedor.
+# Ids de formato de yt-dlp: '137', '140-drc', '251-1', 'hls-1080p', 'dash-video_...', 'http-720p'
+suffix_pattern = re.compile(r'\.f(?:\d+(?:-\w+)?|(?:hls|dash|http)-[\w=-]+)\.(\w+)$')
+# Archivos temporales de yt-dlp: esa mitad todavía se está descargando
+temp_suffixes = (".part", ".ytdl")
+# 'x.f137.mp4.part-Frag12' (fragmentos) y 'x.f137.temp.mp4' (temporal de un postprocesador)
+fragment_pattern = re.compile(r'\.part-Frag\d+.*$')
+temp_extension_pattern = re.compile(r'\.temp(\.\w+)$')
+
+
+def downloading_target(filename):
+    """Nombre del archivo que yt-dlp está escribiendo a través de `filename`, o None si no es temporal."""
+    for suffix in temp_suffixes:
+        if filename.endswith(suffix):
+            return filename[:-len(suffix)]
+    if fragment_pattern.search(filename):
+        return fragment_pattern.sub('', filename)
+    if temp_extension_pattern.search(filename):
+        return temp_extension_pattern.sub(r'\1', filename)
+    return None
+
+
+def probe_stream_types(path):
+    """Devuelve el conjunto de tipos de stream del archivo: {'video'}, {'audio'}, ..."""
+    result = subprocess.run(
+        ['ffprobe', '-v', 'quiet', '-show_entries', 'stream=codec_type', '-of', 'csv=p=0', path],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        check=True
+    )
+    return {line.strip().strip(",") for line in result.stdout.splitlines() if line.strip()}
+
+
+def merge_pair(prefix, video_path, audio_path):
+    """Une video y audio con -c copy. Devuelve la ruta final o None si falla."""
+    for extension in OUTPUT_FORMATS:
+        output_path = os.path.join(target_dir, f"{prefix}.{extension}")
+        temp_path = os.path.join(target_dir, f"{prefix}.merging.{extension}")
+        command = [
+            'ffmpeg', '-nostdin', '-y', '-loglevel', 'error',
+            '-i', video_path,
+            '-i', audio_path,
+            '-c', 'copy',
+            '-map', '0:v',
+            '-map', '1:a',
+            temp_path
+        ]
+        result = subprocess.run(command, text=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        if result.returncode == 0:
+            os.replace(temp_path, output_path)
+            return output_path
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        print(f"   ⚠️ No se pudo unir como .{extension}: {result.stderr.strip()[-200:]}")
+    return None
+
+
+class MergeWatcher:
+    """Vigila la carpeta y une cada par en cuanto sus dos mitades están completas."""
+
+    def __init__(self):
+        self.sizes = {}          # ruta -> (tamaño, revisiones estables)
+        self.stream_types = {}   # ruta -> {'video'} / {'audio'} (cache de ffprobe)
+        self.done = set()        # prefijos ya unidos en esta ejecución
+        self.merged_count = 0
+
+    def is_stable(self, path):
+        """True si el tamaño no cambió en las últimas STABLE_CHECKS revisiones."""
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            # yt-dlp lo renombró o lo borró entre listdir y getsize: todavía no está listo
+            self.sizes.pop(path, None)
+            return False
+        previous_size, checks = self.sizes.get(path, (None, 0))
+        checks = checks + 1 if size == previous_size else 0
+        self.sizes[path] = (size, checks)
+        return checks >= STABLE_CHECKS
+
+    def scan(self):
+        """Una revisión de la carpeta. Devuelve cuántos prefijos siguen pendientes."""
+        filenames = os.listdir(target_dir)
+        downloading = {downloading_target(name) for name in filenames} - {None}
+
+        # Prefijo limpio -> {"video": ruta, "audio": ruta}
+        halves = {}
+        for filename in filenames:
+            match = suffix_pattern.search(filename)
+            if not match:
+                continue
+            clean_prefix = suffix_pattern.sub('', filename)
+            if clean_prefix in self.done:
+                continue
+            # Unido en una ejecución anterior (sin borrar las fuentes)
+            if any(os.path.exists(os.path.join(target_dir, f"{clean_prefix}.{ext}")) for ext in OUTPUT_FORMATS):
+                self.done.add(clean_prefix)
+                continue
+            halves.setdefault(clean_prefix, {})
+
+            full_path = os.path.join(target_dir, filename)
+            if filename in downloading or not self.is_stable(full_path):
+                continue
+
+            if full_path not in self.stream_types:
+                try:
+                    self.stream_types[full_path] = probe_stream_types(full_path)
+                except subprocess.CalledProcessError:
+                    continue  # Todavía no es legible; se reintenta en la próxima revisión
+            types = self.stream_types[full_path]
+
+            if types == {"video"}:
+                halves[clean_prefix]["video"] = full_path
+            elif types == {"audio"}:
+                halves[clean_prefix]["audio"] = full_path
+
+        pending = 0
+        for prefix, paths in halves.items():
+            if "video" not in paths or "audio" not in paths:
+                pending += 1
+                continue
+
+            print(f"\n--- 🔄 UNIENDO: '{prefix}' ---")
+            output_path = merge_pair(prefix, paths["video"], paths["audio"])
+            if not output_path:
+                print(f"❌ ERROR al unir '{prefix}'. Se deja para revisión manual.")
+                self.done.add(prefix)
+                continue
+
+            self.done.add(prefix)
+            self.merged_count += 1
+            print(f"✅ UNIÓN EXITOSA: '{os.path.basename(output_path)}'")
+
+            if DELETE_SOURCES:
+                for path in (paths["video"], paths["audio"]):
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
+                    self.sizes.pop(path, None)
+                    self.stream_types.pop(path, None)
+                print("🗑️ Archivos originales eliminados.")
+        return pending
+
+
+if __name__ == "__main__":
+    print("\n🎬 INICIANDO VIGILANTE DE UNIÓN DE VIDEO Y AUDIO...\n")
+
+    os.makedirs(target_dir, exist_ok=True)
+    print(f"🔎 Vigilando: {target_dir} (cada {POLL_INTERVAL} s, Ctrl+C para salir)")
+
+    watcher = MergeWatcher()
+    last_activity = time.time()
+    try:
+        while True:
+            merged_before = watcher.merged_count
+            pending = watcher.scan()
+            if pending or watcher.merged_count != merged_before:
+                last_activity = time.time()
+            elif IDLE_EXIT_SECONDS and time.time() - last_activity > IDLE_EXIT_SECONDS:
+                print(f"\n💤 {IDLE_EXIT_SECONDS} s sin archivos pendientes. Saliendo.")
+                break
+            time.sleep(POLL_INTERVAL)
+    except KeyboardInterrupt:
+        print("\n🛑 Vigilante detenido por el usuario.")
+    except FileNotFoundError as e:
+        # Solo el ejecutable: los archivos que desaparecen se manejan dentro de scan()
+        if e.filename not in ("ffmpeg", "ffprobe"):
+            raise
+        print("❌ ERROR: FFmpeg/ffprobe no se encontró. Asegúrate de que está instalado y en el PATH del sistema.")
+        exit(1)
+
+    print(f"\n✅ PROCESO FINALIZADO. Pares unidos: {watcher.merged_count}\n")
@@ -0,0 +1,247 @@
+import subprocess
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# ========================== HEADER ==========================
+# Script: Administrador de Descargas en Paralelo con yt-dlp
+# Descripción:
+#     Versión concurrente de '01_youtube_video_downloader_qParameter.py'.
+#     Los scripts 01 llaman a yt-dlp una URL a la vez y cada llamada vuelve
+#     a extraer las cookies de Firefox. Este script:
+#     - Exporta las cookies de Firefox UNA sola vez a 'cookies.txt' y
+#       reutiliza ese archivo en todas las descargas (cada descarga usa su
+#       propia copia temporal, porque yt-dlp reescribe el archivo al salir).
+#     - Descarga varias URLs al mismo tiempo (MAX_CONCURRENT_DOWNLOADS).
+#     - Activa la descarga de fragmentos en paralelo de yt-dlp
+#       (--concurrent-fragments) para streams DASH/HLS.
+#     - Usa '--download-archive' para que los videos ya descargados se
+#       salten al volver a ejecutar (también dentro de playlists).
+#     - Expande las playlists en videos individuales para repartirlos
+#       entre las descargas simultáneas.
+#     - Con MERGE_WITH_WATCHER = True no une video y audio: deja las mitades
+#       '.fNNN.*' para que las una '02_unir_videos_watcher.py' mientras siguen
+#       las descargas (ejecútalo con la carpeta de salida de este script).
+#
+# Requisitos:
+#     - Python, yt-dlp (actualizado), FFmpeg
+#     - Paquete 'browser-cookie3' instalado.
+#     - Node.js o Deno (Runtime JS) para desencriptar firmas.
+# ============================================================
+
+# ----------------- ⚙️ CONFIGURACIÓN DE DESCARGA -----------------
+# 1: Máxima Calidad Disponible (Formato original, sin forzar resolución ni códec)
+# 2: 1080p MP4 (Fuerza 1080p, Códec H.264, Salida MP4)
+# 3: 720p MP4 (Fuerza 720p, Códec H.264, Salida MP4)
+DOWNLOAD_PRESET = 1
+
+MAX_CONCURRENT_DOWNLOADS = 3   # URLs descargándose al mismo tiempo
+CONCURRENT_FRAGMENTS = 4       # Fragmentos en paralelo por cada descarga (-N)
+EXPAND_PLAYLISTS = True        # Repartir los videos de una playlist entre las descargas
+BROWSER_NAME = 'firefox'       # Navegador del que se exportan las cookies
+COOKIES_MAX_AGE_HOURS = 12     # Volver a exportar si cookies.txt es más viejo
+MERGE_WITH_WATCHER = False     # True: no unir aquí, lo hace 02_unir_videos_watcher.py
+# -------------------------------------------------------------
+
+# --- Definición de Preajustes (los mismos del script qParameter) ---
+PRESETS = {
+    1: {
+        'format_string': 'bestvideo+bestaudio/best',
+        'output_format': 'mkv',
+        'description': 'Máxima Calidad Disponible (Auto)'
+    },
+    2: {
+        'format_string': 'bestvideo[height=1080][vcodec^=avc]+bestaudio/best',
+        'output_format': 'mp4',
+        'description': '1080p H.264 (MP4)'
+    },
+    3: {
+        'format_string': 'bestvideo[height=720][vcodec^=avc]+bestaudio/best',
+        'output_format': 'mp4',
+        'description': '720p H.264 (MP4)'
+    }
+}
+
+# -------------------------------------------------------------
+
+
+def export_cookies(cookies_file, sample_url):
+    """Extrae las cookies del navegador una sola vez y las guarda en formato Netscape."""
+    if os.path.exists(cookies_file):
+        age_hours = (time.time() - os.path.getmtime(cookies_file)) / 3600
+        if age_hours < COOKIES_MAX_AGE_HOURS:
+            print(f"🍪 Reutilizando cookies exportadas hace {age_hours:.1f} h: {cookies_file}")
+            return
+
+    print(f"🍪 Exportando cookies de {BROWSER_NAME} a: {cookies_file}")
+    # Con --cookies-from-browser + --cookies, yt-dlp guarda las cookies leídas en el archivo
+    command = [
+        'yt-dlp',
+        '--cookies-from-browser', BROWSER_NAME,
+        '--cookies', cookies_file,
+        '--skip-download',
+        '--quiet', '--no-warnings',
+        sample_url
+    ]
+    subprocess.run(command, check=True, text=True, encoding="utf-8")
+
+
+def expand_playlist(url, cookies_file):
+    """Devuelve las URLs de cada video de una playlist (o [url] si no es playlist)."""
+    if not EXPAND_PLAYLISTS or ('list=' not in url and '/playlist' not in url):
+        return [url]
+
+    command = [
+        'yt-dlp',
+        '--cookies', cookies_file,
+        '--flat-playlist',
+        '--print', 'url',
+        '--quiet', '--no-warnings',
+        url
+    ]
+    result = subprocess.run(command, check=True, text=True, encoding="utf-8", stdout=subprocess.PIPE)
+    entries = [line.strip() for line in result.stdout.splitlines() if line.strip().startswith("http")]
+    return entries or [url]
+
+
+def watcher_format_string(format_string):
+    """
+    'bestvideo[...]+bestaudio/best' -> 'bestvideo[...],bestaudio': con ',' yt-dlp descarga
+    cada mitad como archivo aparte y no las une (ni las borra).
+    """
+    return format_string.split('/')[0].replace('+', ',')
+
+
+def build_format_args(config, output_dir):
+    if MERGE_WITH_WATCHER:
+        # El sufijo .f<format_id> es el que busca el watcher para emparejar las mitades
+        return [
+            '-f', watcher_format_string(config['format_string']),
+            '-o', os.path.join(output_dir, '%(title)s.f%(format_id)s.%(ext)s'),
+        ]
+    return [
+        '-f', config['format_string'],
+        '--merge-output-format', config['output_format'],
+        '-o', os.path.join(output_dir, '%(title)s.%(ext)s'),
+    ]
+
+
+def download_url(url, config, output_dir, cookies_file, archive_file):
+    """Descarga una URL con yt-dlp. Lanza CalledProcessError si falla."""
+    # yt-dlp vuelve a guardar las cookies en el archivo al terminar: con varias
+    # descargas a la vez sobre el mismo cookies.txt se pisan y lo pueden corromper
+    fd, job_cookies_file = tempfile.mkstemp(prefix="cookies_", suffix=".txt")
+    os.close(fd)
+    shutil.copyfile(cookies_file, job_cookies_file)
+
+    command = [
+        'yt-dlp',
+
+        # ** AUTENTICACIÓN: copia de las cookies exportadas una sola vez **
+        '--cookies', job_cookies_file,
+
+        # ** PRECAUCIÓN: Añadir Referer (ayuda contra ciertos bloqueos) **
+        '--referer', url,
+
+        # ** RENDIMIENTO: fragmentos en paralelo y archivo de descargas hechas **
+        '--concurrent-fragments', str(CONCURRENT_FRAGMENTS),
+        '--download-archive', archive_file,
+
+        # Con varias descargas a la vez, la barra de progreso se mezcla: solo errores
+        '--quiet', '--no-warnings',
+
+        # *** FORMATO DEL PREAJUSTE, RUTA Y NOMBRE DE SALIDA ***
+        *build_format_args(config, output_dir),
+        url
+    ]
+    try:
+        subprocess.run(command, check=True, text=True, encoding="utf-8")
+    finally:
+        os.remove(job_cookies_file)
+
+
+if __name__ == "__main__":
+    if DOWNLOAD_PRESET not in PRESETS:
+        print(f"❌ ERROR: El valor de DOWNLOAD_PRESET ({DOWNLOAD_PRESET}) no es válido.")
+        print("Por favor, usa 1, 2 o 3.")
+        exit(1)
+
+    config = PRESETS[DOWNLOAD_PRESET]
+
+    print(f"\n🎬 INICIANDO ADMINISTRADOR DE DESCARGAS EN PARALELO...\n")
+    print(f"🔧 PREAJUSTE SELECCIONADO: {DOWNLOAD_PRESET} - {config['description']}")
+
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    input_file_name = "videos.txt"
+    input_file = os.path.join(script_dir, input_file_name)
+    output_dir_name = f"videos_descargados_P{DOWNLOAD_PRESET}_{config['output_format']}"
+    output_dir = os.path.join(script_dir, output_dir_name)
+    cookies_file = os.path.join(script_dir, "cookies.txt")
+    # El archivo de descargas hechas es por preajuste: otra calidad es otra descarga
+    archive_file = os.path.join(output_dir, "descargas_completadas.txt")
+
+    os.makedirs(output_dir, exist_ok=True)
+
+    if not os.path.exists(input_file):
+        print(f"❌ ERROR: No se encontró el archivo '{input_file_name}' en la ruta esperada.")
+        exit(1)
+
+    with open(input_file, "r", encoding="utf-8") as file:
+        urls = [line.strip() for line in file if line.strip().startswith("http")]
+
+    if not urls:
+        print(f"⚠️ ADVERTENCIA: El archivo '{input_file_name}' está vacío o no contiene URLs válidas.")
+        exit(0)
+
+    try:
+        export_cookies(cookies_file, urls[0])
+    except subprocess.CalledProcessError as e:
+        print(f"❌ ERROR al exportar las cookies de {BROWSER_NAME}: {e}")
+        exit(1)
+    except FileNotFoundError:
+        print("❌ ERROR: 'yt-dlp' no se encontró. Asegúrate de haberlo instalado y de que FFmpeg esté en tu PATH.")
+        exit(1)
+
+    # --- EXPANDIR PLAYLISTS ---
+    video_urls = []
+    for url in urls:
+        try:
+            entries = expand_playlist(url, cookies_file)
+        except subprocess.CalledProcessError as e:
+            print(f"⚠️ No se pudo expandir la playlist {url} ({e}). Se descargará completa.")
+            entries = [url]
+        video_urls.extend(entries)
+
+    print(f"✅ Se encontraron {len(video_urls)} videos para descargar ({len(urls)} URLs en '{input_file_name}').")
+    print(f"⚙️ {MAX_CONCURRENT_DOWNLOADS} descargas simultáneas, {CONCURRENT_FRAGMENTS} fragmentos por descarga.")
+    print(f"💾 Los videos se guardarán en: {output_dir}\n")
+    if MERGE_WITH_WATCHER:
+        print(f"🔗 Sin unir: ejecuta en otra terminal  python 02_unir_videos_watcher.py \"{output_dir}\"\n")
+
+    # --- PROCESAMIENTO DE DESCARGA EN PARALELO ---
+    failed = []
+    start_time = time.time()
+    with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_DOWNLOADS) as executor:
+        futures = {
+            executor.submit(download_url, url, config, output_dir, cookies_file, archive_file): url
+            for url in video_urls
+        }
+        for done_count, future in enumerate(as_completed(futures), start=1):
+            url = futures[future]
+            try:
+                future.result()
+                print(f"✅ [{done_count}/{len(video_urls)}] Listo: {url}")
+            except subprocess.CalledProcessError as e:
+                failed.append(url)
+                print(f"❌ [{done_count}/{len(video_urls)}] ERROR al descargar la URL {url}. Detalles: {e}")
+
+    elapsed = time.time() - start_time
+    print(f"\n⏱️ Tiempo total: {elapsed / 60:.1f} min")
+    if failed:
+        print(f"⚠️ {len(failed)} descargas fallaron (vuelve a ejecutar el script para reintentarlas):")
+        for url in failed:
+            print(f"   - {url}")
+
+    print("\n✅ TODAS LAS DESCARGAS HAN FINALIZADO CORRECTAMENTE (o se reportaron los errores).\n")
@@ -2,11 +2,18 @@ import re
 import os
 from typing import Tuple, List
 
+from heading_index import HeadingStack, headings_path_for, marker_line, write_headings
+from intermediate_format import binary_path_for, write_binary
+from pipeline_profiler import PipelineProfiler
+
 # === BASE CONFIGURATION ===
 input_file = "raw_content.txt"  # Raw input source
 output_dir = "epub_parts"       # Target output directory
 output_file_name = "input01.txt" # Standardized output filename
 output_file = os.path.join(output_dir, output_file_name)
+# Also write input01.bin (typed records, see intermediate_format.py). Script 02 reads it instead of
+# re-classifying the text lines; input01.txt is still written and can be edited by hand.
+WRITE_BINARY_INTERMEDIATE = True
 
 # --- Protection Lists and Placeholders (Remains identical) ---
 
@@ -81,13 +88,17 @@ def split_header_and_content(file_path: str) -> Tuple[str, List[str]]:
 
 
 # === Initialization ===
+profiler = PipelineProfiler("01_manage_raw_input.py")  # Opt-in: EPUB_PROFILE=1
+profiler.start("read_input")
 full_header, raw_lines = split_header_and_content(input_file)
+profiler.stop("read_input", items=len(raw_lines))
 os.makedirs(output_dir, exist_ok=True)
 
 output_lines = []
-current_levels = {}
+heading_stack = HeadingStack()
 
 # === Main Processing Loop ===
+profiler.start("sentence_split")
 for line in raw_lines:
 
     # --- Title and Subtitle handling ---
@@ -103,14 +114,9 @@ for line in raw_lines:
         if match:
             level = int(match.group(1))
             title = match.group(2).strip()
-            current_levels[level] = title
-
-            for key in list(current_levels.keys()):
-                if key > level:
-                    del current_levels[key]
-
-            hierarchy = " > ".join(current_levels[i] for i in sorted(current_levels))
-            output_lines.append(f"[{hierarchy}]")
+            # The stack closes deeper levels and numbers the heading (see heading_index.py)
+            record = heading_stack.push(level, title)
+            output_lines.append(marker_line(record))
             output_lines.append("===")
 
     # --- Image handling ---
@@ -201,7 +207,10 @@ if output_lines and output_lines[-1] == "===":
         output_lines.append(raw_lines[-1].strip())
         output_lines.append("===")
 
+profiler.stop("sentence_split", items=len(output_lines))
+
 # === Save Results ===
+profiler.start("write_output")
 with open(output_file, "w", encoding="utf-8") as f:
     # 1. Write the full metadata header
     f.write(full_header) 
@@ -209,6 +218,14 @@ with open(output_file, "w", encoding="utf-8") as f:
     # 2. Write processed content (one sentence per line)
     f.write("\n".join(output_lines))
     f.write("\n") # Final newline for cleanliness
-    
+
+# 3. Heading hierarchy as structured data (one record per marker line)
+write_headings(headings_path_for(output_file), heading_stack.records)
+
+# 4. Same content as typed binary records
+if WRITE_BINARY_INTERMEDIATE:
+    write_binary(binary_path_for(output_file), full_header, output_lines, heading_stack.records)
+profiler.stop("write_output", items=len(output_lines))
+profiler.save()
 
 print(f"✅ Preprocessing complete. File saved to {output_file}")
\ No newline at end of file
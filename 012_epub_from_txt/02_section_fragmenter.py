@@ -4,6 +4,8 @@
 # This script is an alternative content generator. It fragments content by Level 1/2 sections,
 # grouping all sentences, subheadings (L3+), and images within those sections into a SINGLE XHTML file.
 # Markers like '===' are converted into HTML <p> tags, creating a traditional book structure.
+# Sections are streamed to disk block by block (SectionWriter), so memory use doesn't grow with
+# section size. Huge sections can be split with MAX_FRAGMENT_BYTES or the MAX_FRAGMENT_KB header key.
 #
 # Input: epub_parts/input01.txt
 # Output: Fewer, larger XHTML files, cover.jpg, toc_data.json
@@ -12,11 +14,15 @@
 
 import os
 import html
-import re
 import json
 from PIL import Image, ImageDraw, ImageFont, ImageOps
 from math import ceil
-from typing import Dict, List, Tuple
+from typing import Dict, Iterable, List, Tuple
+
+from heading_index import toc_group_key
+from inline_markup import escape_inline
+from intermediate_format import HEADING, IMAGE, PARAGRAPH_BREAK, SENTENCE, binary_path_for, open_content
+from pipeline_profiler import PipelineProfiler
 
 # === CONFIGURATION (Static Settings) ===
 
@@ -31,6 +37,10 @@ FONT_PATH = "fonts/roboto-bold-condensed.ttf" # Assumed path to your font
 FILE_PREFIX = "default_book"
 START_INDEX = 1 
 
+# Optional size limit per section file (0 = no limit). Bigger sections continue in extra files.
+# Overridden by the MAX_FRAGMENT_KB header key.
+MAX_FRAGMENT_BYTES = 0
+
 # Cover Generation Dimensions and Styling
 IMG_WIDTH, IMG_HEIGHT = 1600, 2560
 JPEG_QUALITY = 85
@@ -55,35 +65,18 @@ TOP_MARGIN = 100
 
 # =============================================================
 
-# === METADATA EXTRACTION FUNCTION (Unchanged) ===
+# === METADATA EXTRACTION FUNCTION (typed records, see intermediate_format.py) ===
 
-def extract_metadata_and_content(file_path: str) -> Tuple[Dict[str, str], List[str]]:
-    """Reads the input file and separates metadata from content."""
+def extract_metadata_and_content(file_path: str) -> Tuple[Dict[str, str], Iterable[Tuple[int, object]]]:
+    """
+    Reads the metadata header and returns the content as typed records (intermediate_format.py):
+    from input01.bin when Script 01 wrote it, otherwise classified from the lines of input01.txt.
+    """
     
-    if not os.path.exists(file_path):
+    if not os.path.exists(file_path) and not os.path.exists(binary_path_for(file_path)):
         raise FileNotFoundError(f"Error: Input file '{file_path}' not found. Did Script 01 run?")
 
-    with open(file_path, "r", encoding="utf-8") as f:
-        full_content = f.read()
-
-    HEADER_DELIMITER = "=== START OF CONTENT ==="
-    
-    if HEADER_DELIMITER not in full_content:
-        header_block = full_content
-    else:
-        header_block, content_block_raw = full_content.split(HEADER_DELIMITER, 1)
-
-    metadata = {}
-    for line in header_block.split('\n'):
-        match = re.match(r"([A-Z_]+):\s*(.+)", line)
-        if match:
-            key = match.group(1).strip()
-            value = match.group(2).strip()
-            metadata[key] = value
-
-    content_lines = [line.strip() for line in content_block_raw.split('\n') if line.strip()]
-
-    return metadata, content_lines
+    return open_content(file_path)
 
 # =============================================================
 
@@ -91,13 +84,8 @@ def extract_metadata_and_content(file_path: str) -> Tuple[Dict[str, str], List[s
 
 # === 1. HTML ESCAPE FUNCTION ===
 def escape_and_allow_html_tags(text: str) -> str:
-    """Escapes HTML unsafe characters but allows <b>, <i> tags."""
-    escaped_text = html.escape(text, quote=False)
-    escaped_text = escaped_text.replace("&lt;b&gt;", "<b>")
-    escaped_text = escaped_text.replace("&lt;/b&gt;", "</b>")
-    escaped_text = escaped_text.replace("&lt;i&gt;", "<i>")
-    escaped_text = escaped_text.replace("&lt;/i&gt;", "</i>")
-    return escaped_text
+    """Escapes HTML unsafe characters but allows the whitelisted inline tags (see inline_markup.py)."""
+    return escape_inline(text)
 
 # === 2. WRITE SUMMARY PAGE FUNCTION (Text Stats) ===
 def write_summary_page(metrics: Dict, index: int, file_prefix: str, output_folder: str, metadata: Dict[str, str]) -> int:
@@ -269,7 +257,8 @@ def write_toc(f, entries: List[Dict], depth: int = 0):
     current_level = {}
     for entry in entries:
         if len(entry["levels"]) > depth:
-            key = entry["levels"][depth]
+            # Grouped by heading id (heading_index.py), so sibling sections with the same title stay apart
+            key = toc_group_key(entry, depth)
             if key not in current_level:
                 current_level[key] = []
             current_level[key].append(entry)
@@ -277,8 +266,9 @@ def write_toc(f, entries: List[Dict], depth: int = 0):
     if not current_level: return
 
     f.write(" " * (12 + depth * 4) + "<ul>\n")
-    for key, subentries in current_level.items():
+    for subentries in current_level.values():
         item = subentries[0]
+        key = item["levels"][depth]
         is_terminal = len(item["levels"]) == depth + 1
         link = item["file"] if is_terminal else next((e.get("file") for e in subentries if e.get("file")), None)
         indent_style = f"style='margin-left: {depth * 1.5}em; margin-top: 0.2em; text-align: left;'"
@@ -327,105 +317,167 @@ def write_index_xhtml(toc_entries: List[Dict], file_prefix: str, start_index: in
 
 
 # =============================================================
-# === 6. CORE NEW LOGIC: BUFFER RENDERING AND SECTION WRITING ===
+# === 6. CORE NEW LOGIC: STREAMING SECTION WRITER ===
 # =============================================================
 
-def render_section_buffer_to_html(section_buffer: List[str], metadata: Dict[str, str], images_folder: str) -> str:
-    """Processes accumulated lines, converting sentences into <p> tags, and markers into structural HTML."""
-    
-    html_blocks = []
-    current_paragraph_lines = []
-    
-    def flush_paragraph():
-        nonlocal current_paragraph_lines
-        if current_paragraph_lines:
-            paragraph_text = " ".join(current_paragraph_lines).strip()
-            
-            if paragraph_text:
-                html_blocks.append(f"<p>{escape_and_allow_html_tags(paragraph_text)}</p>")
-            current_paragraph_lines = []
+def render_heading_block(heading: Dict) -> str:
+    """Converts an L3+ heading record (heading_index.py) into its <hN> tag."""
+    # Tags start at H3 for L3, H4 for L4, etc. (Level + 1)
+    # The base_level is handled by the section header
+    tag = min(heading["depth"] + 1, 6)
+    return f"<h{tag}>{html.escape(heading['title'])}</h{tag}>"
 
-    for line in section_buffer:
-        
-        if not line.strip(): continue
 
-        if line.startswith("[") and line.endswith("]"):
-            # A. Heading marker (L3, L4, etc.): Flush existing paragraph, then add new heading
-            flush_paragraph()
-            
-            section_title_parts = line[1:-1].split(" > ")
-            current_title = section_title_parts[-1]
-            current_level = len(section_title_parts)
-            
-            # Tags start at H3 for L3, H4 for L4, etc. (Level + 1)
-            # The base_level is handled by write_section_fragment
-            tag = min(current_level + 1, 6)
-            html_blocks.append(f"<h{tag}>{html.escape(current_title)}</h{tag}>")
-            
-        elif line.startswith("@img:"):
-            # B. Image marker: Flush existing paragraph, then add image structure
-            flush_paragraph()
-            
-            try:
-                parts = line[5:].split("|", 1)
-                img_file = parts[0].strip()
-                alt_text = parts[1].strip() if len(parts) > 1 else ""
-                
-                alt_text_clean = html.escape(alt_text)
-                alt_caption = html.escape(alt_text)
-
-                img_html = f'''
+def render_image_block(img_file: str, alt_text: str, images_folder: str) -> str:
+    """Converts an image record ('@img: file | alt') into the figure structure."""
+    alt_text_clean = html.escape(alt_text)
+    alt_caption = html.escape(alt_text)
+
+    return f'''
     <div class="image-page">
       <figure>
         <img src="../{images_folder}/{html.escape(img_file)}" alt="{alt_text_clean}" />
         <figcaption>{alt_caption}</figcaption>
       </figure>
     </div>'''
-                html_blocks.append(img_html)
-                
-            except Exception as e:
-                html_blocks.append(f"<p class='error'>[Image Error: {html.escape(str(e))}]</p>")
-                print(f"⚠️ Error processing image line in buffer: {line}")
 
 
-        elif line == "===":
-            # C. Paragraph break: Flush sentences into a <p> tag
-            flush_paragraph()
-        
+class SectionWriter:
+    """
+    Streams Level 1/2 sections to their XHTML files.
+    The file is opened when the section starts, every block (<p>, <hN>, figure) is written as soon
+    as it is complete, and the file is closed at the next L1/L2 boundary. Only the sentences of the
+    current paragraph are held in memory, never the whole section.
+
+    With max_fragment_bytes > 0, a section that grows past that size continues in a new file
+    (next counter number, same section title). Splits only happen between blocks, so a single
+    paragraph is never cut. Continuation files have no TOC entry; they follow their section in the spine.
+    """
+
+    def __init__(self, output_folder: str, file_prefix: str, metadata: Dict[str, str], images_folder: str,
+                 counter: int, max_fragment_bytes: int = 0):
+        self.output_folder = output_folder
+        self.file_prefix = file_prefix
+        self.language = metadata.get('LANGUAGE', 'en')
+        self.images_folder = images_folder
+        self.counter = counter  # Number of the next file to create
+        self.max_fragment_bytes = max_fragment_bytes
+        self.files_written = 0
+
+        self.title = None
+        self.base_level = 0
+        self.part = 0
+        self._file = None
+        self._filename = None
+        self._bytes = 0
+        self._blocks_in_file = 0
+        self._paragraph_lines: List[str] = []
+
+    # --- File handling ---
+
+    def _next_filename(self) -> str:
+        filename = f"{self.file_prefix}_{str(self.counter).zfill(4)}.xhtml"
+        self.counter += 1
+        return filename
+
+    def _open_file(self, filename: str):
+        self._filename = filename
+        self._file = open(os.path.join(self.output_folder, filename), "w", encoding="utf-8")
+        self._bytes = 0
+        self._blocks_in_file = 0
+
+        title = html.escape(self.title)
+        if self.part > 1:
+            # Continuation: same section, no repeated primary heading
+            page_title = f"{title} ({self.part})"
+            heading = ""
         else:
-            # D. Sentence line: Accumulate in the current paragraph buffer
-            current_paragraph_lines.append(line)
-            
-    # Flush any remaining lines at the end of the section buffer
-    flush_paragraph()
-            
-    return "\n".join(html_blocks)
-
+            # Determine the primary heading tag: L1 -> H1, L2 -> H2
+            primary_h_tag = f"h{min(self.base_level, 2)}"
+            page_title = title
+            heading = f"<{primary_h_tag}>{title}</{primary_h_tag}>"
 
-def write_section_fragment(title: str, content_html: str, filename: str, output_folder: str, metadata: Dict[str, str], base_level: int = 1):
-    """Writes the accumulated HTML content into a single XHTML file."""
-    
-    filepath = os.path.join(output_folder, filename)
-    
-    # Determine the primary heading tag: L1 -> H1, L2 -> H2
-    primary_h_tag = f"h{min(base_level, 2)}" 
-    
-    with open(filepath, "w", encoding="utf-8") as f:
-        f.write(f'''<?xml version="1.0" encoding="UTF-8"?>
-<html xmlns="http://www.w3.org/1999/xhtml" xml:lang="{metadata.get('LANGUAGE', 'en')}">
+        self._file.write(f'''<?xml version="1.0" encoding="UTF-8"?>
+<html xmlns="http://www.w3.org/1999/xhtml" xml:lang="{self.language}">
     <head>
         <meta charset="UTF-8"/>
-        <title>{html.escape(title)}</title>
+        <title>{page_title}</title>
         <link rel="stylesheet" href="../Styles/Style001.css" type="text/css"/>
     </head>
     <body>
         <div class="section-container">
-            <{primary_h_tag}>{html.escape(title)}</{primary_h_tag}>
-            {content_html}
+            {heading}
+            ''')
+
+    def _close_file(self):
+        self._file.write('''
         </div>
     </body>
 </html>''')
-    print(f"   > Fragment written: {filename}")
+        self._file.close()
+        self._file = None
+        self.files_written += 1
+        if self.part > 1:
+            print(f"   > Fragment written: {self._filename} (continuation {self.part} of '{self.title}')")
+        else:
+            print(f"   > Fragment written: {self._filename}")
+
+    def _write_block(self, block: str):
+        if self.max_fragment_bytes and self._blocks_in_file and self._bytes >= self.max_fragment_bytes:
+            self._close_file()
+            self.part += 1
+            self._open_file(self._next_filename())
+
+        if self._blocks_in_file:
+            block = "\n" + block
+        self._file.write(block)
+        self._blocks_in_file += 1
+        if self.max_fragment_bytes:
+            self._bytes += len(block.encode("utf-8"))
+
+    def _flush_paragraph(self):
+        if self._paragraph_lines:
+            paragraph_text = " ".join(self._paragraph_lines).strip()
+            self._paragraph_lines = []
+            if paragraph_text:
+                self._write_block(f"<p>{escape_and_allow_html_tags(paragraph_text)}</p>")
+
+    # --- Public interface ---
+
+    def start_section(self, title: str, base_level: int) -> str:
+        """Closes the current section (if any) and opens the file of a new one. Returns its filename."""
+        self.end_section()
+        self.title = title
+        self.base_level = base_level
+        self.part = 1
+        filename = self._next_filename()
+        self._open_file(filename)
+        return filename
+
+    def add(self, kind: int, value):
+        """Processes one content record (intermediate_format.py) of the current section (ignored if no section is open)."""
+        if self._file is None:
+            return
+
+        if kind == HEADING:
+            # A. Heading (L3, L4, etc.): Flush existing paragraph, then add new heading
+            self._flush_paragraph()
+            self._write_block(render_heading_block(value))
+        elif kind == IMAGE:
+            # B. Image: Flush existing paragraph, then add image structure
+            self._flush_paragraph()
+            self._write_block(render_image_block(value[0], value[1], self.images_folder))
+        elif kind == PARAGRAPH_BREAK:
+            # C. Paragraph break: Flush sentences into a <p> tag
+            self._flush_paragraph()
+        else:
+            # D. Sentence: Accumulate in the current paragraph
+            self._paragraph_lines.append(value)
+
+    def end_section(self):
+        if self._file is not None:
+            self._flush_paragraph()
+            self._close_file()
 
 
 # =============================================================
@@ -433,11 +485,14 @@ def write_section_fragment(title: str, content_html: str, filename: str, output_
 ## ⚙️ MAIN CODE (Section Fragmentation Logic)
 
 # === 1. Read input file and extract metadata ===
+profiler = PipelineProfiler("02_section_fragmenter.py")  # Opt-in: EPUB_PROFILE=1
+profiler.start("read_input")
 try:
-    metadata, content_lines = extract_metadata_and_content(INPUT_FILE)
+    metadata, content_records = extract_metadata_and_content(INPUT_FILE)
 except (FileNotFoundError, ValueError) as e:
     print(str(e))
     exit(1)
+profiler.stop("read_input", items=len(content_records))
 
 # === 2. Configure dynamic variables from metadata ===
 book_title = metadata.get("TITLE", "Untitled Book")
@@ -446,6 +501,7 @@ book_author = metadata.get("AUTHOR", "")
 file_prefix = metadata.get("PREFIX", FILE_PREFIX)
 cover_art_filename = metadata.get("COVER_IMAGE_ART", "cover_art.jpg")
 book_language = metadata.get('LANGUAGE', 'en')
+max_fragment_bytes = int(metadata["MAX_FRAGMENT_KB"]) * 1024 if metadata.get("MAX_FRAGMENT_KB", "").isdigit() else MAX_FRAGMENT_BYTES
 
 COVER_ART_PATH = os.path.join(IMAGES_FOLDER, cover_art_filename) 
 COVER_OUTPUT_PATH = os.path.join(IMAGES_FOLDER, "cover.jpg") 
@@ -454,10 +510,11 @@ os.makedirs(BASE_OUTPUT_FOLDER, exist_ok=True)
 os.makedirs(IMAGES_FOLDER, exist_ok=True) 
 
 # Calculate Metrics (Condensed for brevity)
+profiler.start("metrics")
 total_sentences = 0
 total_words = 0
-for line in content_lines:
-    if line.startswith("[") or line.startswith("@img:") or line == "===" or line.startswith("#"): continue
+for kind, line in content_records:
+    if kind != SENTENCE: continue
     total_sentences += 1
     total_words += len(line.split())
 book_metrics = { 
@@ -466,10 +523,13 @@ book_metrics = {
     "estimated_pages": ceil(total_words / WORDS_PER_PAGE_ESTIMATE) if total_words > 0 else 0,
     "avg_words_per_sentence": (total_words / total_sentences) if total_sentences > 0 else 0.0,
 }
+profiler.stop("metrics", items=len(content_records))
 print(f"\n✨ Book Metrics Calculated...")
 
 # Generate Cover and Metrics Page (Condensed for brevity)
+profiler.start("cover_render")
 generate_cover_image(book_title, book_intro, book_author, COVER_ART_PATH, COVER_OUTPUT_PATH)
+profiler.stop("cover_render", items=1)
 cover_filename = f"{file_prefix}_{str(START_INDEX).zfill(4)}.xhtml"
 cover_image_ref = os.path.basename(COVER_OUTPUT_PATH) 
 with open(os.path.join(BASE_OUTPUT_FOLDER, cover_filename), "w", encoding="utf-8") as f:
@@ -493,93 +553,47 @@ counter = write_summary_page(book_metrics, counter, file_prefix, BASE_OUTPUT_FOL
 
 # === 6. MAIN CONTENT PROCESSING (Level 2 Fragmenter) ===
 
-current_section_buffer = []
 toc_entries = []
-current_section_title = None 
-current_section_file = None 
-current_section_base_level = 0
+section_writer = SectionWriter(BASE_OUTPUT_FOLDER, file_prefix, metadata, IMAGES_FOLDER, counter, max_fragment_bytes)
+profiler.start("fragment_writes")
 
-for line in content_lines:
-    
-    if line.startswith("#") and not line.lower().startswith("#level"):
-        continue
+for kind, value in content_records:
 
     # --- 1. DETECTAR UN NUEVO PUNTO DE FRAGMENTACIÓN DE NIVEL 2/1 ---
-    if line.startswith("[") and line.endswith("]"):
+    if kind == HEADING:
         
-        section_title_parts = line[1:-1].split(" > ")
-        current_level = len(section_title_parts)
+        heading = value
         
         # 1.1. FRAGMENTACIÓN: Solo si encontramos un Level 1 o Level 2
-        if current_level <= 2:
-            
-            # Si ya hay una sección en curso, la fragmentamos y guardamos
-            if current_section_file:
-                
-                # --- FRAGMENTAR LA SECCIÓN ANTERIOR ---
-                print(f"   > Fragmenting previous section: {current_section_title}")
-                
-                section_html_content = render_section_buffer_to_html(current_section_buffer, metadata, IMAGES_FOLDER)
-                
-                write_section_fragment(
-                    title=current_section_title, 
-                    content_html=section_html_content, 
-                    filename=current_section_file, 
-                    output_folder=BASE_OUTPUT_FOLDER, 
-                    metadata=metadata,
-                    base_level=current_section_base_level
-                )
-                
-                # Reiniciar el buffer
-                current_section_buffer = []
-
-            # --- 1.2. PREPARAR LA NUEVA SECCIÓN (Solo se hace para L1/L2) ---
-            
-            # 1. Establecer título, archivo y agregar a TOC
-            current_section_title = section_title_parts[-1]
-            current_section_file = f"{file_prefix}_{str(counter).zfill(4)}.xhtml"
-            current_section_base_level = current_level
-            
+        if heading["depth"] <= 2:
+            # Cierra la sección en curso (si hay) y abre el archivo de la nueva
+            # NOTA: ESTE ENCABEZADO L1/L2 VA EN LA CABECERA DEL ARCHIVO, NO COMO BLOQUE.
+            current_section_file = section_writer.start_section(heading["title"], heading["depth"])
             toc_entries.append({
-                "levels": section_title_parts,
-                "file": current_section_file
+                "levels": heading["path"],
+                "file": current_section_file,
+                "ids": heading["ids"]
             })
-            counter += 1
-            
-            # NOTA: NO SE AÑADE ESTE ENCABEZADO L1/L2 AL BUFFER.
             
-        # 1.3. ACUMULACIÓN PARA L3, L4, etc.
-        else: # current_level > 2
-             # Esto es un encabezado L3/L4. NO dispara fragmentación, solo se acumula
-             if current_section_file:
-                 current_section_buffer.append(line)
-             # Si no hay current_section_file, se ignora hasta encontrar el primer L1/L2
-
-
-    # --- 2. ACUMULAR CONTENIDO (Texto, ===, @img: o L3+ si ya hay sección activa) ---
-    elif current_section_file:
-        # Se acumula CUALQUIER otra línea (L3+, @img, ===, texto)
-        current_section_buffer.append(line)
+        # 1.2. L3, L4, etc. NO disparan fragmentación: se escriben dentro de la sección actual
+        # (antes del primer L1/L2 se ignoran)
+        else:
+            section_writer.add(kind, heading)
 
+    # --- 2. CONTENIDO (Texto, ===, @img:) de la sección activa ---
+    else:
+        section_writer.add(kind, value)
 
-# --- 3. PROCESAR EL ÚLTIMO FRAGMENTO (FUERA DEL BUCLE) ---
 
-if current_section_buffer and current_section_file:
-    print(f"   > Fragmenting final section: {current_section_title}")
-    
-    section_html_content = render_section_buffer_to_html(current_section_buffer, metadata, IMAGES_FOLDER)
+# --- 3. CERRAR EL ÚLTIMO FRAGMENTO ---
+section_writer.end_section()
+counter = section_writer.counter
 
-    write_section_fragment(
-        title=current_section_title, 
-        content_html=section_html_content, 
-        filename=current_section_file, 
-        output_folder=BASE_OUTPUT_FOLDER, 
-        metadata=metadata,
-        base_level=current_section_base_level
-    )
+profiler.stop("fragment_writes", items=section_writer.files_written)
 
 
 # === 7. WRITE index.xhtml (Unchanged) ===
+profiler.start("toc_build")
 write_index_xhtml(toc_entries, file_prefix, START_INDEX, BASE_OUTPUT_FOLDER)
 
 
@@ -587,6 +601,8 @@ write_index_xhtml(toc_entries, file_prefix, START_INDEX, BASE_OUTPUT_FOLDER)
 toc_data_path = os.path.join(BASE_OUTPUT_FOLDER, "toc_data.json")
 with open(toc_data_path, "w", encoding="utf-8") as f:
     json.dump(toc_entries, f, indent=4)
+profiler.stop("toc_build", items=len(toc_entries))
 
 print(f"✅ TOC hierarchy data saved to {toc_data_path}")
-print("\n✅ Section XHTML files generated successfully, ready for Script 03.")
\ No newline at end of file
+print("\n✅ Section XHTML files generated successfully, ready for Script 03.")
+profiler.save()
\ No newline at end of file
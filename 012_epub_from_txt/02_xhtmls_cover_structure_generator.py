@@ -16,11 +16,15 @@
 
 import os
 import html
-import re
 import json
 from PIL import Image, ImageDraw, ImageFont, ImageOps
 from math import ceil
-from typing import Dict, List, Tuple
+from typing import Dict, Iterable, List, Tuple
+
+from heading_index import toc_group_key
+from inline_markup import escape_inline
+from intermediate_format import HEADING, IMAGE, PARAGRAPH_BREAK, SENTENCE, binary_path_for, open_content
+from pipeline_profiler import PipelineProfiler
 
 # === CONFIGURATION (Static Settings) ===
 
@@ -61,35 +65,16 @@ TOP_MARGIN = 100
 
 # === METADATA EXTRACTION FUNCTION ===
 
-def extract_metadata_and_content(file_path: str) -> Tuple[Dict[str, str], List[str]]:
-    """Reads the input file and separates metadata from content."""
+def extract_metadata_and_content(file_path: str) -> Tuple[Dict[str, str], Iterable[Tuple[int, object]]]:
+    """
+    Reads the metadata header and returns the content as typed records (intermediate_format.py):
+    from input01.bin when Script 01 wrote it, otherwise classified from the lines of input01.txt.
+    """
     
-    if not os.path.exists(file_path):
+    if not os.path.exists(file_path) and not os.path.exists(binary_path_for(file_path)):
         raise FileNotFoundError(f"Error: Input file '{file_path}' not found. Did Script 01 run?")
 
-    with open(file_path, "r", encoding="utf-8") as f:
-        full_content = f.read()
-
-    HEADER_DELIMITER = "=== START OF CONTENT ==="
-    
-    if HEADER_DELIMITER not in full_content:
-        raise ValueError(f"Error: Header delimiter '{HEADER_DELIMITER}' not found in input file.")
-
-    header_block, content_block = full_content.split(HEADER_DELIMITER, 1)
-
-    # 1. Parse Metadata (KEY: VALUE)
-    metadata = {}
-    for line in header_block.split('\n'):
-        match = re.match(r"([A-Z_]+):\s*(.+)", line)
-        if match:
-            key = match.group(1).strip()
-            value = match.group(2).strip()
-            metadata[key] = value
-
-    # 2. Get Content Lines
-    content_lines = [line.strip() for line in content_block.split('\n') if line.strip()]
-
-    return metadata, content_lines
+    return open_content(file_path)
 
 # =============================================================
 
@@ -97,14 +82,8 @@ def extract_metadata_and_content(file_path: str) -> Tuple[Dict[str, str], List[s
 
 # === 1. HTML ESCAPE FUNCTION ===
 def escape_and_allow_html_tags(text: str) -> str:
-    """Escapes HTML unsafe characters but allows <b>, <i> tags."""
-    escaped_text = html.escape(text, quote=False)
-    # Undo escape ONLY for whitelisted HTML tags
-    escaped_text = escaped_text.replace("&lt;b&gt;", "<b>")
-    escaped_text = escaped_text.replace("&lt;/b&gt;", "</b>")
-    escaped_text = escaped_text.replace("&lt;i&gt;", "<i>")
-    escaped_text = escaped_text.replace("&lt;/i&gt;", "</i>")
-    return escaped_text
+    """Escapes HTML unsafe characters but allows the whitelisted inline tags (see inline_markup.py)."""
+    return escape_inline(text)
 
 # === 2. WRITE SENTENCE FRAGMENT FUNCTION ===
 def write_sentence_fragment(sentence_text: str, index: int, file_prefix: str, output_folder: str) -> int:
@@ -302,7 +281,8 @@ def write_toc(f, entries: List[Dict], depth: int = 0):
     current_level = {}
     for entry in entries:
         if len(entry["levels"]) > depth:
-            key = entry["levels"][depth]
+            # Grouped by heading id (heading_index.py), so sibling sections with the same title stay apart
+            key = toc_group_key(entry, depth)
             if key not in current_level:
                 current_level[key] = []
             current_level[key].append(entry)
@@ -310,8 +290,9 @@ def write_toc(f, entries: List[Dict], depth: int = 0):
     if not current_level: return
 
     f.write(" " * (12 + depth * 4) + "<ul>\n")
-    for key, subentries in current_level.items():
+    for subentries in current_level.values():
         item = subentries[0]
+        key = item["levels"][depth]
         is_terminal = len(item["levels"]) == depth + 1
         link = item["file"] if is_terminal else next((e.get("file") for e in subentries if e.get("file")), None)
         indent_style = f"style='margin-left: {depth * 1.5}em; margin-top: 0.2em; text-align: left;'"
@@ -376,11 +357,14 @@ def flush_paragraph_buffer(paragraph_buffer: List[str], counter: int, file_prefi
 ## ⚙️ REFACTORED MAIN CODE
 
 # === 1. Read input file and extract metadata ===
+profiler = PipelineProfiler("02_xhtmls_cover_structure_generator.py")  # Opt-in: EPUB_PROFILE=1
+profiler.start("read_input")
 try:
-    metadata, content_lines = extract_metadata_and_content(INPUT_FILE)
+    metadata, content_records = extract_metadata_and_content(INPUT_FILE)
 except (FileNotFoundError, ValueError) as e:
     print(str(e))
     exit(1)
+profiler.stop("read_input", items=len(content_records))
 
 # === 2. Configure dynamic variables from metadata ===
 book_title = metadata.get("TITLE", "Untitled Book")
@@ -400,16 +384,14 @@ os.makedirs(IMAGES_FOLDER, exist_ok=True) # Ensure root Images folder exists for
 
 # === 3. CALCULATE METRICS BLOCK ===
 # ... (Metric calculation remains the same)
+profiler.start("metrics")
 total_sentences = 0
 total_words = 0
 total_characters_clean = 0
 
-for line in content_lines:
-    if line.startswith("[") and line.endswith("]"): continue
-    if line.startswith("@img:"): continue
-    if line == "===": continue
-    # ⚠️ FIX: Skip comment/separator lines that are NOT level markers
-    if line.startswith("#") and not line.lower().startswith("#level"): continue 
+for kind, line in content_records:
+    # Headings, images, '===' and comment lines are already told apart by the record type
+    if kind != SENTENCE: continue
     
     total_sentences += 1
     words = line.split()
@@ -427,12 +409,15 @@ book_metrics = {
     "avg_words_per_sentence": avg_words_per_sentence,
 }
 
+profiler.stop("metrics", items=len(content_records))
 print(f"\n✨ Book Metrics Calculated: Sentences={total_sentences}, Words={total_words}, Pages={estimated_pages}")
 
 
 # === 4. GENERATE COVER IMAGE AND XHTML ===
 # 4.1. Generate the custom cover image (JPG)
+profiler.start("cover_render")
 generate_cover_image(book_title, book_intro, book_author, COVER_ART_PATH, COVER_OUTPUT_PATH)
+profiler.stop("cover_render", items=1)
 
 # 4.2. Write Cover Page (XHTML)
 cover_filename = f"{file_prefix}_{str(START_INDEX).zfill(4)}.xhtml"
@@ -463,24 +448,21 @@ counter = write_summary_page(book_metrics, counter, file_prefix, BASE_OUTPUT_FOL
 toc_entries = []
 missing_images = []
 paragraph_buffer = []
+first_content_counter = counter
+profiler.start("fragment_writes")
 
-for line in content_lines:
-    
-    # ⚠️ FIX: Ignore lines that start with '#' but are NOT recognized as section levels
-    if line.startswith("#") and not line.lower().startswith("#level"):
-        continue
+for kind, value in content_records:
 
-    if line.startswith("[") and line.endswith("]"):
+    if kind == HEADING:
         # 6.1. Flush previous paragraph buffer
         counter = flush_paragraph_buffer(paragraph_buffer, counter, file_prefix, BASE_OUTPUT_FOLDER)
         paragraph_buffer = []
 
         # 6.2. Write Heading Fragment
-        section_title = line[1:-1]
-        level_titles = section_title.split(" > ")
-        current_level = len(level_titles)
-        tag = min(current_level + 1, 6)
-        current_title = level_titles[-1]
+        heading = value
+        level_titles = heading["path"]
+        tag = min(heading["depth"] + 1, 6)
+        current_title = heading["title"]
 
         # 🛑 CORRECTION APLICADA AQUÍ (Línea 485 corregida de </h{tag>} a </h{tag}>)
         html_heading = f"<h{tag}>{html.escape(current_title)}</h{tag}>"
@@ -502,21 +484,19 @@ for line in content_lines:
 </html>''')
         toc_entries.append({
             "levels": level_titles,
-            "file": filename
+            "file": filename,
+            "ids": heading["ids"]
         })
         counter += 1
 
-    elif line.startswith("@img:"):
+    elif kind == IMAGE:
         # 6.3. Flush previous paragraph buffer
         counter = flush_paragraph_buffer(paragraph_buffer, counter, file_prefix, BASE_OUTPUT_FOLDER)
         paragraph_buffer = []
 
         # 6.4. Write Image Page Fragment
+        img_file, alt_text = value
         try:
-            parts = line[5:].split("|", 1)
-            img_file = parts[0].strip()
-            alt_text = parts[1].strip() if len(parts) > 1 else ""
-
             image_source_path = os.path.join(IMAGES_FOLDER, img_file)
             if not os.path.isfile(image_source_path):
                 missing_images.append(img_file)
@@ -544,19 +524,20 @@ for line in content_lines:
 </html>''')
             counter += 1
         except Exception as e:
-            print(f"⚠️ Error processing image line: {line}\n{e}")
+            print(f"⚠️ Error processing image: {img_file}\n{e}")
 
-    elif line == "===":
+    elif kind == PARAGRAPH_BREAK:
         # 6.5. Flush previous paragraph buffer (end of paragraph)
         counter = flush_paragraph_buffer(paragraph_buffer, counter, file_prefix, BASE_OUTPUT_FOLDER)
         paragraph_buffer = []
 
     else:
-        # 6.6. Sentence line, add to buffer
-        paragraph_buffer.append(line)
+        # 6.6. Sentence, add to buffer
+        paragraph_buffer.append(value)
 
 # === 7. Process any remaining paragraphs at the end of the file ===
 counter = flush_paragraph_buffer(paragraph_buffer, counter, file_prefix, BASE_OUTPUT_FOLDER)
+profiler.stop("fragment_writes", items=counter - first_content_counter)
 
 
 if missing_images:
@@ -568,6 +549,7 @@ else:
 
 
 # === 8. Write index.xhtml ===
+profiler.start("toc_build")
 write_index_xhtml(toc_entries, file_prefix, START_INDEX, BASE_OUTPUT_FOLDER)
 
 
@@ -575,6 +557,8 @@ write_index_xhtml(toc_entries, file_prefix, START_INDEX, BASE_OUTPUT_FOLDER)
 toc_data_path = os.path.join(BASE_OUTPUT_FOLDER, "toc_data.json")
 with open(toc_data_path, "w", encoding="utf-8") as f:
     json.dump(toc_entries, f, indent=4)
+profiler.stop("toc_build", items=len(toc_entries))
 
 print(f"✅ TOC hierarchy data saved to {toc_data_path}")
-print("\n✅ XHTML files generated successfully, ready for Script 03.")
\ No newline at end of file
+print("\n✅ XHTML files generated successfully, ready for Script 03.")
+profiler.save()
\ No newline at end of file
@@ -24,6 +24,9 @@ import json
 import time # <-- Módulo 'time' importado para time.strftime
 from typing import List, Dict, Tuple
 
+from heading_index import toc_group_key
+from pipeline_profiler import PipelineProfiler
+
 # === CONFIGURATION ===
 # Directories and paths must match the output of Script 02
 XHTML_DIR = "epub_parts" # Renamed to match Script 02 output
@@ -42,6 +45,8 @@ COVER_IMAGE_FILENAME = "cover.jpg" # The generated image file
 OUTPUT_EPUB_FILE = f"{FILE_PREFIX}.epub"
 BOOK_ID = "" 
 
+profiler = PipelineProfiler("03_pack_parts_to_epub.py")  # Opt-in: EPUB_PROFILE=1
+
 # ====================================================================
 # === 0. METADATA EXTRACTION FUNCTION (Reused from Script 02)
 # ====================================================================
@@ -200,12 +205,13 @@ def generate_nav_xhtml(toc_entries: List[Dict], style_files: List[str]) -> str:
         
         for entry in entries:
             if len(entry["levels"]) > depth:
-                key = entry["levels"][depth]
+                key = toc_group_key(entry, depth)
                 if key not in current_level_groups:
                     current_level_groups[key] = [] 
                 current_level_groups[key].append(entry)
 
-        for title, sub_entries in current_level_groups.items():
+        for sub_entries in current_level_groups.values():
+            title = sub_entries[0]["levels"][depth]
             
             link_entry = next((e for e in sub_entries if len(e['levels']) == depth + 1), None)
             link_file = link_entry['file'] if link_entry else next((e.get('file') for e in sub_entries if e.get('file')), None)
@@ -265,12 +271,13 @@ def generate_toc_ncx(toc_entries: List[Dict], book_id: str, book_title: str) ->
         
         for entry in entries:
             if len(entry["levels"]) > depth:
-                key = entry["levels"][depth]
+                key = toc_group_key(entry, depth)
                 if key not in current_level_groups:
                     current_level_groups[key] = []
                 current_level_groups[key].append(entry)
 
-        for title, sub_entries in current_level_groups.items():
+        for sub_entries in current_level_groups.values():
+            title = sub_entries[0]["levels"][depth]
             
             link_entry = next((e for e in sub_entries if len(e['levels']) == depth + 1), None)
             link_file = link_entry['file'] if link_entry else next((e.get('file') for e in sub_entries if e.get('file')), None)
@@ -348,6 +355,7 @@ def pack_to_epub(output_file: str, xhtml_dir: str, images_dir: str, styles_dir:
     metrics_xhtml_filename = f"{file_prefix}_0002.xhtml" 
 
     # Collect all XHTMLs
+    profiler.start("collect_files")
     all_xhtml_files = sorted(glob.glob(os.path.join(xhtml_dir, f"{file_prefix}_*.xhtml")))
     all_xhtml_files.extend(glob.glob(os.path.join(xhtml_dir, "index.xhtml")))
 
@@ -363,8 +371,10 @@ def pack_to_epub(output_file: str, xhtml_dir: str, images_dir: str, styles_dir:
     if metrics_file: xhtml_files_spine.append(metrics_file)
     if index_file: xhtml_files_spine.append(index_file)
     xhtml_files_spine.extend(content_files)
+    profiler.stop("collect_files", items=len(xhtml_files_spine))
 
     # Load TOC hierarchy data
+    profiler.start("toc_build")
     toc_entries = []
     toc_data_path = os.path.join(xhtml_dir, "toc_data.json")
     
@@ -384,6 +394,7 @@ def pack_to_epub(output_file: str, xhtml_dir: str, images_dir: str, styles_dir:
 
         except Exception as e:
             print(f"❌ ERROR processing TOC JSON: {e}. Generating a flat ToC.")
+    profiler.stop("toc_build", items=len(toc_entries))
 
     # Collect additional assets from root folders
     image_files = glob.glob(os.path.join(images_dir, "*"))
@@ -391,12 +402,14 @@ def pack_to_epub(output_file: str, xhtml_dir: str, images_dir: str, styles_dir:
     font_files = glob.glob(os.path.join(fonts_dir, "*"))
     
     # --- 2. GENERATE EPUB STRUCTURAL FILES ---
+    profiler.start("opf_ncx_generation")
     opf_content = generate_opf(xhtml_files_spine, image_files, style_files, font_files, metadata)
     
     if not style_files: style_files.append(Path(os.path.join(styles_dir, "placeholder.css")))
             
     nav_content = generate_nav_xhtml(toc_entries, style_files)
     ncx_content = generate_toc_ncx(toc_entries, BOOK_ID, book_title)
+    profiler.stop("opf_ncx_generation", items=len(toc_entries))
 
     # --- 3. ZIP ASSEMBLY (The Critical Step with Progress) ---
     
@@ -409,6 +422,7 @@ def pack_to_epub(output_file: str, xhtml_dir: str, images_dir: str, styles_dir:
     current_count = 0
 
     final_epub_path = f"{file_prefix}.epub"
+    profiler.start("zip")
     with zipfile.ZipFile(final_epub_path, 'w', zipfile.ZIP_DEFLATED) as zf:
         
         print(f"\n📦 Starting EPUB packaging ({total_files} assets to process)...")
@@ -479,6 +493,8 @@ def pack_to_epub(output_file: str, xhtml_dir: str, images_dir: str, styles_dir:
                 f'OEBPS/Fonts/{Path(font_path).name}'
             )
 
+    profiler.stop("zip", items=current_count)
+
     # Print final success message on a new line
     print(f"\n\n✅ EPUB file successfully created: {final_epub_path}")
     print("   Validation status: OK.")
@@ -503,4 +519,5 @@ if __name__ == "__main__":
     os.makedirs(STYLES_DIR, exist_ok=True)
     os.makedirs(FONTS_DIR, exist_ok=True)
 
-    pack_to_epub(OUTPUT_EPUB_FILE, XHTML_DIR, IMAGES_DIR, STYLES_DIR, FONTS_DIR, book_metadata)
\ No newline at end of file
+    pack_to_epub(OUTPUT_EPUB_FILE, XHTML_DIR, IMAGES_DIR, STYLES_DIR, FONTS_DIR, book_metadata)
+    profiler.save()
\ No newline at end of file
@@ -0,0 +1,255 @@
+# 04_batch_build_orchestrator.py
+#
+# === SCRIPT DESCRIPTION ===
+# Builds a whole catalog of books in one run instead of calling scripts 01, 02 and 03 by hand
+# for every title. It performs the following tasks:
+# 1. Finds every raw content file (*.txt) in BOOKS_DIR. Each file is one book with its own header.
+# 2. Prepares a private work folder per book (builds/<name>/) with raw_content.txt and fresh
+#    copies of Styles/, fonts/ and the images (as Images/, the folder name Scripts 02/03 expect).
+# 3. Runs the stages of each book (01 preprocess -> 02 fragment + cover -> 03 pack) as tasks on a
+#    single shared process pool. The stages of one book run in order, but different books overlap,
+#    so all the CPU cores stay busy during the whole catalog rebuild.
+# 4. Copies every finished {PREFIX}.epub to OUTPUT_DIR and writes build_summary.json with the
+#    per-book, per-stage timings (wall and CPU) and any error.
+#
+# The pipeline scripts are executed unchanged with runpy, inside the book's work folder, so they
+# keep working with their relative paths. The console output of every stage goes to a log file
+# in the work folder (logs/<stage>.log) to keep the output of parallel books readable.
+#
+# Input: books/*.txt (same format as raw_content.txt)
+# Output: epubs/*.epub, builds/<name>/ (work folders and logs), build_summary.json
+#
+# =========================================================
+
+import contextlib
+import json
+import os
+import runpy
+import shutil
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Dict, List, Optional, Tuple
+
+# === CONFIGURATION ===
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+BOOKS_DIR = os.path.join(SCRIPT_DIR, "books")     # One raw content file per book
+BUILD_DIR = os.path.join(SCRIPT_DIR, "builds")    # One work folder per book
+OUTPUT_DIR = os.path.join(SCRIPT_DIR, "epubs")    # Final .epub files of the whole catalog
+SUMMARY_FILE = os.path.join(SCRIPT_DIR, "build_summary.json")
+
+MAX_WORKERS = os.cpu_count() or 2
+
+# Shared assets copied into every work folder: source folder -> folder name inside the work folder.
+# A folder named like the book (books/<name>_images/) is merged on top of the shared images.
+SHARED_ASSETS = {
+    "Styles": "Styles",
+    "fonts": "fonts",
+    "images": "Images",
+}
+BOOK_IMAGES_SUFFIX = "_images"
+
+# The FRAGMENT_MODE header key selects the Script 02 variant used for each book.
+FRAGMENTERS = {
+    "section": "02_section_fragmenter.py",
+    "sentence_per_line": "02_xhtmls_cover_structure_generator.py",
+}
+DEFAULT_FRAGMENT_MODE = "section"
+
+# Pipeline stages in order: (stage name, script or None for the fragmenter, file that must exist afterwards).
+# "{prefix}" in the expected file is replaced with the book's PREFIX header value.
+STAGES = [
+    ("preprocess", "01_manage_raw_input.py", os.path.join("epub_parts", "input01.txt")),
+    ("fragment", None, os.path.join("epub_parts", "toc_data.json")),
+    ("pack", "03_pack_parts_to_epub.py", "{prefix}.epub"),
+]
+
+# =============================================================
+
+
+def read_header(file_path: str) -> Dict[str, str]:
+    """Reads only the metadata header (KEY: value lines) of a raw content file."""
+    metadata = {}
+    with open(file_path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.startswith("=== START OF CONTENT ==="):
+                break
+            key, separator, value = line.partition(":")
+            if separator and key.strip().isupper():
+                metadata[key.strip()] = value.strip()
+    return metadata
+
+
+def prepare_workdir(raw_file: str, workdir: str):
+    """Creates a clean work folder for one book with its raw content and the shared assets."""
+    # Old fragments would end up in the new EPUB (Script 03 packs every {PREFIX}_*.xhtml it finds)
+    shutil.rmtree(os.path.join(workdir, "epub_parts"), ignore_errors=True)
+    os.makedirs(os.path.join(workdir, "logs"), exist_ok=True)
+    shutil.copyfile(raw_file, os.path.join(workdir, "raw_content.txt"))
+
+    for source_name, target_name in SHARED_ASSETS.items():
+        source = os.path.join(SCRIPT_DIR, source_name)
+        if os.path.isdir(source):
+            shutil.copytree(source, os.path.join(workdir, target_name), dirs_exist_ok=True)
+
+    book_images = os.path.splitext(raw_file)[0] + BOOK_IMAGES_SUFFIX
+    if os.path.isdir(book_images):
+        shutil.copytree(book_images, os.path.join(workdir, "Images"), dirs_exist_ok=True)
+
+
+def run_stage(workdir: str, stage: str, script_name: str, expected_output: Optional[str]) -> Dict:
+    """
+    Runs one pipeline script inside the book's work folder (executed in a pool worker).
+    Returns the stage timings and the error message, if any.
+    """
+    result = {"seconds": 0.0, "cpu_seconds": 0.0, "error": ""}
+    start_wall = time.perf_counter()
+    start_cpu = time.process_time()
+
+    os.chdir(workdir)
+    if SCRIPT_DIR not in sys.path:
+        sys.path.insert(0, SCRIPT_DIR)
+
+    log_path = os.path.join(workdir, "logs", f"{stage}.log")
+    with open(log_path, "w", encoding="utf-8") as log, contextlib.redirect_stdout(log), contextlib.redirect_stderr(log):
+        try:
+            runpy.run_path(os.path.join(SCRIPT_DIR, script_name), run_name="__main__")
+        except SystemExit as e:
+            if e.code not in (None, 0):
+                result["error"] = f"{script_name} exited with code {e.code}"
+        except Exception as e:
+            result["error"] = f"{type(e).__name__}: {e}"
+
+    # Some scripts call exit() without a code on errors: check the output they should leave behind
+    if not result["error"] and expected_output and not os.path.exists(os.path.join(workdir, expected_output)):
+        result["error"] = f"{script_name} did not create {expected_output} (see {log_path})"
+
+    result["seconds"] = round(time.perf_counter() - start_wall, 3)
+    result["cpu_seconds"] = round(time.process_time() - start_cpu, 3)
+    return result
+
+
+def find_books() -> List[Tuple[str, str]]:
+    """Returns [(book name, raw file)], biggest books first so they do not finish last alone."""
+    books = []
+    for filename in os.listdir(BOOKS_DIR):
+        raw_file = os.path.join(BOOKS_DIR, filename)
+        if filename.lower().endswith(".txt") and os.path.isfile(raw_file):
+            books.append((os.path.splitext(filename)[0], raw_file))
+    books.sort(key=lambda book: os.path.getsize(book[1]), reverse=True)
+    return books
+
+
+def build_catalog(books: List[Tuple[str, str]], workers: int) -> Dict[str, Dict]:
+    """Runs all the books through the pipeline on one process pool. Returns the summary per book."""
+    summary = {}
+    scripts = {}
+    for name, raw_file in books:
+        workdir = os.path.join(BUILD_DIR, name)
+        metadata = read_header(raw_file)
+        fragment_mode = metadata.get("FRAGMENT_MODE", DEFAULT_FRAGMENT_MODE)
+        scripts[name] = {
+            stage: script or FRAGMENTERS.get(fragment_mode, FRAGMENTERS[DEFAULT_FRAGMENT_MODE])
+            for stage, script, _ in STAGES
+        }
+        summary[name] = {
+            "source": os.path.relpath(raw_file, SCRIPT_DIR),
+            "prefix": metadata.get("PREFIX", "default_book"),
+            "fragmenter": scripts[name]["fragment"],
+            "status": "pending",
+            "epub": None,
+            "stages": {},
+            "error": "",
+        }
+        prepare_workdir(raw_file, workdir)
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+
+        def submit(name: str, stage_index: int):
+            stage, _, expected_output = STAGES[stage_index]
+            workdir = os.path.join(BUILD_DIR, name)
+            if expected_output:
+                expected_output = expected_output.format(prefix=summary[name]["prefix"])
+            future = executor.submit(run_stage, workdir, stage, scripts[name][stage], expected_output)
+            running[future] = (name, stage_index)
+
+        running = {}
+        for name, _ in books:
+            submit(name, 0)
+
+        finished = 0
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name, stage_index = running.pop(future)
+                stage = STAGES[stage_index][0]
+                book = summary[name]
+                try:
+                    result = future.result()
+                except Exception as e:  # The worker process itself died
+                    result = {"seconds": 0.0, "cpu_seconds": 0.0, "error": f"{type(e).__name__}: {e}"}
+
+                book["stages"][stage] = {"seconds": result["seconds"], "cpu_seconds": result["cpu_seconds"]}
+                if not result["error"] and stage_index + 1 == len(STAGES):
+                    epub_path = os.path.join(BUILD_DIR, name, f"{book['prefix']}.epub")
+                    try:
+                        shutil.copy2(epub_path, os.path.join(OUTPUT_DIR, os.path.basename(epub_path)))
+                    except OSError as e:
+                        result["error"] = f"Could not copy the EPUB to {OUTPUT_DIR}: {e}"
+
+                if result["error"]:
+                    book["status"] = "failed"
+                    book["error"] = f"[{stage}] {result['error']}"
+                    finished += 1
+                    print(f"❌ [{finished}/{len(books)}] {name}: {book['error']}")
+                elif stage_index + 1 < len(STAGES):
+                    submit(name, stage_index + 1)
+                else:
+                    book["status"] = "ok"
+                    book["epub"] = os.path.relpath(os.path.join(OUTPUT_DIR, os.path.basename(epub_path)), SCRIPT_DIR)
+                    finished += 1
+                    total = sum(s["seconds"] for s in book["stages"].values())
+                    print(f"✅ [{finished}/{len(books)}] {name} -> {book['epub']} ({total:.1f} s)")
+    return summary
+
+
+if __name__ == "__main__":
+    if not os.path.isdir(BOOKS_DIR):
+        print(f"FATAL: Books folder '{BOOKS_DIR}' not found. Put one raw content .txt per book there.")
+        exit(1)
+
+    books = find_books()
+    if not books:
+        print(f"⚠️ No .txt files found in {BOOKS_DIR}.")
+        exit(0)
+
+    os.makedirs(BUILD_DIR, exist_ok=True)
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    print(f"\n📚 Building {len(books)} books with {MAX_WORKERS} worker processes...\n")
+
+    start_time = time.perf_counter()
+    book_summaries = build_catalog(books, MAX_WORKERS)
+    elapsed = time.perf_counter() - start_time
+
+    stage_totals = {stage: 0.0 for stage, _, _ in STAGES}
+    for book in book_summaries.values():
+        for stage, timing in book["stages"].items():
+            stage_totals[stage] += timing["seconds"]
+    failed = sum(1 for book in book_summaries.values() if book["status"] != "ok")
+
+    with open(SUMMARY_FILE, "w", encoding="utf-8") as f:
+        json.dump({
+            "generated": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "workers": MAX_WORKERS,
+            "wall_seconds": round(elapsed, 3),
+            "stage_seconds_total": {stage: round(seconds, 3) for stage, seconds in stage_totals.items()},
+            "books_ok": len(book_summaries) - failed,
+            "books_failed": failed,
+            "books": book_summaries,
+        }, f, indent=4)
+
+    print(f"\n📊 Books: {len(book_summaries)} | Failed: {failed} | Wall time: {elapsed:.1f} s")
+    for stage, seconds in stage_totals.items():
+        print(f"   {stage:<10} {seconds:8.1f} s (sum over books)")
+    print(f"📄 Summary saved to {SUMMARY_FILE}")
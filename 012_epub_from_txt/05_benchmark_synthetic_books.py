@@ -0,0 +1,341 @@
+# 05_benchmark_synthetic_books.py
+#
+# === SCRIPT DESCRIPTION ===
+# Reproducible benchmark for the two EPUB pipelines (009_epub_fragmentado and this folder).
+# The sample inputs of the repo are only a few KB, so they say nothing about how the scripts
+# scale. This script performs the following tasks:
+# 1. Generates synthetic books of 10k / 100k / 1M sentences (fixed random seed, so every run gets
+#    the same text) with configurable heading depth, image density, dialogue ratio and inline markup.
+# 2. Runs every stage of each pipeline (01 preprocess, 02 fragment + cover, 03 pack) as a separate
+#    process in a scratch folder and measures wall time, CPU time and peak memory of each stage.
+#    For the 012 scripts the sub-stage report of pipeline_profiler.py is included as well.
+# 3. Appends one JSON line per (pipeline, size) to benchmark_results.jsonl together with the git
+#    commit, so results can be compared across commits.
+# 4. Prints the time per sentence of every stage for each size: a stage whose cost per sentence
+#    keeps growing with the book size is not linear (flagged with ⚠️).
+#
+# Input: nothing (the books are generated). The 009 and 012 scripts and assets are used as they are.
+# Output: benchmark_results.jsonl, scratch folders in benchmark_runs/ (deleted unless KEEP_RUNS)
+#
+# =========================================================
+
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional
+
+try:
+    import resource  # Not available on Windows: CPU time and memory are then not reported
+except ImportError:
+    resource = None
+
+# === CONFIGURATION ===
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(SCRIPT_DIR)
+
+RESULTS_FILE = os.path.join(SCRIPT_DIR, "benchmark_results.jsonl")
+RUNS_DIR = os.path.join(SCRIPT_DIR, "benchmark_runs")
+KEEP_RUNS = False               # Keep the generated books and outputs for inspection
+
+# Book sizes (sentences). "1m" produces ~1M fragments in 009: expect a long run and a lot of disk.
+SIZES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+SIZES_TO_RUN = ["10k", "100k"]
+PIPELINES_TO_RUN = ["009", "012"]
+
+# Shape of the synthetic books
+RANDOM_SEED = 42
+HEADING_DEPTH = 3               # Deepest #levelN used
+PARAGRAPHS_PER_SECTION = 12     # Average paragraphs between two headings
+SENTENCES_PER_PARAGRAPH = (2, 8)
+WORDS_PER_SENTENCE = (5, 28)
+IMAGE_DENSITY = 0.02            # Probability of an @img: line after a paragraph
+DIALOGUE_RATIO = 0.25           # Share of sentences written as quoted dialogue
+INLINE_MARKUP_RATIO = 0.05      # Share of sentences with <b>, <i> or <important> tags
+ABBREVIATION_RATIO = 0.05       # Share of sentences with "Mr.", "e.g." and similar
+SYNTHETIC_IMAGES = 8            # Distinct image files referenced by the @img: lines
+
+STAGE_TIMEOUT = 6 * 3600        # Seconds before a stage is considered hung
+SUPERLINEAR_FACTOR = 1.5        # Flag stages whose cost per sentence grows more than this
+
+# Pipelines: folder, raw file name expected by script 01, asset folders (source -> target), stages
+PIPELINES = {
+    "009": {
+        "folder": os.path.join(REPO_DIR, "009_epub_fragmentado"),
+        "raw_file": "raw_wikipedia.txt",
+        "assets": {"Styles": "Styles", "fonts": "fonts", "images": "Images"},
+        "stages": [
+            ("preprocess", "01_parse_raw.py"),
+            ("fragment", "02_generate_fragments_and_cover_and_metrics_json.py"),
+            ("pack", "03_pack_to_epub.py"),
+        ],
+    },
+    "012": {
+        "folder": SCRIPT_DIR,
+        "raw_file": "raw_content.txt",
+        "assets": {"Styles": "Styles", "fonts": "fonts", "images": "Images"},
+        "stages": [
+            ("preprocess", "01_manage_raw_input.py"),
+            ("fragment", "02_section_fragmenter.py"),
+            ("pack", "03_pack_parts_to_epub.py"),
+        ],
+    },
+}
+
+# =============================================================
+
+WORDS = (
+    "the a of and to in is was that for on with as by at from his her their it this which "
+    "ancient kingdom fire dark knight castle river silent forest stone ember path journey bell "
+    "lord city shadow light ash flame tower gate storm winter memory song blade ruin ocean "
+    "walked found carried opened watched remembered crossed followed burned returned waited "
+    "slowly quietly never always again beyond under across between before after"
+).split()
+NAMES = ["Solaire", "Anna", "Gwyn", "Miller", "Priscilla", "Jones", "Oswald", "Elena"]
+ABBREVIATIONS = ["Mr. {name}", "Dr. {name}", "e.g. the {word}", "the U.S.A.", "around 5 P.M.", "c. 1200"]
+INLINE_TAGS = ["b", "i", "important"]
+
+
+class BookGenerator:
+    """Deterministic generator of raw books in the #levelN / @img: format of both pipelines."""
+
+    def __init__(self, seed: int = RANDOM_SEED):
+        self.random = random.Random(seed)
+        self.heading_count = 0
+
+    def words(self, count: int) -> str:
+        return " ".join(self.random.choice(WORDS) for _ in range(count))
+
+    def sentence(self) -> str:
+        rnd = self.random
+        text = self.words(rnd.randint(*WORDS_PER_SENTENCE))
+        if rnd.random() < ABBREVIATION_RATIO:
+            abbreviation = rnd.choice(ABBREVIATIONS).format(name=rnd.choice(NAMES), word=rnd.choice(WORDS))
+            text = f"{text} {abbreviation} {self.words(3)}"
+        if rnd.random() < INLINE_MARKUP_RATIO:
+            tag = rnd.choice(INLINE_TAGS)
+            text = f"{text} <{tag}>{self.words(2)}</{tag}> {self.words(2)}"
+        text = text[0].upper() + text[1:]
+        if rnd.random() < DIALOGUE_RATIO:
+            verb = rnd.choice(["said", "asked", "whispered"])
+            mark = "?" if verb == "asked" else ","
+            return f'"{text}{mark}" {verb} {rnd.choice(NAMES)}.'
+        return text + rnd.choice([".", ".", ".", "!", "?"])
+
+    def heading(self, level: int) -> str:
+        self.heading_count += 1
+        return f"#level{level}: {self.words(2).title()} {self.heading_count}"
+
+    def write_content(self, f, total_sentences: int) -> int:
+        """Writes the content lines. Returns the number of @img: references written."""
+        rnd = self.random
+        sentences_left = total_sentences
+        level = 1
+        images = 0
+        f.write(self.heading(1) + "\n\n")
+        paragraphs_in_section = 0
+        while sentences_left > 0:
+            count = min(sentences_left, rnd.randint(*SENTENCES_PER_PARAGRAPH))
+            f.write(" ".join(self.sentence() for _ in range(count)) + "\n\n")
+            sentences_left -= count
+            paragraphs_in_section += 1
+
+            if rnd.random() < IMAGE_DENSITY:
+                images += 1
+                image_number = rnd.randint(1, SYNTHETIC_IMAGES)
+                f.write(f"@img: synthetic_{image_number:02d}.jpg | {self.words(4).capitalize()}\n\n")
+
+            if sentences_left > 0 and paragraphs_in_section >= rnd.randint(1, 2 * PARAGRAPHS_PER_SECTION):
+                # Go at most one level deeper, or back up to any shallower level
+                level = rnd.randint(1, min(level + 1, HEADING_DEPTH))
+                f.write(self.heading(level) + "\n\n")
+                paragraphs_in_section = 0
+        return images
+
+
+def write_raw_book(pipeline: str, path: str, sentences: int) -> Dict:
+    """Generates the raw input of one pipeline. Returns a small description of the book."""
+    generator = BookGenerator()
+    title = f"Synthetic Book {sentences:,} sentences"
+    with open(path, "w", encoding="utf-8", buffering=1024 * 1024) as f:
+        if pipeline == "012":
+            f.write(
+                f"PREFIX: synthetic_{sentences}\nTITLE: {title}\nSUBTITLE: Benchmark corpus\n"
+                f"AUTHOR: Benchmark\nLANGUAGE: en\nCOVER_IMAGE_ART: cover_art.jpg\n"
+                "=== START OF CONTENT ===\n\n"
+            )
+        else:
+            f.write(f"title: {title}\nsubtitle: Benchmark corpus\n\n")
+        images = generator.write_content(f, sentences)
+    return {"headings": generator.heading_count, "images": images, "input_bytes": os.path.getsize(path)}
+
+
+def create_synthetic_images(images_dir: str):
+    """Small JPEGs for the @img: references (the packer zips whatever is in Images/)."""
+    try:
+        from PIL import Image
+    except ImportError:
+        return
+    for number in range(1, SYNTHETIC_IMAGES + 1):
+        shade = 30 * number % 255
+        Image.new("RGB", (800, 600), (shade, 90, 255 - shade)).save(
+            os.path.join(images_dir, f"synthetic_{number:02d}.jpg"), quality=80)
+
+
+def children_usage():
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_CHILDREN)
+
+
+def run_stage(workdir: str, script_path: str, log_path: str, env: Dict[str, str]) -> Dict:
+    """Runs one pipeline script in its own process. Returns wall/CPU time and peak memory."""
+    usage_before = children_usage()
+    start = time.perf_counter()
+    with open(log_path, "w", encoding="utf-8") as log:
+        try:
+            completed = subprocess.run([sys.executable, script_path], cwd=workdir, env=env,
+                                       stdout=log, stderr=subprocess.STDOUT, timeout=STAGE_TIMEOUT)
+            returncode = completed.returncode
+        except subprocess.TimeoutExpired:
+            returncode = "timeout"
+    result = {"seconds": round(time.perf_counter() - start, 3), "returncode": returncode}
+
+    usage_after = children_usage()
+    if usage_after is not None:
+        result["cpu_seconds"] = round(
+            (usage_after.ru_utime + usage_after.ru_stime) - (usage_before.ru_utime + usage_before.ru_stime), 3)
+        # ru_maxrss of the children is the largest child so far: only meaningful if it went up
+        if usage_after.ru_maxrss > usage_before.ru_maxrss:
+            divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+            result["peak_rss_mb"] = round(usage_after.ru_maxrss / divisor, 1)
+    return result
+
+
+def folder_stats(folder: str) -> Dict:
+    files = 0
+    total_bytes = 0
+    for root, _, filenames in os.walk(folder):
+        for filename in filenames:
+            files += 1
+            total_bytes += os.path.getsize(os.path.join(root, filename))
+    return {"files": files, "bytes": total_bytes}
+
+
+def git_commit() -> Dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=REPO_DIR,
+                                    capture_output=True, text=True, check=True).stdout.strip())
+        return {"commit": commit, "dirty": dirty}
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": "unknown", "dirty": None}
+
+
+def benchmark(pipeline: str, size_name: str, commit: Dict) -> Dict:
+    config = PIPELINES[pipeline]
+    sentences = SIZES[size_name]
+    workdir = os.path.join(RUNS_DIR, f"{pipeline}_{size_name}")
+    shutil.rmtree(workdir, ignore_errors=True)
+    os.makedirs(os.path.join(workdir, "logs"))
+
+    for source_name, target_name in config["assets"].items():
+        source = os.path.join(config["folder"], source_name)
+        if os.path.isdir(source):
+            shutil.copytree(source, os.path.join(workdir, target_name), dirs_exist_ok=True)
+    os.makedirs(os.path.join(workdir, "Images"), exist_ok=True)
+    create_synthetic_images(os.path.join(workdir, "Images"))
+
+    print(f"\n📚 [{pipeline}] {size_name}: generating {sentences:,} sentences...")
+    book = write_raw_book(pipeline, os.path.join(workdir, config["raw_file"]), sentences)
+
+    env = dict(os.environ)
+    env["PYTHONPATH"] = config["folder"] + os.pathsep + env.get("PYTHONPATH", "")
+    env["EPUB_PROFILE"] = "1"   # Sub-stage timings from pipeline_profiler.py (012 scripts)
+    env.pop("EPUB_PROFILE_CPROFILE", None)
+    env["EPUB_PROFILE_REPORT"] = os.path.join(workdir, "profile_report.json")
+
+    stages = {}
+    for stage, script in config["stages"]:
+        result = run_stage(workdir, os.path.join(config["folder"], script),
+                           os.path.join(workdir, "logs", f"{stage}.log"), env)
+        stages[stage] = result
+        per_sentence_us = result["seconds"] / sentences * 1e6
+        status = "" if result["returncode"] == 0 else f"  ❌ exit {result['returncode']} (see logs/{stage}.log)"
+        print(f"   {stage:<10} {result['seconds']:9.2f} s  ({per_sentence_us:7.2f} µs/sentence){status}")
+        if result["returncode"] != 0:
+            break
+
+    substages = None
+    if os.path.exists(env["EPUB_PROFILE_REPORT"]):
+        with open(env["EPUB_PROFILE_REPORT"], "r", encoding="utf-8") as f:
+            substages = {script: data["stages"] for script, data in json.load(f).get("scripts", {}).items()}
+
+    epubs = [name for name in os.listdir(workdir) if name.endswith(".epub")]
+    record = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        **commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "pipeline": pipeline,
+        "size": size_name,
+        "sentences": sentences,
+        "params": {
+            "seed": RANDOM_SEED, "heading_depth": HEADING_DEPTH,
+            "paragraphs_per_section": PARAGRAPHS_PER_SECTION, "image_density": IMAGE_DENSITY,
+            "dialogue_ratio": DIALOGUE_RATIO, "inline_markup_ratio": INLINE_MARKUP_RATIO,
+            "abbreviation_ratio": ABBREVIATION_RATIO,
+        },
+        "book": book,
+        "stages": stages,
+        "substages": substages,
+        "ok": all(result["returncode"] == 0 for result in stages.values()) and len(stages) == len(config["stages"]),
+        "epub_bytes": os.path.getsize(os.path.join(workdir, epubs[0])) if epubs else None,
+        "workdir": folder_stats(workdir),
+    }
+    if not KEEP_RUNS:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return record
+
+
+def print_scaling(records: List[Dict]):
+    """Compares the cost per sentence of each stage between the smallest and largest size."""
+    for pipeline in PIPELINES_TO_RUN:
+        runs = sorted((r for r in records if r["pipeline"] == pipeline and r["ok"]), key=lambda r: r["sentences"])
+        if len(runs) < 2:
+            continue
+        smallest, largest = runs[0], runs[-1]
+        print(f"\n📈 [{pipeline}] Cost per sentence, {smallest['size']} -> {largest['size']}:")
+        for stage, result in largest["stages"].items():
+            before: Optional[Dict] = smallest["stages"].get(stage)
+            if not before or before["seconds"] <= 0:
+                continue
+            growth = (result["seconds"] / largest["sentences"]) / (before["seconds"] / smallest["sentences"])
+            flag = "⚠️ grows faster than linear" if growth > SUPERLINEAR_FACTOR else "✅"
+            print(f"   {stage:<10} x{growth:5.2f}  {flag}")
+
+
+if __name__ == "__main__":
+    commit = git_commit()
+    print(f"🧪 EPUB pipeline benchmark | commit {commit['commit']}{' (dirty)' if commit['dirty'] else ''} | "
+          f"sizes: {', '.join(SIZES_TO_RUN)} | pipelines: {', '.join(PIPELINES_TO_RUN)}")
+
+    os.makedirs(RUNS_DIR, exist_ok=True)
+    records = []
+    for pipeline in PIPELINES_TO_RUN:
+        for size_name in SIZES_TO_RUN:
+            record = benchmark(pipeline, size_name, commit)
+            records.append(record)
+            with open(RESULTS_FILE, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    print_scaling(records)
+    if not KEEP_RUNS:
+        shutil.rmtree(RUNS_DIR, ignore_errors=True)
+    print(f"\n📄 Results appended to {RESULTS_FILE}")
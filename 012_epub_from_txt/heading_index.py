@@ -0,0 +1,127 @@
+# heading_index.py
+#
+# === MODULE DESCRIPTION ===
+# Structured heading hierarchy shared by the preprocessor and the generators.
+# The "[Chapter > Section > Subsection]" marker lines in input01.txt are the only place where the
+# hierarchy used to live, so every consumer rebuilt it with split(" > "). That breaks on titles
+# that contain " > " and two sibling sections with the same title end up merged in the TOC.
+#
+# - HeadingStack (used by Script 01) keeps the open headings as a stack and gives every heading a
+#   numeric id. Each #levelN: line produces one record, for example:
+#     {"id": 7, "level": 3, "depth": 2, "parent": 2, "title": "Combat", "path": ["Gameplay", "Combat"], "ids": [2, 7]}
+#   'level' is the number written in the source, 'depth' is the length of the path (levels can skip).
+# - The records are saved next to input01.txt as headings.jsonl, one per marker line, in the same order.
+# - HeadingReader (used by Script 02) hands the records out as the marker lines are read.
+#   A marker that doesn't match the next record (missing sidecar, input01.txt edited by hand) falls
+#   back to splitting the marker text, with no ids.
+#
+# The marker lines in input01.txt are unchanged, so older inputs keep working.
+#
+# =========================================================
+
+import json
+import os
+from typing import Dict, List, Optional, Tuple
+
+HEADINGS_FILE_NAME = "headings.jsonl"
+PATH_SEPARATOR = " > "
+
+
+class HeadingStack:
+    """Open headings (level, id, title) from the outermost to the current one."""
+
+    def __init__(self):
+        self.stack: List[Tuple[int, int, str]] = []
+        self.next_id = 1
+        self.records: List[Dict] = []
+
+    def push(self, level: int, title: str) -> Dict:
+        """Registers a heading, closing the open headings of the same or deeper level. Returns its record."""
+        while self.stack and self.stack[-1][0] >= level:
+            self.stack.pop()
+        parent = self.stack[-1][1] if self.stack else None
+        heading_id = self.next_id
+        self.next_id += 1
+        self.stack.append((level, heading_id, title))
+
+        record = {
+            "id": heading_id,
+            "level": level,
+            "depth": len(self.stack),
+            "parent": parent,
+            "title": title,
+            "path": [entry[2] for entry in self.stack],
+            "ids": [entry[1] for entry in self.stack],
+        }
+        self.records.append(record)
+        return record
+
+
+def marker_line(record: Dict) -> str:
+    """The "[A > B > C]" line written to input01.txt for a heading record."""
+    return f"[{PATH_SEPARATOR.join(record['path'])}]"
+
+
+def headings_path_for(input_path: str) -> str:
+    return os.path.join(os.path.dirname(input_path), HEADINGS_FILE_NAME)
+
+
+def write_headings(path: str, records: List[Dict]):
+    temp_path = path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False))
+            f.write("\n")
+    os.replace(temp_path, path)
+
+
+def load_headings(path: str) -> Optional[List[Dict]]:
+    """Records from a headings.jsonl file, or None if it doesn't exist or can't be read."""
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+    except (OSError, ValueError):
+        return None
+
+
+class HeadingReader:
+    """Returns the record of each marker line, in order, checking it against the sidecar."""
+
+    def __init__(self, records: Optional[List[Dict]], warn: bool = True):
+        self.records = records or []
+        self.position = 0
+        self._warned = not warn
+        if records is None and warn:
+            print(f"⚠️ Warning: {HEADINGS_FILE_NAME} not found. Heading hierarchy is read from the marker lines.")
+            self._warned = True
+
+    def next(self, line: str) -> Dict:
+        if self.position < len(self.records) and marker_line(self.records[self.position]) == line:
+            record = self.records[self.position]
+            self.position += 1
+            return record
+
+        # Not in the sidecar (stale headings.jsonl, or a sentence that looks like a marker):
+        # this line is read the old way and the next one is checked again
+        if not self._warned:
+            print(f"⚠️ Warning: {HEADINGS_FILE_NAME} does not match the marker {line}. "
+                  f"Reading it from the marker text.")
+            self._warned = True
+        path = line[1:-1].split(PATH_SEPARATOR)
+        return {"id": None, "level": len(path), "depth": len(path), "parent": None,
+                "title": path[-1], "path": path, "ids": None}
+
+
+def open_headings(input_path: str) -> HeadingReader:
+    """HeadingReader for the headings.jsonl sidecar that sits next to `input_path`."""
+    return HeadingReader(load_headings(headings_path_for(input_path)))
+
+
+def toc_group_key(entry: Dict, depth: int):
+    """Key used to group TOC entries at `depth`: the heading id when known, the title otherwise."""
+    ids = entry.get("ids")
+    if ids and len(ids) > depth:
+        return ids[depth]
+    return entry["levels"][depth]
@@ -0,0 +1,165 @@
+# inline_markup.py
+#
+# === MODULE DESCRIPTION ===
+# Single-pass escaper for the inline markup allowed inside sentences.
+# The old escape_and_allow_html_tags() ran html.escape() and then four str.replace() calls to
+# re-allow <b> and <i> on every sentence. Any other tag, like the custom <important> tags used in
+# raw_content.txt, came out escaped as visible text.
+#
+# escape_inline() scans the text once:
+# - Sentences without '<', '&' or '>' (the vast majority) are returned untouched, with no copy.
+# - Whitelisted tags are converted while escaping everything else in the same scan.
+#   INLINE_TAGS are kept as HTML tags (b, i, em, strong) and CLASS_TAGS become
+#   <span class="...">. Tags with attributes or tags not in the whitelist are escaped as before.
+# - Tags are kept balanced so every fragment stays well-formed XHTML: stray closing tags are
+#   escaped and tags left open are closed at the end of the sentence.
+#
+# For balanced <b>/<i> markup the output is identical to the old function.
+# Run this file directly to benchmark both on a million synthetic sentences.
+#
+# =========================================================
+
+import html
+import random
+import re
+import time
+from typing import Dict, List, Optional
+
+# === CONFIGURATION ===
+# Source tag -> XHTML tag
+INLINE_TAGS: Dict[str, str] = {
+    "b": "b",
+    "i": "i",
+    "em": "em",
+    "strong": "strong",
+}
+# Source tag -> CSS class of the <span> (styles in Styles/Style001.css)
+CLASS_TAGS: Dict[str, str] = {
+    "important": "important",
+    "small_caps": "small_caps",
+}
+
+BENCHMARK_SENTENCES = 1_000_000
+
+# =============================================================
+
+_TAG = re.compile(r"<(/?)([A-Za-z][\w-]*)>")
+
+
+def _escape_plain(text: str) -> str:
+    """Same as html.escape(text, quote=False), without copying text that needs no escaping."""
+    if "&" in text:
+        text = text.replace("&", "&amp;")
+    if "<" in text:
+        text = text.replace("<", "&lt;")
+    if ">" in text:
+        text = text.replace(">", "&gt;")
+    return text
+
+
+class InlineMarkup:
+    """Whitelist-driven escaper. Build one per configuration and reuse it for every sentence."""
+
+    def __init__(self, inline_tags: Optional[Dict[str, str]] = None, class_tags: Optional[Dict[str, str]] = None):
+        inline_tags = INLINE_TAGS if inline_tags is None else inline_tags
+        class_tags = CLASS_TAGS if class_tags is None else class_tags
+        self.opening: Dict[str, str] = {}
+        self.closing: Dict[str, str] = {}
+        for name, tag in inline_tags.items():
+            self.opening[name] = f"<{tag}>"
+            self.closing[name] = f"</{tag}>"
+        for name, css_class in class_tags.items():
+            self.opening[name] = f'<span class="{html.escape(css_class)}">'
+            self.closing[name] = "</span>"
+
+    def escape(self, text: str) -> str:
+        if "<" not in text:
+            # No tags possible: plain escaping (usually nothing at all)
+            return _escape_plain(text)
+
+        parts: List[str] = []
+        open_tags: List[str] = []
+        position = 0
+        for match in _TAG.finditer(text):
+            is_closing, name = match.groups()
+            if name not in self.opening:
+                continue  # Escaped together with the surrounding text
+            if is_closing:
+                if name not in open_tags:
+                    continue  # Stray closing tag: escaped
+                parts.append(_escape_plain(text[position:match.start()]))
+                # Close inner tags that were left open so the nesting stays valid
+                while True:
+                    inner = open_tags.pop()
+                    parts.append(self.closing[inner])
+                    if inner == name:
+                        break
+            else:
+                parts.append(_escape_plain(text[position:match.start()]))
+                parts.append(self.opening[name])
+                open_tags.append(name)
+            position = match.end()
+
+        parts.append(_escape_plain(text[position:]))
+        while open_tags:
+            parts.append(self.closing[open_tags.pop()])
+        return "".join(parts)
+
+
+_default = InlineMarkup()
+escape_inline = _default.escape
+
+
+# =============================================================
+# === BENCHMARK ===
+# =============================================================
+
+def legacy_escape_and_allow_html_tags(text: str) -> str:
+    """The previous implementation, kept for the benchmark."""
+    escaped_text = html.escape(text, quote=False)
+    escaped_text = escaped_text.replace("&lt;b&gt;", "<b>")
+    escaped_text = escaped_text.replace("&lt;/b&gt;", "</b>")
+    escaped_text = escaped_text.replace("&lt;i&gt;", "<i>")
+    escaped_text = escaped_text.replace("&lt;/i&gt;", "</i>")
+    return escaped_text
+
+
+def synthetic_sentences(count: int, seed: int = 7) -> List[str]:
+    """Mostly plain sentences, with some '&', <b>/<i> markup and custom tags, like real books."""
+    rnd = random.Random(seed)
+    words = "the ancient kingdom of fire and dark knights walked across silent forests to the bell tower".split()
+    sentences = []
+    for _ in range(count):
+        sentence = " ".join(rnd.choice(words) for _ in range(rnd.randint(6, 24))).capitalize() + "."
+        roll = rnd.random()
+        if roll < 0.05:
+            sentence = sentence.replace(" and ", " & ", 1)
+        elif roll < 0.10:
+            sentence = f"{sentence} It was <b>{rnd.choice(words)}</b> and <i>{rnd.choice(words)}</i>."
+        elif roll < 0.12:
+            sentence = f"{sentence} The <important>{rnd.choice(words)}</important> part."
+        sentences.append(sentence)
+    return sentences
+
+
+if __name__ == "__main__":
+    print(f"🧪 Generating {BENCHMARK_SENTENCES:,} synthetic sentences...")
+    sentences = synthetic_sentences(BENCHMARK_SENTENCES)
+
+    timings = {}
+    outputs = {}
+    for name, function in (("legacy", legacy_escape_and_allow_html_tags), ("escape_inline", escape_inline)):
+        start = time.perf_counter()
+        outputs[name] = [function(sentence) for sentence in sentences]
+        timings[name] = time.perf_counter() - start
+        print(f"   {name:<14} {timings[name]:6.2f} s  ({timings[name] / len(sentences) * 1e9:6.0f} ns/sentence)")
+
+    # Both must agree on everything except the custom tags, which the old function escaped
+    differences = [
+        i for i, sentence in enumerate(sentences)
+        if outputs["legacy"][i] != outputs["escape_inline"][i] and "<important>" not in sentence
+    ]
+    print(f"📊 Speed-up: x{timings['legacy'] / timings['escape_inline']:.2f} | "
+          f"Unexpected differences: {len(differences)}")
+    if differences:
+        print(f"❌ First difference: {sentences[differences[0]]!r}")
@@ -0,0 +1,327 @@
+# intermediate_format.py
+#
+# === MODULE DESCRIPTION ===
+# Compact typed intermediate between Script 01 (preprocess) and Script 02 (fragment generators).
+# input01.txt is a line format with magic markers ('===', '[...]', '@img:'), so every consumer
+# re-classified every line with startswith/endswith checks, once for the metrics pass and again
+# for the fragment pass. Script 01 now also writes epub_parts/input01.bin: the same content as
+# length-prefixed records that already carry their type.
+#
+# File layout:
+#   MAGIC (8 bytes) | record count (uint64) | records...
+#   record = type (uint8) | payload length (uint32) | payload
+#
+#   HEADER           the metadata header text of input01.txt, delimiter included (first record)
+#   SENTENCE         UTF-8 text
+#   PARAGRAPH_BREAK  empty
+#   HEADING          level (uint16), depth (uint16), depth x id (int32, -1 = unknown), path joined by NUL
+#   IMAGE            file NUL alt
+#
+# Consumers call open_content(), which returns the metadata and an iterable of (type, value) records:
+#   SENTENCE -> str, PARAGRAPH_BREAK -> None, HEADING -> heading record (same dict as headings.jsonl),
+#   IMAGE -> (file, alt)
+# The binary file is used when it is at least as recent as input01.txt. Otherwise (no .bin,
+# or input01.txt edited by hand) the text is classified here, with the same rules as before,
+# so both sources give the same records. Comment lines ('#...', ignored by every consumer) are
+# not stored.
+#
+# input01.txt stays the editable/exportable form. From the command line:
+#   python intermediate_format.py export epub_parts/input01.bin [output.txt]   (binary -> text)
+#   python intermediate_format.py build epub_parts/input01.txt                  (text -> binary)
+#
+# =========================================================
+
+import mmap
+import os
+import re
+import struct
+import sys
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from heading_index import HeadingReader, load_headings, headings_path_for, marker_line
+from line_index import HEADER_DELIMITER, open_input
+
+# === CONFIGURATION ===
+BINARY_EXTENSION = ".bin"
+MAGIC = b"EPUBREC1"
+
+# Record types
+HEADER = 0
+SENTENCE = 1
+PARAGRAPH_BREAK = 2
+HEADING = 3
+IMAGE = 4
+
+# =============================================================
+
+_FILE_HEADER = struct.Struct("<8sQ")
+_RECORD = struct.Struct("<BI")
+_HEADING_LEVELS = struct.Struct("<HH")
+_METADATA_LINE = re.compile(r"([A-Z_]+):\s*(.+)")
+
+Record = Tuple[int, object]
+
+
+def binary_path_for(input_path: str) -> str:
+    return os.path.splitext(input_path)[0] + BINARY_EXTENSION
+
+
+def parse_metadata(header_text: str) -> Dict[str, str]:
+    """KEY: value lines of the header (same rules as line_index.open_input)."""
+    if HEADER_DELIMITER not in header_text:
+        raise ValueError(f"Error: Header delimiter '{HEADER_DELIMITER}' not found in input file.")
+    metadata = {}
+    for line in header_text.split(HEADER_DELIMITER, 1)[0].split('\n'):
+        match = _METADATA_LINE.match(line)
+        if match:
+            metadata[match.group(1).strip()] = match.group(2).strip()
+    return metadata
+
+
+# =============================================================
+# === CLASSIFICATION OF TEXT LINES ===
+# =============================================================
+
+def parse_image_line(line: str) -> Tuple[str, str]:
+    parts = line[5:].split("|", 1)
+    return parts[0].strip(), (parts[1].strip() if len(parts) > 1 else "")
+
+
+def records_from_lines(lines: Iterable[str], headings: HeadingReader) -> Iterator[Record]:
+    """Classifies stripped, non-empty content lines the way the generators always did."""
+    for line in lines:
+        if line.startswith("#") and not line.lower().startswith("#level"):
+            continue  # Comment/separator lines are ignored by every consumer
+        if line.startswith("[") and line.endswith("]"):
+            yield HEADING, headings.next(line)
+        elif line.startswith("@img:"):
+            yield IMAGE, parse_image_line(line)
+        elif line == "===":
+            yield PARAGRAPH_BREAK, None
+        else:
+            yield SENTENCE, line
+
+
+def record_to_line(kind: int, value) -> str:
+    """Text form of a record, as it appears in input01.txt."""
+    if kind == SENTENCE:
+        return value
+    if kind == PARAGRAPH_BREAK:
+        return "==="
+    if kind == HEADING:
+        return marker_line(value)
+    if kind == IMAGE:
+        img_file, alt_text = value
+        return f"@img: {img_file} | {alt_text}" if alt_text else f"@img: {img_file}"
+    raise ValueError(f"Unknown record type {kind}")
+
+
+# =============================================================
+# === WRITER ===
+# =============================================================
+
+class RecordWriter:
+    """Writes input01.bin (atomically: .tmp + os.replace on close)."""
+
+    def __init__(self, path: str, header_text: str):
+        self.path = path
+        self.temp_path = path + ".tmp"
+        self.count = 0
+        self._file = open(self.temp_path, "wb")
+        self._file.write(_FILE_HEADER.pack(MAGIC, 0))  # The count is filled in on close
+        self._write(HEADER, header_text.encode("utf-8"))
+
+    def _write(self, kind: int, payload: bytes):
+        self._file.write(_RECORD.pack(kind, len(payload)))
+        self._file.write(payload)
+
+    def write(self, kind: int, value):
+        if kind == SENTENCE:
+            payload = value.encode("utf-8")
+        elif kind == PARAGRAPH_BREAK:
+            payload = b""
+        elif kind == HEADING:
+            ids = value["ids"] or [-1] * len(value["path"])
+            payload = (_HEADING_LEVELS.pack(value["level"], len(value["path"]))
+                       + struct.pack(f"<{len(ids)}i", *ids)
+                       + "\0".join(value["path"]).encode("utf-8"))
+        elif kind == IMAGE:
+            payload = "\0".join(value).encode("utf-8")
+        else:
+            raise ValueError(f"Unknown record type {kind}")
+        self._write(kind, payload)
+        self.count += 1
+
+    def close(self):
+        self._file.seek(0)
+        self._file.write(_FILE_HEADER.pack(MAGIC, self.count))
+        self._file.close()
+        os.replace(self.temp_path, self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self._file.close()
+            os.remove(self.temp_path)
+        return False
+
+
+def write_binary(path: str, header_text: str, lines: Iterable[str], heading_records: Optional[List[Dict]]) -> int:
+    """Writes the content lines of input01.txt (and their heading records) as input01.bin. Returns the record count."""
+    headings = HeadingReader(heading_records)
+    with RecordWriter(path, header_text) as writer:
+        for kind, value in records_from_lines((line.strip() for line in lines if line.strip()), headings):
+            writer.write(kind, value)
+    return writer.count
+
+
+# =============================================================
+# === READERS ===
+# =============================================================
+
+class BinaryRecords:
+    """Records of an input01.bin file, decoded lazily through mmap. Can be iterated several times."""
+
+    def __init__(self, path: str):
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count = _FILE_HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"Error: '{path}' is not an intermediate record file.")
+        kind, length = _RECORD.unpack_from(self._map, _FILE_HEADER.size)
+        start = _FILE_HEADER.size + _RECORD.size
+        self.header_text = self._map[start:start + length].decode("utf-8")
+        self.metadata = parse_metadata(self.header_text)
+        self._content_start = start + length
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __iter__(self) -> Iterator[Record]:
+        data = self._map
+        unpack_record = _RECORD.unpack_from
+        record_size = _RECORD.size
+        position = self._content_start
+        end = len(data)
+        while position < end:
+            kind, length = unpack_record(data, position)
+            position += record_size
+            payload = data[position:position + length]
+            position += length
+            if kind == SENTENCE:
+                yield SENTENCE, payload.decode("utf-8")
+            elif kind == PARAGRAPH_BREAK:
+                yield PARAGRAPH_BREAK, None
+            elif kind == HEADING:
+                yield HEADING, _decode_heading(payload)
+            elif kind == IMAGE:
+                img_file, _, alt_text = payload.decode("utf-8").partition("\0")
+                yield IMAGE, (img_file, alt_text)
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+def _decode_heading(payload: bytes) -> Dict:
+    level, depth = _HEADING_LEVELS.unpack_from(payload, 0)
+    ids_end = _HEADING_LEVELS.size + 4 * depth
+    ids = list(struct.unpack_from(f"<{depth}i", payload, _HEADING_LEVELS.size))
+    path = payload[ids_end:].decode("utf-8").split("\0")
+    if ids[-1] < 0:
+        ids = None
+    return {
+        "id": ids[-1] if ids else None,
+        "level": level,
+        "depth": depth,
+        "parent": ids[-2] if ids and depth > 1 else None,
+        "title": path[-1],
+        "path": path,
+        "ids": ids,
+    }
+
+
+class TextRecords:
+    """Records classified on the fly from input01.txt (LineIndex) and headings.jsonl."""
+
+    def __init__(self, input_path: str):
+        self.metadata, self.lines = open_input(input_path)
+        self.heading_records = load_headings(headings_path_for(input_path))
+        self._iterations = 0
+
+    def __len__(self) -> int:
+        return len(self.lines)
+
+    def __iter__(self) -> Iterator[Record]:
+        # Fresh HeadingReader on every pass; warnings are only printed on the first one
+        headings = HeadingReader(self.heading_records, warn=self._iterations == 0)
+        self._iterations += 1
+        return records_from_lines(self.lines, headings)
+
+    def close(self):
+        self.lines.close()
+
+
+def open_content(input_path: str):
+    """
+    Returns (metadata, records) for input01.txt, reading input01.bin instead when it exists and
+    is at least as recent as the text file. Raises ValueError if the header delimiter is missing.
+    """
+    binary_path = binary_path_for(input_path)
+    if os.path.exists(binary_path) and (
+            not os.path.exists(input_path) or os.path.getmtime(binary_path) >= os.path.getmtime(input_path)):
+        records = BinaryRecords(binary_path)
+        print(f"📦 Reading typed records from {binary_path}")
+        return records.metadata, records
+    records = TextRecords(input_path)
+    return records.metadata, records
+
+
+# =============================================================
+# === COMMAND LINE: TEXT EXPORT / BINARY BUILD ===
+# =============================================================
+
+def export_text(binary_path: str, output_path: str):
+    with BinaryRecords(binary_path) as records, open(output_path, "w", encoding="utf-8") as f:
+        f.write(records.header_text)
+        f.write("\n".join(record_to_line(kind, value) for kind, value in records))
+        f.write("\n")
+    print(f"✅ Text export written to {output_path}")
+
+
+def build_binary(input_path: str):
+    with open(input_path, "r", encoding="utf-8") as f:
+        full_content = f.read()
+    if HEADER_DELIMITER not in full_content:
+        raise ValueError(f"Error: Header delimiter '{HEADER_DELIMITER}' not found in input file.")
+    header_block, content_block = full_content.split(HEADER_DELIMITER, 1)
+    # Same header text as Script 01 stores: delimiter plus line break
+    header_text = header_block + HEADER_DELIMITER + "\n"
+    binary_path = binary_path_for(input_path)
+    count = write_binary(binary_path, header_text, content_block.split("\n"),
+                         load_headings(headings_path_for(input_path)))
+    print(f"✅ {count:,} records written to {binary_path}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3 or sys.argv[1] not in ("export", "build"):
+        print("Usage: python intermediate_format.py export <input01.bin> [output.txt]\n"
+              "       python intermediate_format.py build <input01.txt>")
+        sys.exit(1)
+    if sys.argv[1] == "export":
+        target = sys.argv[3] if len(sys.argv) > 3 else os.path.splitext(sys.argv[2])[0] + ".export.txt"
+        export_text(sys.argv[2], target)
+    else:
+        build_binary(sys.argv[2])
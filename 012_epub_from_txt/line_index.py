@@ -0,0 +1,122 @@
+# line_index.py
+#
+# === MODULE DESCRIPTION ===
+# Memory-mapped reader for epub_parts/input01.txt.
+# The generators used to read the whole file into one string and then build a list with one
+# Python str per line. For multi-volume compilations of several GB that is the text held in
+# memory twice, plus ~50 bytes of object overhead for every line.
+#
+# LineIndex maps the file (mmap) and keeps only an array with the start/end byte offsets of the
+# non-blank lines (16 bytes per line). Iterating decodes and strips one line at a time, so only
+# the line being processed exists as a str. It can be iterated any number of times (metrics pass,
+# fragment pass) and len() gives the number of content lines, like the old list.
+#
+# The lines produced are exactly those of
+#   [line.strip() for line in content.split('\n') if line.strip()]
+#
+# =========================================================
+
+import mmap
+import re
+from array import array
+from typing import Dict, Iterator, Optional, Tuple
+
+HEADER_DELIMITER = "=== START OF CONTENT ==="
+_METADATA_LINE = re.compile(r"([A-Z_]+):\s*(.+)")
+
+
+class LineIndex:
+    """Offsets of the non-blank lines of a file region, read lazily through mmap."""
+
+    def __init__(self, file_path: str, start: int = 0, encoding: str = "utf-8"):
+        self.encoding = encoding
+        self._file = open(file_path, "rb")
+        try:
+            self._map: Optional[mmap.mmap] = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # Empty files can't be mapped
+            self._map = None
+        self.offsets = array("Q")  # start0, end0, start1, end1, ...
+        if self._map is not None:
+            self._build(start)
+
+    def _build(self, start: int):
+        data = self._map
+        offsets = self.offsets
+        encoding = self.encoding
+        data.seek(start)
+        position = start
+        # readline() runs in C; only the offsets of lines with visible text are kept
+        for raw in iter(data.readline, b""):
+            end = position + len(raw)
+            stripped = raw.strip()
+            # bytes.strip() only knows ASCII whitespace: confirm lines like " " with str.strip()
+            if stripped and (stripped.isascii() or raw.decode(encoding).strip()):
+                offsets.append(position)
+                offsets.append(end)
+            position = end
+
+    def __len__(self) -> int:
+        return len(self.offsets) // 2
+
+    def raw_line(self, number: int) -> bytes:
+        """Undecoded bytes of the content line `number` (0-based), including its line break."""
+        return self._map[self.offsets[2 * number]:self.offsets[2 * number + 1]]
+
+    def __getitem__(self, number: int) -> str:
+        if number < 0:
+            number += len(self)
+        if not 0 <= number < len(self):
+            raise IndexError("line index out of range")
+        return self.raw_line(number).decode(self.encoding).strip()
+
+    def __iter__(self) -> Iterator[str]:
+        data = self._map
+        offsets = self.offsets
+        encoding = self.encoding
+        for i in range(0, len(offsets), 2):
+            yield data[offsets[i]:offsets[i + 1]].decode(encoding).strip()
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+def open_input(file_path: str, encoding: str = "utf-8") -> Tuple[Dict[str, str], LineIndex]:
+    """
+    Parses the metadata header (KEY: value lines before HEADER_DELIMITER) and returns it together
+    with a LineIndex over the content that follows the delimiter.
+    Raises ValueError if the delimiter is missing.
+    """
+    delimiter = HEADER_DELIMITER.encode(encoding)
+    header_lines = []
+    content_start = None
+    position = 0
+    # The header is small: read it line by line until the delimiter shows up
+    with open(file_path, "rb") as f:
+        for raw in f:
+            found_at = raw.find(delimiter)
+            if found_at >= 0:
+                header_lines.append(raw[:found_at])
+                content_start = position + found_at + len(delimiter)
+                break
+            header_lines.append(raw)
+            position += len(raw)
+    if content_start is None:
+        raise ValueError(f"Error: Header delimiter '{HEADER_DELIMITER}' not found in input file.")
+
+    metadata = {}
+    for line in b"".join(header_lines).decode(encoding).split('\n'):
+        match = _METADATA_LINE.match(line)
+        if match:
+            metadata[match.group(1).strip()] = match.group(2).strip()
+
+    return metadata, LineIndex(file_path, start=content_start, encoding=encoding)
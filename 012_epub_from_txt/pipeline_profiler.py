@@ -0,0 +1,182 @@
+# pipeline_profiler.py
+#
+# === MODULE DESCRIPTION ===
+# Opt-in stage instrumentation for the EPUB pipeline scripts (01, 02 and 03).
+# It is disabled by default and costs almost nothing when off. Enable it with environment variables:
+#
+#   EPUB_PROFILE=1              Record wall time, CPU time, peak RSS and item counts for every stage
+#                               and save them to profile_report.json (in the current folder).
+#   EPUB_PROFILE_CPROFILE=1     Also dump a cProfile/pstats file per stage into profile/ (a stage that
+#                               runs several times accumulates all its calls in one file).
+#   EPUB_PROFILE_REPORT=path    Use another report file (e.g. to collect several builds).
+#
+# Each script adds its own entry to the report, so running 01 -> 02 -> 03 leaves one file with the
+# whole pipeline. Peak RSS comes from the standard 'resource' module (peak of the whole process
+# so far); when psutil is installed the current RSS at the start and end of each stage is added too.
+#
+# Usage inside a script:
+#   profiler = PipelineProfiler("01_manage_raw_input.py")
+#   profiler.start("sentence_split")
+#   ...
+#   profiler.stop("sentence_split", items=len(output_lines))
+#   profiler.save()
+#
+# (or "with profiler.stage('zip') as stage: ... stage.items += 1" for code inside functions)
+#
+# =========================================================
+
+import cProfile
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+try:
+    import resource  # Not available on Windows
+except ImportError:
+    resource = None
+
+try:
+    import psutil  # Optional: current RSS per stage
+except ImportError:
+    psutil = None
+
+# === CONFIGURATION ===
+PROFILE_ENV = "EPUB_PROFILE"
+CPROFILE_ENV = "EPUB_PROFILE_CPROFILE"
+REPORT_ENV = "EPUB_PROFILE_REPORT"
+DEFAULT_REPORT_FILE = "profile_report.json"
+PSTATS_DIR = "profile"
+
+# =============================================================
+
+
+def _env_flag(name: str) -> bool:
+    return os.environ.get(name, "").strip().lower() in ("1", "true", "yes", "on")
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident memory of this process so far, in MB (None if the platform can't tell)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS reports bytes
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def current_rss_mb() -> Optional[float]:
+    if psutil is None:
+        return None
+    return round(psutil.Process().memory_info().rss / (1024 * 1024), 1)
+
+
+class StageCounter:
+    """Handed out by PipelineProfiler.stage() so the code inside can report how many items it processed."""
+    __slots__ = ("items",)
+
+    def __init__(self):
+        self.items = 0
+
+
+class PipelineProfiler:
+    """Collects per-stage timings for one script and saves them to the shared JSON report."""
+
+    def __init__(self, script_name: str, enabled: Optional[bool] = None):
+        self.script_name = script_name
+        self.enabled = _env_flag(PROFILE_ENV) if enabled is None else enabled
+        self.use_cprofile = self.enabled and _env_flag(CPROFILE_ENV)
+        self.report_path = os.environ.get(REPORT_ENV) or DEFAULT_REPORT_FILE
+        self.stages: Dict[str, Dict] = {}
+        self._running: Dict[str, tuple] = {}
+        self._cprofiles: Dict[str, cProfile.Profile] = {}  # One per stage, enabled on every call
+        self._cprofile_stage = None
+        self._script_start = time.perf_counter()
+
+    def start(self, name: str):
+        if not self.enabled:
+            return
+        # Only one cProfile can be active at a time: nested stages are timed but not profiled
+        if self.use_cprofile and self._cprofile_stage is None:
+            if name not in self._cprofiles:
+                self._cprofiles[name] = cProfile.Profile()
+            self._cprofile_stage = name
+            self._cprofiles[name].enable()
+        self._running[name] = (time.perf_counter(), time.process_time(), current_rss_mb())
+
+    def stop(self, name: str, items: Optional[int] = None):
+        if not self.enabled or name not in self._running:
+            return
+        wall_start, cpu_start, rss_start = self._running.pop(name)
+        wall = time.perf_counter() - wall_start
+        cpu = time.process_time() - cpu_start
+
+        if self._cprofile_stage == name:
+            self._cprofiles[name].disable()
+            self._cprofile_stage = None
+
+        # A stage that runs several times (e.g. once per section) accumulates into one entry
+        record = self.stages.setdefault(name, {
+            "calls": 0, "wall_seconds": 0.0, "cpu_seconds": 0.0, "items": 0,
+        })
+        record["calls"] += 1
+        record["wall_seconds"] += wall
+        record["cpu_seconds"] += cpu
+        if items is not None:
+            record["items"] += items
+        record["peak_rss_mb"] = peak_rss_mb()
+        if rss_start is not None:
+            record.setdefault("rss_start_mb", rss_start)
+            record["rss_end_mb"] = current_rss_mb()
+
+    @contextmanager
+    def stage(self, name: str):
+        counter = StageCounter()
+        self.start(name)
+        try:
+            yield counter
+        finally:
+            self.stop(name, items=counter.items)
+
+    def save(self):
+        """Writes the pstats files (cProfile mode) and adds (or replaces) this script's entry in the JSON report."""
+        if not self.enabled:
+            return
+
+        if self._cprofiles:
+            os.makedirs(PSTATS_DIR, exist_ok=True)
+            script_stem = os.path.splitext(os.path.basename(self.script_name))[0]
+            for name, profile in self._cprofiles.items():
+                profile.dump_stats(os.path.join(PSTATS_DIR, f"{script_stem}.{name}.pstats"))
+
+        stages = {}
+        for name, record in self.stages.items():
+            record = dict(record)
+            record["wall_seconds"] = round(record["wall_seconds"], 4)
+            record["cpu_seconds"] = round(record["cpu_seconds"], 4)
+            if record["items"] and record["wall_seconds"] > 0:
+                record["items_per_second"] = round(record["items"] / record["wall_seconds"], 1)
+            stages[name] = record
+
+        report = {}
+        if os.path.exists(self.report_path):
+            try:
+                with open(self.report_path, "r", encoding="utf-8") as f:
+                    report = json.load(f)
+            except (OSError, ValueError):
+                report = {}
+        report.setdefault("scripts", {})[self.script_name] = {
+            "finished": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "total_wall_seconds": round(time.perf_counter() - self._script_start, 4),
+            "peak_rss_mb": peak_rss_mb(),
+            "stages": stages,
+        }
+        report["python"] = sys.version.split()[0]
+        report["psutil"] = psutil is not None
+
+        temp_path = self.report_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=4)
+        os.replace(temp_path, self.report_path)
+        print(f"⏱️ Profile report updated: {self.report_path}")